@@ -0,0 +1,127 @@
+import re # to find ADIF tags
+from array import array # for compact storage of log columns
+import numpy as np # for columnar operations
+import pandas as pd # to analyse log as a DataFrame
+from unidecode import unidecode # for log clearing
+from metrics import timed # to measure time of reading the log
+
+# fields of the log used by the pack, all other fields are skipped while reading
+LOG_FIELDS = ('SOTA_REF', 'MY_GRIDSQUARE', 'QSO_DATE', 'BAND', 'MODE', 'CALL')
+
+# ADIF tag looks like <NAME:length:type> or <NAME:length>, <EOH> and <EOR> have no length
+ADIF_TAG = re.compile(rb'<([A-Za-z0-9_]+)(?::(\d+)(?::[^<>]*)?)?>')
+
+
+def decode_value(value, encoding = 'cp1250'):
+    """Decode field value, clearing local characters (accents) by changing them into the closest latin one"""
+    # most of values are plain ASCII, so they don't need any transliteration
+    try:
+        return value.decode('ascii')
+    except UnicodeDecodeError:
+        pass
+    try:
+        text = value.decode('utf-8')
+    except UnicodeDecodeError:
+        # logs exported by Windows programs are usually saved in local code page
+        text = value.decode(encoding, errors = 'replace')
+    return unidecode(text)
+
+
+def iter_records(path, fields = LOG_FIELDS, start = 0, chunk_size = 1 << 20, encoding = 'cp1250'):
+    """Read ADIF file chunk by chunk, yield tuples (record, offset of record's end) one record at a time"""
+    # record is a dictionary holding only requested fields, header of the file (if any) is skipped
+    # reading may start from given offset, which should point at the end of a record (or beginning of file)
+    fields = {field.encode(): field for field in fields}
+    record = {}
+    with open(path, 'rb') as file:
+        file.seek(start)
+        buffer = b''
+        buffer_offset = start # offset of the first byte of buffer in the file
+        eof = False
+        while not eof:
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            position = 0
+            while True:
+                match = ADIF_TAG.search(buffer, position)
+                if match is None:
+                    # keep incomplete tag at the end of buffer for the next chunk
+                    tag_start = buffer.rfind(b'<', position)
+                    position = tag_start if tag_start >= 0 and not eof else len(buffer)
+                    break
+                name, length = match.groups()
+                value_start = match.end()
+                value_end = value_start + int(length) if length else value_start
+                if value_end > len(buffer) and not eof:
+                    # field's value continues in the next chunk
+                    position = match.start()
+                    break
+                position = value_end
+                # tag names are case insensitive, but usually written in upper case
+                if not name.isupper():
+                    name = name.upper()
+                field = fields.get(name)
+                if field is not None:
+                    record[field] = decode_value(buffer[value_start:value_end], encoding)
+                elif name == b'EOR':
+                    yield record, buffer_offset + value_end
+                    record = {}
+                elif name == b'EOH':
+                    record = {}
+            buffer = buffer[position:]
+            buffer_offset += position
+
+
+class LogColumns:
+    """Log fields kept as dictionary-encoded arrays, so memory used grows only with number of distinct values"""
+
+    def __init__(self, fields = LOG_FIELDS):
+        self.fields = fields
+        self.codes = {field: array('i') for field in fields}
+        self.values = {field: {} for field in fields}
+
+    def __len__(self):
+        return len(self.codes[self.fields[0]])
+
+    def append(self, record):
+        """Add record to columns, missing fields are saved with code -1"""
+        for field in self.fields:
+            value = record.get(field)
+            if value is None or value == '':
+                self.codes[field].append(-1)
+            else:
+                self.codes[field].append(self.values[field].setdefault(value, len(self.values[field])))
+
+    def to_frame(self):
+        """Return columns as DataFrame with categorical columns, fields never found in the log are skipped"""
+        columns = {}
+        for field in self.fields:
+            if not self.values[field]:
+                continue
+            codes = np.frombuffer(self.codes[field], dtype = 'int32')
+            if field == 'QSO_DATE':
+                # date of QSO is converted into datetime, which needs to be done only for distinct dates
+                dates = pd.to_datetime(pd.Index(list(self.values[field])), format = '%Y%m%d', errors = 'coerce')
+                columns[field] = dates.take(codes, allow_fill = True, fill_value = pd.NaT)
+            else:
+                columns[field] = pd.Categorical.from_codes(codes, categories = list(self.values[field]))
+        return pd.DataFrame(columns, index = pd.RangeIndex(len(self)))
+
+
+@timed('read_log')
+def read_chases(path, fields = LOG_FIELDS, start = 0, encoding = 'cp1250'):
+    """Read SOTA chases from ADIF file starting at given offset, return DataFrame with requested fields of QSOs
+    with SOTA_REF provided and offset of the end of the last complete record read"""
+    columns = LogColumns(fields)
+    offset = start
+    for record, offset in iter_records(path, fields, start, encoding = encoding):
+        if record.get('SOTA_REF'):
+            record['SOTA_REF'] = record['SOTA_REF'].upper()
+            columns.append(record)
+    return columns.to_frame(), offset
+
+
+def read_log(path, fields = LOG_FIELDS, encoding = 'cp1250'):
+    """Read SOTA chases from ADIF file, return DataFrame with requested fields of QSOs with SOTA_REF provided"""
+    return read_chases(path, fields, encoding = encoding)[0]
@@ -0,0 +1,17 @@
+// functions used by chasers map in chasers_dashboard.py, they're run in the browser
+
+window.dashExtensions = Object.assign({}, window.dashExtensions, {
+    chasers: {
+        // present summit as a circle - radius represents number of chases, fill represents summit's points
+        // summits not chased yet have a border
+        pointToLayer: function (feature, latlng) {
+            const summit = feature.properties;
+            const style = {radius: summit.radius, fillColor: summit.fill_color, weight: 0, fillOpacity: 1};
+            if (summit.color) {
+                style.color = summit.color;
+                style.weight = 1;
+            }
+            return L.circleMarker(latlng, style);
+        }
+    }
+});
@@ -0,0 +1,115 @@
+// functions used by spots map in spots_visualiser_dashboard.py, they're run in the browser
+
+// count spots of cluster on bands and modes selected by the user, return total count with the most popular
+// band's and mode's colors
+function countSelected(cluster, selection) {
+    const bands = selection.bands || [];
+    const modes = selection.modes || [];
+    const bandCounts = {};
+    const modeCounts = {};
+    let count = 0;
+    for (const group of cluster.groups) {
+        if (bands.includes(group.band) && modes.includes(group.mode)) {
+            count += group.count;
+            bandCounts[group.band_color] = (bandCounts[group.band_color] || 0) + group.count;
+            modeCounts[group.mode_color] = (modeCounts[group.mode_color] || 0) + group.count;
+        }
+    }
+    const mostPopular = counts => Object.keys(counts).reduce((a, b) => counts[a] >= counts[b] ? a : b, undefined);
+    return {count: count, band_color: mostPopular(bandCounts), mode_color: mostPopular(modeCounts)};
+}
+
+// present text (e.g. spot's description from SOTA spots) as a DOM node - it's never parsed as HTML,
+// so markup sent in a spot is shown as it is
+function textNode(text) {
+    const div = document.createElement('div');
+    div.style.whiteSpace = 'pre-line';
+    div.textContent = text;
+    return div;
+}
+
+// present cluster as a circle with number of markers inside, clicking it zooms the map in
+function clusterToLayer(count, latlng, fillColor, color) {
+    const size = 24 + 6 * Math.round(Math.log10(count) * 2);
+    // icon is built as DOM node with style properties, so colors and count can't add any markup
+    const div = textNode(String(count));
+    Object.assign(div.style, {
+        width: size + 'px', height: size + 'px', lineHeight: (size - 6) + 'px', borderRadius: '50%',
+        textAlign: 'center', fontWeight: 'bold', background: fillColor, border: '3px solid ' + color,
+        boxSizing: 'border-box'
+    });
+    const icon = L.divIcon({html: div, className: '', iconSize: [size, size]});
+    const marker = L.marker(latlng, {icon: icon});
+    marker.on('click', function (e) {
+        e.target._map.setView(e.latlng, e.target._map.getZoom() + 2);
+    });
+    return marker;
+}
+
+// functions referred by dl.GeoJSON layers with spots and summits
+window.dashExtensions = Object.assign({}, window.dashExtensions, {
+    spots: {
+        // present spot as a circle - fill represents activation's band, border represents activation's mode
+        // cluster is colored with the most popular band and mode among spots selected
+        pointToLayer: function (feature, latlng, context) {
+            const spot = feature.properties;
+            if (spot.cluster) {
+                const selected = countSelected(spot, context.hideout || {});
+                return clusterToLayer(selected.count, latlng, selected.band_color || 'white', selected.mode_color || 'gray');
+            }
+            // time since spot in hour fraction - the newest spot, the larger circle
+            const age = ((context.hideout || {}).moment || Date.now()) / 1000 - spot.time;
+            const style = {radius: Math.max(1 - age / 3600, 0) * 30, weight: 3, opacity: 1, fillOpacity: 1};
+            if (spot.band_color) {
+                style.fillColor = spot.band_color;
+            }
+            if (spot.mode_color) {
+                style.color = spot.mode_color;
+            }
+            const popup = textNode(spot.description + '\n' + Math.round(age / 60) + ' minutes ago\n.');
+            return L.circleMarker(latlng, style).bindPopup(popup);
+        },
+        // show only spots on bands and modes selected by the user (kept in layer's hideout)
+        // and clusters with at least one of such spots
+        filter: function (feature, context) {
+            const selection = context.hideout || {};
+            if (feature.properties.cluster) {
+                return countSelected(feature.properties, selection).count > 0;
+            }
+            return (selection.bands || []).includes(feature.properties.band) &&
+                (selection.modes || []).includes(feature.properties.mode);
+        }
+    },
+    summits: {
+        // present summit as a small gray point, cluster of summits as a gray circle with number of summits
+        pointToLayer: function (feature, latlng) {
+            if (feature.properties.cluster) {
+                return clusterToLayer(feature.properties.count, latlng, 'lightgray', 'gray');
+            }
+            return L.circleMarker(latlng, {radius: 4, weight: 1, color: 'gray', fillColor: 'lightgray', fillOpacity: 1});
+        }
+    }
+});
+
+// clientside callbacks - filters are applied without sending any request to the server
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    spots: {
+        // moment of the map is now or, in replay mode, the hour selected (counted from the beginning of current hour)
+        update_filter: function (bands, modes, n_intervals, history_mode, replay_time) {
+            let moment = Date.now();
+            if (history_mode === 'Replay' && replay_time) {
+                moment = Math.floor(moment / 3600000) * 3600000 + replay_time * 3600000;
+            }
+            return {bands: bands || [], modes: modes || [], moment: moment};
+        },
+        // live spots received from the stream (assets/spots_stream.js), grouped into clusters for current zoom
+        // only spots within area around user's locator are shown, if it's given
+        live_spots: function (version, zoom, history_mode, replay_time, area) {
+            const no_update = window.dash_clientside.no_update;
+            if ((history_mode === 'Replay' && replay_time) || !window.spotsStream || !window.spotsStream.ready()) {
+                return [no_update, no_update];
+            }
+            return [window.spotsStream.geojson(zoom, area), []];
+        }
+    }
+});
@@ -0,0 +1,135 @@
+// live spots pushed by spots_visualiser_dashboard.py with server-sent events - browser keeps all spots of the last
+// hour and groups them into clusters for current zoom (like spatial_clusters.py does on the server)
+(function () {
+    // clusters are cells of the grid RADIUS pixels wide, all spots are shown above MAX_ZOOM
+    const RADIUS = 60;
+    const MAX_ZOOM = 14;
+    const TILE_SIZE = 256;
+
+    const spots = new Map();
+    let version = null;
+
+    // Web Mercator projection scaled to 0-1, as used by map tiles
+    function toMercator(longitude, latitude) {
+        const sin = Math.sin(Math.max(Math.min(latitude, 85.0511), -85.0511) * Math.PI / 180);
+        return [(longitude + 180) / 360, 0.5 - Math.log((1 + sin) / (1 - sin)) / (4 * Math.PI)];
+    }
+
+    // great-circle distance between two points in kilometres (like distance_km in summit_resolver.py)
+    function distanceKm(latitude1, longitude1, latitude2, longitude2) {
+        const radians = Math.PI / 180;
+        const a = Math.pow(Math.sin((latitude2 - latitude1) * radians / 2), 2) + Math.cos(latitude1 * radians) *
+            Math.cos(latitude2 * radians) * Math.pow(Math.sin((longitude2 - longitude1) * radians / 2), 2);
+        return 6371 * 2 * Math.asin(Math.sqrt(a));
+    }
+
+    // group spots (only these within area around user's locator, if it's given) into clusters for zoom level,
+    // return GeoJSON features of single spots and clusters
+    function cluster(zoom, area) {
+        let features = Array.from(spots.values());
+        if (area) {
+            features = features.filter(feature => distanceKm(area.latitude, area.longitude, feature.geometry.coordinates[1],
+                                                             feature.geometry.coordinates[0]) <= area.radius);
+        }
+        zoom = Math.max(Math.floor(zoom || 0), 0);
+        if (zoom > MAX_ZOOM) {
+            return features;
+        }
+        const cellSize = RADIUS / (TILE_SIZE * Math.pow(2, zoom));
+        const cells = new Map();
+        for (const feature of features) {
+            const [longitude, latitude] = feature.geometry.coordinates;
+            const [x, y] = toMercator(longitude, latitude);
+            const key = Math.floor(x / cellSize) + '-' + Math.floor(y / cellSize);
+            if (!cells.has(key)) {
+                cells.set(key, []);
+            }
+            cells.get(key).push(feature);
+        }
+        const visible = [];
+        for (const [key, members] of cells) {
+            if (members.length === 1) {
+                visible.push(members[0]);
+                continue;
+            }
+            // cluster keeps number of spots for each band and mode, with their colors, so it's filtered
+            // and colored according to bands and modes selected
+            const groups = new Map();
+            let longitude = 0, latitude = 0;
+            for (const member of members) {
+                const spot = member.properties;
+                const group = spot.band + '|' + spot.mode;
+                if (!groups.has(group)) {
+                    groups.set(group, {band: spot.band, mode: spot.mode, count: 0, band_color: spot.band_color, mode_color: spot.mode_color});
+                }
+                groups.get(group).count += 1;
+                longitude += member.geometry.coordinates[0];
+                latitude += member.geometry.coordinates[1];
+            }
+            visible.push({
+                type: 'Feature',
+                id: 'cluster-' + zoom + '-' + key,
+                geometry: {type: 'Point', coordinates: [longitude / members.length, latitude / members.length]},
+                properties: {cluster: true, count: members.length, groups: Array.from(groups.values())}
+            });
+        }
+        return visible;
+    }
+
+    // tell the dashboard that spots have changed
+    function notify() {
+        try {
+            window.dash_clientside.set_props('spots_stream', {data: version});
+        } catch (error) {
+            // layout isn't rendered yet - spots are read when it is
+        }
+    }
+
+    function connect() {
+        if (!window.EventSource) {
+            return;
+        }
+        const config = document.getElementById('_dash-config');
+        const prefix = config ? JSON.parse(config.textContent).requests_pathname_prefix || '/' : '/';
+        const source = new EventSource(prefix + 'spots/stream');
+        // whole snapshot is sent on connection (and to clients too slow to get all changes)
+        source.addEventListener('snapshot', function (event) {
+            const message = JSON.parse(event.data);
+            spots.clear();
+            for (const feature of message.features) {
+                spots.set(feature.id, feature);
+            }
+            version = message.version;
+            notify();
+        });
+        source.addEventListener('delta', function (event) {
+            const message = JSON.parse(event.data);
+            if (version !== null && message.version <= version) {
+                return;
+            }
+            for (const id of message.removed) {
+                spots.delete(id);
+            }
+            for (const feature of message.added) {
+                spots.set(feature.id, feature);
+            }
+            version = message.version;
+            notify();
+        });
+    }
+
+    window.spotsStream = {
+        ready: function () {
+            return version !== null;
+        },
+        geojson: function (zoom, area) {
+            return {type: 'FeatureCollection', features: cluster(zoom, area)};
+        }
+    };
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', connect);
+    } else {
+        connect();
+    }
+})();
@@ -0,0 +1,66 @@
+"""Benchmark of chases cube - slicing chases in the cube against filtering QSOs of the whole log
+
+Run from repository root: python -m benchmarks.bench_chase_cube [sizes...]
+"""
+import os # for file system operations
+import sys # for command line arguments
+import time # for time measurements
+import tempfile # logs are written to temporary directory
+
+from adif_stream import read_log
+from chase_cube import ChaseCube
+from summit_resolver import base_callsign
+from benchmarks.generators import adif_log, summit_codes # synthetic SOTA data
+
+# slices checked - dimensions of the cube with labels selected
+SLICES = (
+    {},
+    {'band': ['20m'], 'year': ['2018', '2019']},
+    {'mode': ['CW'], 'association': ['A1', 'A2']},
+    {'activator': ['SP5ABC', 'SP7ABC']},
+)
+
+
+def scan_log(log_df, band = None, year = None, mode = None, association = None, activator = None):
+    """Count chases of every summit filtering QSOs of the whole log, as done without the cube"""
+    mask = log_df['SOTA_REF'].notna()
+    if band is not None:
+        mask &= log_df['BAND'].astype(str).str.lower().isin(band)
+    if year is not None:
+        mask &= log_df['QSO_DATE'].dt.year.astype(str).isin(year)
+    if mode is not None:
+        mask &= log_df['MODE'].astype(str).str.upper().isin(mode)
+    if association is not None:
+        mask &= log_df['SOTA_REF'].astype(str).str.split('/').str[0].isin(association)
+    if activator is not None:
+        mask &= log_df['CALL'].astype(str).map(base_callsign).isin(activator)
+    return log_df.loc[mask, 'SOTA_REF'].astype(str).value_counts().sort_index()
+
+
+def main(sizes):
+    """Build cube of logs with given numbers of QSOs and compare time of slices with filtering the log"""
+    codes = summit_codes(20000)
+    print(f"{'QSOs':>8} {'cells':>8} {'build [s]':>10} {'slice':>6} {'scan [ms]':>10} {'cube [ms]':>10} {'faster':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n_qsos in sizes:
+            path = os.path.join(directory, f'log_{n_qsos}.adi')
+            adif_log(path, n_qsos, codes)
+            log_df = read_log(path)
+            start = time.perf_counter()
+            cube = ChaseCube()
+            cube.merge(log_df)
+            build_time = time.perf_counter() - start
+            for number, selected in enumerate(SLICES):
+                start = time.perf_counter()
+                expected = scan_log(log_df, **selected)
+                scan_time = time.perf_counter() - start
+                start = time.perf_counter()
+                counts = cube.query(**selected)
+                cube_time = time.perf_counter() - start
+                assert counts.to_dict() == expected.to_dict()
+                print(f'{n_qsos:>8} {len(cube):>8} {build_time:>10.2f} {number:>6} {scan_time * 1000:>10.1f} '
+                      f'{cube_time * 1000:>10.1f} {scan_time / cube_time:>6.0f}x')
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,78 @@
+"""Benchmark of spots enrichment - vectorised enrich_spots against the original per-row loop
+
+Run from repository root: python -m benchmarks.bench_enrichment [sizes...]
+"""
+import io # to silence warnings printed for unknown summits
+import sys # for command line arguments
+import time # for time measurements
+import numpy as np # for synthetic data generation
+import pandas as pd # for data analysis
+from datetime import datetime, timedelta # for time calculations
+from contextlib import redirect_stdout # to silence warnings printed for unknown summits
+
+from spots_enrichment import enrich_spots
+from spots_visualiser import bands_df, modes_df # bands and modes tables used by the spots scripts
+from benchmarks.generators import synthetic_summits, synthetic_spots # synthetic SOTA data
+
+
+def legacy_enrich_spots(spots_df, SOTA_summits_df, bands_df, modes_df, now):
+    """Original per-row enrichment loop, kept as a baseline for comparison"""
+    # the only change is fixed 'now' instead of datetime.utcnow() for every row, so outputs can be compared
+    spots_df = spots_df.copy()
+    spots_df['longitude'] = None
+    spots_df['latitude'] = None
+    spots_df['points'] = None
+    spots_df['summitName'] = None
+    spots_df['mode_color'] = None
+    spots_df['band'] = None
+    spots_df['band_color'] = None
+    spots_df['time_since_spot'] = np.nan
+    spots_df['popup'] = np.nan
+    spots_df['popup'] = spots_df['popup'].astype(object)
+    summits_errors = []
+    for i in range(0, len(spots_df)):
+        if spots_df.loc[i, ('summit')].upper() in SOTA_summits_df.index:
+            spots_df.loc[i, ('longitude')] = SOTA_summits_df['Longitude'][spots_df.loc[i, 'summit']]
+            spots_df.loc[i, ('latitude')] = SOTA_summits_df['Latitude'][spots_df.loc[i, 'summit']]
+            spots_df.loc[i, ('points')] = SOTA_summits_df['Points'][spots_df.loc[i, 'summit']]
+            spots_df.loc[i, ('summitName')] = SOTA_summits_df['SummitName'][spots_df.loc[i, 'summit']]
+            spots_df.loc[i, ('time_since_spot')] = (now-spots_df.loc[i, ('timeStamp')])/timedelta(hours=1)
+            spots_df.loc[i, ('popup')] = f"Summit {spots_df.loc[i, ('summitName')].title()} - {spots_df.loc[i, ('summit')]} ({spots_df.loc[i, ('points')]} points)\nactivated by {spots_df.loc[i, ('activatorCallsign')].upper()}\non {spots_df.loc[i, ('frequency')]} - {spots_df.loc[i, ('mode')].upper()}\n{round(spots_df.loc[i, ('time_since_spot')]*60)} minutes ago\n."
+            spots_df.loc[i, ('mode')] = spots_df.loc[i, ('mode')].upper()
+            for band in bands_df.index:
+                if (spots_df.loc[i, ('frequency')] >= bands_df['lower_freq'][band]) and (spots_df.loc[i, ('frequency')] <= bands_df['upper_freq'][band]):
+                    spots_df.loc[i, ('band_color')] = bands_df['color'][band]
+                    spots_df.loc[i, ('band')] = band
+            for j in modes_df.index:
+                if spots_df.loc[i, ('mode')] == modes_df.iloc[j]['mode'].upper():
+                    spots_df.loc[i,('mode_color')] = modes_df.iloc[j]['color']
+        else:
+            summits_errors.append({spots_df.loc[i, ('summit')]})
+    return spots_df, summits_errors
+
+
+def main(sizes, legacy_limit = 100000):
+    """Time both enrichment versions for given numbers of spots and check they return the same data"""
+    summits_df = synthetic_summits()
+    print(f"{'spots':>8} {'loop [s]':>10} {'vectorised [s]':>15} {'speedup':>8}")
+    for n_spots in sizes:
+        spots_df = synthetic_spots(n_spots, summits_df)
+        now = datetime.utcnow()
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            vectorised_df, vectorised_errors = enrich_spots(spots_df, summits_df, bands_df, modes_df, now = now)
+        vectorised_time = time.perf_counter() - start
+        if n_spots > legacy_limit:
+            print(f'{n_spots:>8} {"skipped":>10} {vectorised_time:>15.4f} {"-":>8}')
+            continue
+        start = time.perf_counter()
+        legacy_df, legacy_errors = legacy_enrich_spots(spots_df, summits_df, bands_df, modes_df, now)
+        legacy_time = time.perf_counter() - start
+        # both versions must return the same data, unknown summits included
+        pd.testing.assert_frame_equal(vectorised_df, legacy_df[vectorised_df.columns], check_dtype = False)
+        assert vectorised_errors == legacy_errors
+        print(f'{n_spots:>8} {legacy_time:>10.3f} {vectorised_time:>15.4f} {legacy_time / vectorised_time:>7.0f}x')
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [1000, 10000, 100000])
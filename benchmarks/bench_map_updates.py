@@ -0,0 +1,57 @@
+"""Benchmark of dashboard map updates - changes only (Dash Patch) against whole spots layer sent on every refresh
+
+Run from repository root: python -m benchmarks.bench_map_updates [sizes...]
+"""
+import io # to silence warnings printed for unknown summits
+import sys # for command line arguments
+import json # to measure size of responses
+import time # for time measurements
+from datetime import datetime # for time calculations
+from contextlib import redirect_stdout # to silence warnings printed for unknown summits
+
+from dash import no_update
+from spots_enrichment import prepare_spots, enrich_spots
+from spots_visualiser_dashboard import bands_df, modes_df, get_activation_data, get_visible_spots, feature_key, diff_features
+from benchmarks.generators import synthetic_summits, spots_json # synthetic SOTA data
+
+# share of spots replaced with new ones between refreshes
+NEW_SHARE = (0, 0.02, 0.1)
+
+
+def spots_layer(spots, summits_df, now, zoom):
+    """Prepare spots layer data visible on the whole map for spots downloaded"""
+    with redirect_stdout(io.StringIO()):
+        spots_df = enrich_spots(prepare_spots(spots), summits_df, bands_df, modes_df, now = now)[0]
+    return get_visible_spots(get_activation_data(spots_df), None, zoom)
+
+
+def size(response):
+    """Size of JSON sent to the browser"""
+    return 0 if response is no_update else len(json.dumps(response.to_plotly_json() if hasattr(response, 'to_plotly_json') else response))
+
+
+def main(sizes):
+    """Refresh the map after some spots changed, print size of full and patch responses and time of the diff"""
+    summits_df = synthetic_summits(20000)
+    codes = list(summits_df.index)
+    now = datetime.utcnow()
+    print(f"{'spots':>7} {'zoom':>5} {'new':>5} {'full [kB]':>10} {'patch [kB]':>11} {'diff [ms]':>10}")
+    for n_spots in sizes:
+        spots = spots_json(n_spots, codes, now = now)
+        for zoom in (3, 10):
+            previous = spots_layer(spots, summits_df, now, zoom)
+            keys = [feature_key(feature) for feature in previous['features']]
+            for share in NEW_SHARE:
+                # the oldest spots are replaced with new ones, sent by other activators
+                n_new = int(n_spots * share)
+                new_spots = spots_json(n_new, codes, seed = 1, now = now, first_id = n_spots + 1)
+                current = spots_layer(new_spots + spots[:n_spots - n_new], summits_df, now, zoom)
+                start = time.perf_counter()
+                patches = diff_features(keys, current['features'])
+                diff_time = time.perf_counter() - start
+                print(f'{n_spots:>7} {zoom:>5} {share:>5.0%} {size(current) / 1024:>10.1f} '
+                      f'{sum(size(patch) for patch in patches) / 1024:>11.1f} {diff_time * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [500, 2000])
@@ -0,0 +1,198 @@
+"""Benchmark of the scripts' pipelines on synthetic data, served by local stand-in of SOTA API
+
+Every stage (load, enrich, aggregate, render) is timed and memory-profiled separately and results are saved in
+JSON file, so they can be compared between commits.
+
+Run from repository root:
+    python -m benchmarks.bench_pipeline --spots 1000 10000 --qsos 1000 100000 1000000
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import io # to silence messages printed by the scripts
+import os # for file system operations
+import sys # for python version
+import json # to save results
+import time # for time measurements
+import platform # for machine description
+import argparse # for command line arguments
+import tempfile # for working directories
+import subprocess # to find current commit
+import tracemalloc # for memory profiling
+from datetime import datetime # for results timestamp
+from contextlib import redirect_stdout # to silence messages printed by the scripts
+
+from adif_stream import read_chases
+from chaser_stats import ChaserStats
+from spatial_clusters import ClusterIndex
+from summits_db import load_summits
+from summit_resolver import SummitResolver
+from sota_api import SotaClient, get_spots
+import spots_visualiser
+import chasers_visualiser
+from benchmarks.generators import summits_csv, summit_json, spots_json, adif_log
+from benchmarks.stand_in import SotaStandIn
+
+# tiles are not downloaded while rendering, so any tiles provider supported by Folium can be used
+TILES = 'OpenStreetMap'
+
+
+def measure(stage, profile_memory, function, *args, **kwargs):
+    """Run one stage of pipeline, return its result and dictionary with time (or peak memory) used"""
+    if profile_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        value = function(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    if not profile_memory:
+        return value, {'stage': stage, 'seconds': seconds}
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return value, {'stage': stage, 'peak_mb': peak / 2 ** 20}
+
+
+def spots_pipeline(size, data, profile_memory):
+    """Run spots_visualiser.py stages for size spots, return measurements of stages"""
+    stages = []
+    def load():
+        # spots are downloaded from stand-in, summits database is converted into binary cache
+        with SotaStandIn(spots = data['spots'][:size], latency = data['latency']) as api:
+            spots_dict = get_spots(client = SotaClient(api.api_url))
+        SOTA_summits = load_summits(data['summits_csv'], data['cache_dir'])
+        return spots_dict, SOTA_summits, SummitResolver.from_table(SOTA_summits)
+    (spots_dict, SOTA_summits, resolver), stage = measure('load', profile_memory, load)
+    stages.append(stage)
+    (spots_df, summits_errors), stage = measure('enrich', profile_memory, spots_visualiser.analyse_spots, spots_dict,
+                                                SOTA_summits, resolver)
+    stages.append(stage)
+    found = spots_df[spots_df['longitude'].notna()]
+    _, stage = measure('aggregate', profile_memory, ClusterIndex, found['longitude'], found['latitude'],
+                       list(zip(found['band'], found['mode'])))
+    stages.append(stage)
+    _, stage = measure('render', profile_memory,
+                       lambda: spots_visualiser.draw_spots_map(spots_df, tiles = TILES).get_root().render())
+    stages.append(stage)
+    return stages
+
+
+def chasers_pipeline(size, data, profile_memory):
+    """Run chasers_visualiser.py stages for log with size QSOs, return measurements of stages"""
+    stages = []
+    (log_df, offset), stage = measure('load', profile_memory, read_chases, data['logs'][size])
+    stages.append(stage)
+    chaser_stats = ChaserStats()
+    _, stage = measure('aggregate', profile_memory, chaser_stats.merge, log_df)
+    stages.append(stage)
+    # summits missing in local database are downloaded from stand-in, every run starts with empty API cache
+    cache_path = os.path.join(data['workdir'], f'summits_api_cache.{size}.{int(profile_memory)}.json')
+    with SotaStandIn(summits = data['summits'], latency = data['latency'], error_rate = data['error_rate']) as api:
+        (df_log_summits, df_summits), stage = measure('enrich', profile_memory, chasers_visualiser.get_chased_summits,
+                                                      chaser_stats, data['summits_csv'], cache_path, SotaClient(api.api_url))
+        stages.append(stage)
+    _, stage = measure('render', profile_memory, lambda: chasers_visualiser.draw_chasers_map(
+        df_log_summits, df_summits, chaser_stats, tiles = TILES).get_root().render())
+    stages.append(stage)
+    return stages
+
+
+def prepare_data(workdir, spots_sizes, qsos_sizes, n_summits, seed, latency, error_rate):
+    """Generate synthetic summits database, spots and logs in workdir, return dictionary describing them"""
+    data = {'workdir': workdir, 'latency': latency, 'error_rate': error_rate,
+            'summits_csv': os.path.join(workdir, 'summitslist.csv'), 'cache_dir': os.path.join(workdir, '.summits_cache')}
+    summits_df = summits_csv(data['summits_csv'], n_summits, seed)
+    # chasers script keeps binary cache of summits database next to summitslist.csv, it's built here once,
+    # so chasers' enrich stage measures finding summits in already converted database
+    load_summits(data['summits_csv'])
+    codes = list(summits_df['SummitCode'])
+    # summits known only by SOTA API (not in local database), they're downloaded by chasers script
+    extra_df = summits_df.head(200).copy()
+    extra_df['SummitCode'] = [f'B{i // 100}/R{i // 10 % 10}-{i % 10:03d}' for i in range(len(extra_df))]
+    data['summits'] = {summit['SummitCode']: summit_json(summit) for summit in summits_df.iloc[::50].to_dict('records')}
+    data['summits'].update({summit['SummitCode']: summit_json(summit) for summit in extra_df.to_dict('records')})
+    data['spots'] = spots_json(max(spots_sizes, default = 0), codes, seed)
+    data['logs'] = {}
+    for size in qsos_sizes:
+        data['logs'][size] = os.path.join(workdir, f'log_{size}.adi')
+        adif_log(data['logs'][size], size, codes, seed, extra_codes = list(extra_df['SummitCode']) + ['ZZ/XX-999'])
+    return data
+
+
+def run(spots_sizes, qsos_sizes, n_summits = 180000, seed = 0, latency = 0.0, error_rate = 0.0, profile_memory = True):
+    """Run benchmarks for given numbers of spots and QSOs, return list of results"""
+    # every pipeline is run twice - timing first, then with memory profiling (which slows down the code)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        data = prepare_data(workdir, spots_sizes, qsos_sizes, n_summits, seed, latency, error_rate)
+        for scenario, pipeline, sizes in (('spots', spots_pipeline, spots_sizes), ('chasers', chasers_pipeline, qsos_sizes)):
+            for size in sizes:
+                # binary cache of summits database is rebuilt for every run, as on the first run of the script
+                data['cache_dir'] = os.path.join(workdir, f'.summits_cache_{scenario}_{size}')
+                stages = pipeline(size, data, False)
+                if profile_memory:
+                    data['cache_dir'] += '_memory'
+                    for stage, memory in zip(stages, pipeline(size, data, True)):
+                        stage['peak_mb'] = memory['peak_mb']
+                for stage in stages:
+                    results.append(dict(scenario = scenario, size = size, **stage))
+                    print(f"{scenario:>8} {size:>8} {stage['stage']:>10} {stage['seconds']:>9.3f} s"
+                          + (f" {stage['peak_mb']:>9.1f} MB" if 'peak_mb' in stage else ''))
+    return results
+
+
+def current_commit():
+    """Return hash of current git commit, None if it's unknown"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path):
+    """Print time and memory of stages from two results files side by side"""
+    with open(old_path) as file:
+        old = {(r['scenario'], r['size'], r['stage']): r for r in json.load(file)['results']}
+    with open(new_path) as file:
+        new = json.load(file)['results']
+    print(f"{'scenario':>8} {'size':>8} {'stage':>10} {'old [s]':>9} {'new [s]':>9} {'ratio':>6} {'old [MB]':>9} {'new [MB]':>9}")
+    for result in new:
+        before = old.get((result['scenario'], result['size'], result['stage']))
+        if before is None:
+            continue
+        print(f"{result['scenario']:>8} {result['size']:>8} {result['stage']:>10} {before['seconds']:>9.3f} "
+              f"{result['seconds']:>9.3f} {result['seconds'] / before['seconds']:>6.2f} "
+              f"{before.get('peak_mb', float('nan')):>9.1f} {result.get('peak_mb', float('nan')):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark SOTA Visualisation Pack scripts on synthetic data')
+    parser.add_argument('--spots', type = int, nargs = '*', default = [1000, 10000], help = 'numbers of spots')
+    parser.add_argument('--qsos', type = int, nargs = '*', default = [1000, 10000, 100000], help = 'numbers of QSOs in log')
+    parser.add_argument('--summits', type = int, default = 180000, help = 'number of summits in SOTA database')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--latency', type = float, default = 0.0, help = 'latency of stand-in API in seconds')
+    parser.add_argument('--error-rate', type = float, default = 0.0, help = 'share of stand-in API requests failing')
+    parser.add_argument('--no-memory', action = 'store_true', help = 'skip memory profiling')
+    parser.add_argument('--output', help = 'results file (by default saved in benchmarks/results)')
+    parser.add_argument('--compare', nargs = 2, metavar = ('OLD', 'NEW'), help = 'compare two results files')
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = run(args.spots, args.qsos, args.summits, args.seed, args.latency, args.error_rate, not args.no_memory)
+    report = {
+        'commit': current_commit(),
+        'timestamp': datetime.utcnow().isoformat(timespec = 'seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'parameters': {'summits': args.summits, 'seed': args.seed, 'latency': args.latency, 'error_rate': args.error_rate},
+        'results': results,
+    }
+    output = args.output or os.path.join('benchmarks', 'results', f"{datetime.utcnow():%Y%m%d-%H%M%S}-{(report['commit'] or 'unknown')[:8]}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok = True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent = 2)
+    print(f'Results saved in {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark of map rendering - one GeoJSON layer against separate CircleMarker for every point
+
+Run from repository root: python -m benchmarks.bench_render [sizes...]
+"""
+import io # to silence warnings printed for unknown summits
+import sys # for command line arguments
+import time # for time measurements
+import numpy as np # for synthetic data generation
+import pandas as pd # for data analysis
+from datetime import datetime # for time calculations
+from contextlib import redirect_stdout # to silence warnings printed for unknown summits
+
+from spots_enrichment import enrich_spots
+from spots_visualiser import bands_df, modes_df, draw_spots_map
+from chaser_stats import ChaserStats
+from chasers_visualiser import draw_chasers_map
+from benchmarks.generators import synthetic_summits, synthetic_spots # synthetic SOTA data
+
+# tiles are not downloaded while rendering, so any tiles provider supported by Folium can be used
+TILES = 'OpenStreetMap'
+
+
+def chased_summits(n_summits, summits_df, seed = 0):
+    """Prepare summits chased as returned by get_chased_summits, with random number of chases"""
+    rng = np.random.default_rng(seed)
+    summits = summits_df.sample(n_summits, random_state = seed)
+    chases = dict(zip(summits.index, rng.integers(1, 20, n_summits).tolist()))
+    df_summits = pd.DataFrame({
+        'summitCode': summits.index.astype(str), 'name': summits['SummitName'].astype(str),
+        'latitude': summits['Latitude'].astype('float'), 'longitude': summits['Longitude'].astype('float'),
+        'points': summits['Points'].astype('int'), 'myChases': pd.Series(chases)}, index = summits.index)
+    df_summits['rel_Chases'] = df_summits['myChases'] / df_summits['myChases'].max()
+    return pd.DataFrame({'SOTA_REF': list(chases)}), df_summits, ChaserStats(chases, {'JO90': 10, 'JN99': 2})
+
+
+def render(draw):
+    """Render map to HTML, return time and size of the file"""
+    start = time.perf_counter()
+    html = draw().get_root().render()
+    return time.perf_counter() - start, len(html.encode())
+
+
+def main(sizes):
+    """Render spots and chasers maps in both modes for given numbers of points, print time and HTML size"""
+    summits_df = synthetic_summits(max(max(sizes), 20000))
+    print(f"{'map':>8} {'points':>8} {'markers [s]':>12} {'geojson [s]':>12} {'markers [MB]':>13} {'geojson [MB]':>13} {'smaller':>8}")
+    for n_points in sizes:
+        with redirect_stdout(io.StringIO()):
+            spots_df = enrich_spots(synthetic_spots(n_points, summits_df), summits_df, bands_df, modes_df, now = datetime.utcnow())[0]
+        df_log_summits, df_summits, chaser_stats = chased_summits(n_points, summits_df)
+        maps = (
+            ('spots', lambda render_mode: draw_spots_map(spots_df, tiles = TILES, render = render_mode)),
+            ('chasers', lambda render_mode: draw_chasers_map(df_log_summits, df_summits, chaser_stats, tiles = TILES, render = render_mode)),
+        )
+        for name, draw in maps:
+            markers_time, markers_size = render(lambda: draw('markers'))
+            geojson_time, geojson_size = render(lambda: draw('geojson'))
+            print(f'{name:>8} {n_points:>8} {markers_time:>12.3f} {geojson_time:>12.3f} {markers_size / 2 ** 20:>13.2f} '
+                  f'{geojson_size / 2 ** 20:>13.2f} {markers_size / geojson_size:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [1000, 10000])
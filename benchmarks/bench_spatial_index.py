@@ -0,0 +1,63 @@
+"""Benchmark of locators conversion and summits spatial index - converting locators of all QSOs one by one against
+converting them in a batch, and finding summits near a point by checking the whole SOTA database against the index
+
+Run from repository root: python -m benchmarks.bench_spatial_index [sizes...]
+"""
+import sys # for command line arguments
+import time # for time measurements
+import numpy as np # for columnar operations
+import maidenhead as mh # locators converted one by one, as done before
+from locators import to_locations
+from spatial_index import SummitIndex, distance_km
+from benchmarks.generators import summits_frame # synthetic SOTA data
+
+# chaser's locators - most QSOs are made from home
+LOCATORS = ['KO00AA'] * 8 + ['JO90XX', 'KN09AB', 'jo91sx', 'JN99ab']
+
+# points summits are looked for around, with radius in km (k nearest summits are found as well)
+QUERIES = [(50.0, 20.0, 10), (50.0, 20.0, 50), (46.5, 8.0, 250), (-33.9, 151.2, 1000)]
+NEAREST = 10
+
+
+def timer(function, repeat = 5):
+    """Run function repeat times, return its result with the best time in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main(sizes):
+    """Convert locators of given numbers of QSOs and query summits databases of the same sizes"""
+    print(f"{'size':>8} {'query':>22} {'scan [ms]':>10} {'index [ms]':>11} {'faster':>7}")
+    for size in sizes:
+        locators = np.array(LOCATORS)[np.random.default_rng(0).integers(0, len(LOCATORS), size)]
+        expected, scan_time = timer(lambda: [mh.to_location(locator) for locator in locators], repeat = 1)
+        (latitude, longitude), batch_time = timer(lambda: to_locations(locators))
+        assert np.allclose(np.column_stack([latitude, longitude]), expected)
+        print(f"{size:>8} {'locators':>22} {scan_time:>10.2f} {batch_time:>11.2f} {scan_time / batch_time:>6.0f}x")
+
+        summits_df = summits_frame(size)
+        start = time.perf_counter()
+        index = SummitIndex(summits_df['Latitude'], summits_df['Longitude'])
+        print(f"{size:>8} {'build index':>22} {'':>10} {(time.perf_counter() - start) * 1000:>11.2f}")
+        for latitude, longitude, radius in QUERIES:
+            def scan():
+                km = distance_km(latitude, longitude, summits_df['Latitude'].to_numpy(), summits_df['Longitude'].to_numpy())
+                return np.flatnonzero(km <= radius), np.argsort(km, kind = 'stable')[:NEAREST]
+            (within, nearest), scan_time = timer(scan)
+            (positions, _), within_time = timer(lambda: index.within(latitude, longitude, radius))
+            (nearest_positions, _), nearest_time = timer(lambda: index.nearest(latitude, longitude, NEAREST))
+            assert set(positions.tolist()) == set(within.tolist())
+            assert np.array_equal(np.sort(nearest_positions), np.sort(nearest))
+            print(f"{size:>8} {f'{radius} km ({len(positions)})':>22} {scan_time:>10.2f} {within_time:>11.2f} "
+                  f"{scan_time / within_time:>6.0f}x")
+            print(f"{size:>8} {f'{NEAREST} nearest':>22} {scan_time:>10.2f} {nearest_time:>11.2f} "
+                  f"{scan_time / nearest_time:>6.0f}x")
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [10000, 180000])
@@ -0,0 +1,132 @@
+"""Load test of spots stream - dashboard serving 1 to 1000 browsers connected to /spots/stream at once
+
+Dashboard runs in a separate process and downloads spots from local stand-in of SOTA API, where new spots
+appear every interval. For every number of clients, CPU time used by the dashboard process, requests sent
+to the stand-in and messages received by clients are measured over a few intervals.
+
+Run from repository root: python -m benchmarks.bench_stream [clients...] --interval 2
+"""
+import io # to silence messages printed by the dashboard
+import os # for file system operations
+import json # to keep summits database fresh
+import logging # to silence requests logged by the server
+import time # for time measurements
+import socket # clients connect with plain sockets
+import argparse # for command line arguments
+import selectors # to read from all clients in one thread
+import tempfile # for working directory of the dashboard
+import threading # to add new spots in background
+import multiprocessing # dashboard runs in its own process
+from contextlib import redirect_stdout # to silence messages printed by the dashboard
+
+from benchmarks.generators import summits_csv, summit_codes, spots_json # synthetic SOTA data
+from benchmarks.stand_in import SotaStandIn
+
+# new spots sent to the stand-in every interval
+NEW_SPOTS = 20
+
+
+def serve(connection, api_url, directory, interval):
+    """Run the dashboard with spots downloaded from stand-in every interval seconds (in child process),
+    answer requests for its CPU time sent through connection"""
+    from werkzeug.serving import make_server
+    from sota_api import SotaClient, get_spots
+    import spots_visualiser_dashboard as dashboard
+    os.chdir(directory)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    client = SotaClient(api_url)
+    with redirect_stdout(io.StringIO()):
+        dashboard.data = dashboard.DashboardData(fetch = lambda: get_spots(-1, client = client), interval = interval,
+                                                 snapshot_path = None)
+        server = make_server('127.0.0.1', 0, dashboard.create_app(), threaded = True)
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    connection.send(server.server_port)
+    with redirect_stdout(io.StringIO()):
+        while connection.recv() == 'cpu':
+            connection.send(time.process_time())
+
+
+def add_spots(api, codes, interval, stop):
+    """Add new spots to the stand-in every interval until stopped"""
+    next_id = len(api.spots) + 1
+    while not stop.wait(interval):
+        api.spots.extend(spots_json(NEW_SPOTS, codes, seed = next_id, first_id = next_id))
+        next_id += NEW_SPOTS
+
+
+class Clients:
+    """Browsers connected to the stream - they read all messages, counting events and bytes received"""
+
+    def __init__(self, port, n_clients):
+        self.selector = selectors.DefaultSelector()
+        self.events = 0
+        self.received = 0
+        for _ in range(n_clients):
+            client = socket.create_connection(('127.0.0.1', port))
+            client.sendall(b'GET /spots/stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n')
+            client.setblocking(False)
+            self.selector.register(client, selectors.EVENT_READ)
+
+    def read(self, seconds):
+        """Read messages for given number of seconds"""
+        end = time.perf_counter() + seconds
+        while (remaining := end - time.perf_counter()) > 0:
+            for key, _ in self.selector.select(remaining):
+                try:
+                    data = key.fileobj.recv(1 << 16)
+                except BlockingIOError:
+                    continue
+                self.received += len(data)
+                self.events += data.count(b'\nevent: ') + data.startswith(b'event: ')
+
+    def close(self):
+        for key in list(self.selector.get_map().values()):
+            self.selector.unregister(key.fileobj)
+            key.fileobj.close()
+
+
+def main(sizes, interval = 2, intervals = 3, n_spots = 300):
+    """Connect given numbers of clients to the dashboard, print resources used per interval"""
+    codes = summit_codes(20000)
+    with tempfile.TemporaryDirectory() as directory, SotaStandIn(spots = spots_json(n_spots, codes)) as api:
+        summits_csv(os.path.join(directory, 'summitslist.csv'), 20000)
+        # summits database has just been "downloaded", so the dashboard doesn't check SOTA for updates
+        with open(os.path.join(directory, 'summitslist.csv.meta.json'), 'w') as file:
+            json.dump({'checked': time.time()}, file)
+        stop = threading.Event()
+        threading.Thread(target = add_spots, args = (api, codes, interval, stop), daemon = True).start()
+        context = multiprocessing.get_context('spawn')
+        connection, child_connection = context.Pipe()
+        dashboard = context.Process(target = serve, args = (child_connection, api.api_url, directory, interval), daemon = True)
+        dashboard.start()
+        port = connection.recv()
+        print(f"{'clients':>8} {'API requests':>13} {'server CPU [s]':>15} {'events':>8} {'kB per client':>14}")
+        print(f"{'':>8} {'per interval':>13} {'per interval':>15} {'per client':>8} {'per interval':>14}")
+        try:
+            for n_clients in sizes:
+                clients = Clients(port, n_clients)
+                # clients get snapshot of spots first, only changes are measured
+                clients.read(interval)
+                clients.events = clients.received = 0
+                requests = api.requests
+                connection.send('cpu')
+                cpu = connection.recv()
+                clients.read(interval * intervals)
+                connection.send('cpu')
+                cpu = connection.recv() - cpu
+                print(f'{n_clients:>8} {(api.requests - requests) / intervals:>13.1f} {cpu / intervals:>15.3f} '
+                      f'{clients.events / n_clients:>8.1f} {clients.received / n_clients / intervals / 1024:>14.2f}')
+                clients.close()
+        finally:
+            stop.set()
+            connection.send('stop')
+            dashboard.join(5)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Load test of spots stream of the dashboard')
+    parser.add_argument('clients', nargs = '*', type = int, default = [1, 10, 100, 1000], help = 'numbers of clients connected')
+    parser.add_argument('--interval', type = float, default = 2, help = 'seconds between downloads of spots')
+    parser.add_argument('--intervals', type = int, default = 3, help = 'intervals measured')
+    args = parser.parse_args()
+    main(args.clients, args.interval, args.intervals)
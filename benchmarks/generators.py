@@ -0,0 +1,182 @@
+"""Seeded generators of synthetic SOTA data - spots, summits database and chaser's logs
+
+The same seed always gives the same data, so results of benchmarks run on different commits can be compared.
+"""
+import numpy as np # for synthetic data generation
+import pandas as pd # for data analysis
+from datetime import datetime, timedelta # for time calculations
+
+# spots frequencies - some of them outside bands and one in incorrect format, as sometimes sent by activators
+FREQUENCIES = [0.0, 3.55, 7.032, 10.118, 14.062, 18.1, 25.0, 28.5, 145.5, 300.0, 433.5, 1296.0]
+SPOT_FREQUENCIES = ['3.550', '7.032', '7.1855', '10.118', '14.062', '14.285', '18.1', '21.3', '28.5', '50.150', '145.500', '433.500', 'qrv']
+MODES = ['cw', 'SSB', 'fm', 'data', 'FT8', 'dv', 'am']
+ADIF_BANDS = [('3.550', '80M'), ('7.032', '40M'), ('10.118', '30M'), ('14.285', '20M'), ('18.100', '17M'),
+              ('21.300', '15M'), ('28.500', '10M'), ('145.500', '2M'), ('433.500', '70CM')]
+ADIF_MODES = ['CW', 'SSB', 'FM', 'FT8', 'AM']
+# names with local characters, so decoding and transliteration is exercised as with real data
+NAME_WORDS = ['Góra', 'Wierch', 'Śnieżka', 'Kopa', 'Hora', 'Vrch', 'Štít', 'Berg', 'Kogel', 'Pic', 'Monte', 'Ben']
+
+
+def summit_codes(n_summits):
+    """Generate unique summit codes in SOTA format (association/region-number), return list of them"""
+    return [f'A{i // 1000}/R{(i // 100) % 10}-{i % 100:03d}' for i in range(n_summits)]
+
+
+def summits_frame(n_summits = 20000, seed = 0, retired_every = 50):
+    """Generate SOTA summits database as DataFrame with columns of summitslist.csv"""
+    # every retired_every summit is retired (with end of validity date in the past)
+    rng = np.random.default_rng(seed)
+    codes = summit_codes(n_summits)
+    association = np.array([code.split('/')[0] for code in codes])
+    words = np.array(NAME_WORDS)[rng.integers(0, len(NAME_WORDS), n_summits)]
+    valid_to = np.full(n_summits, '31/12/2099', dtype = object)
+    valid_to[::retired_every] = '31/12/2015'
+    return pd.DataFrame({
+        'SummitCode': codes,
+        'AssociationName': [f'Association {name[1:]}' for name in association],
+        'RegionName': [f'Region {code.split("/")[1][:3]}' for code in codes],
+        'SummitName': [f'{word} {i}' for i, word in enumerate(words)],
+        'AltM': rng.integers(100, 4000, n_summits),
+        'AltFt': 0,
+        'GridRef1': 0,
+        'GridRef2': 0,
+        'Longitude': rng.uniform(-180, 180, n_summits).round(4),
+        'Latitude': rng.uniform(-60, 75, n_summits).round(4),
+        'Points': rng.integers(1, 11, n_summits),
+        'BonusPoints': 0,
+        'ValidFrom': '01/01/2010',
+        'ValidTo': valid_to,
+        'ActivationCount': rng.integers(0, 100, n_summits),
+        'ActivationDate': '01/01/2020',
+        'ActivationCall': 'SP9ABC',
+    })
+
+
+def summits_csv(path, n_summits = 180000, seed = 0, retired_every = 50):
+    """Write summitslist.csv in the same format as https://www.sotadata.org.uk/summitslist.csv, return DataFrame saved"""
+    summits_df = summits_frame(n_summits, seed, retired_every)
+    with open(path, 'w', encoding = 'utf-8', newline = '') as file:
+        # first line of the file is a title, header is in the second one
+        file.write('SOTA Summits List (Date=01/01/2026)\n')
+        summits_df.to_csv(file, index = False)
+    return summits_df
+
+
+def summit_json(summit):
+    """Convert summit (row of summits_frame) into dictionary as returned by SOTA API /api/summits/{code}"""
+    return {
+        'summitCode': summit['SummitCode'],
+        'name': summit['SummitName'],
+        'shortCode': summit['SummitCode'].split('/')[1],
+        'altM': int(summit['AltM']),
+        'regionName': summit['RegionName'],
+        'associationName': summit['AssociationName'],
+        'latitude': float(summit['Latitude']),
+        'longitude': float(summit['Longitude']),
+        'points': int(summit['Points']),
+        'validFrom': summit['ValidFrom'],
+        'validTo': summit['ValidTo'],
+    }
+
+
+def synthetic_summits(n_summits = 20000, seed = 0):
+    """Generate SOTA Database extract indexed by SummitCode, as loaded from summitslist.csv"""
+    summits_df = summits_frame(n_summits, seed)
+    summits_df = summits_df[['SummitCode', 'SummitName', 'Longitude', 'Latitude', 'Points']].astype({
+        'SummitCode': 'string', 'SummitName': 'string'})
+    return summits_df.set_index('SummitCode')
+
+
+def spots_json(n_spots, codes, seed = 0, now = None, unknown = 0.03, first_id = 1):
+    """Generate spots as returned by SOTA API /api/spots/{n}/all - list of dictionaries sent in the last hour"""
+    # unknown share of spots refers to summits missing in SOTA database
+    rng = np.random.default_rng(seed)
+    now = now if now is not None else datetime.utcnow()
+    summits = np.asarray(codes, dtype = object)[rng.integers(0, len(codes), n_spots)]
+    summits[rng.random(n_spots) < unknown] = 'ZZ/XX-999'
+    minutes = np.sort(rng.uniform(0, 59, n_spots))
+    frequencies = rng.choice(SPOT_FREQUENCIES, n_spots)
+    modes = rng.choice(MODES, n_spots)
+    activators = rng.integers(0, max(n_spots // 3, 1), n_spots)
+    spots = []
+    for i in range(n_spots):
+        association, summit = summits[i].split('/')
+        spots.append({
+            'id': first_id + i,
+            'userID': 0,
+            'timeStamp': (now - timedelta(minutes = float(minutes[i]))).isoformat(),
+            'comments': 'tnx qso',
+            'callsign': f'SP{activators[i] + 1}ZZZ',
+            'associationCode': association,
+            'summitCode': summit,
+            'activatorCallsign': f'sp{activators[i]}abc/p',
+            'activatorName': 'Jan',
+            'frequency': frequencies[i],
+            'mode': modes[i],
+            'summitDetails': f'Summit {summits[i]}',
+            'highlightColor': None,
+        })
+    return spots
+
+
+def synthetic_spots(n_spots, summits_df, seed = 0):
+    """Generate spots DataFrame as prepared by the spots scripts, with ~3% unknown summits"""
+    rng = np.random.default_rng(seed)
+    codes = np.asarray(summits_df.index, dtype = object)[rng.integers(0, len(summits_df), n_spots)]
+    unknown = rng.random(n_spots) < 0.03
+    codes[unknown] = 'ZZ/XX-999'
+    association, summit_code = zip(*(code.split('/') for code in codes))
+    now = datetime.utcnow()
+    spots_df = pd.DataFrame({
+        'activatorCallsign': pd.array([f'sp{i}abc/p' for i in range(n_spots)], dtype = 'string'),
+        'associationCode': pd.array(association, dtype = 'string'),
+        'summitCode': pd.array(summit_code, dtype = 'string'),
+        'mode': pd.array(rng.choice(['cw', 'SSB', 'fm', 'data', 'FT8', 'dv'], n_spots), dtype = 'string'),
+        'frequency': rng.choice(FREQUENCIES, n_spots),
+        'timeStamp': pd.Series([now - timedelta(minutes = float(m)) for m in rng.uniform(0, 60, n_spots)]),
+    })
+    spots_df['summit'] = spots_df['associationCode'] + '/' + spots_df['summitCode']
+    return spots_df
+
+
+def adif_field(name, value):
+    """Format ADIF field, length is given in bytes"""
+    return f'<{name}:{len(value.encode("cp1250", errors = "replace"))}>{value}'
+
+
+def adif_log(path, n_qsos, codes, seed = 0, sota_share = 0.4, extra_codes = (), locators = ('KO00AA', 'JO90XX', 'KN09AB')):
+    """Write chaser's ADIF log with n_qsos QSOs, return number of SOTA chases in it"""
+    # sota_share of QSOs have SOTA_REF field, picked from codes (and extra_codes - e.g. summits missing in local
+    # database), other QSOs are regular ones without SOTA reference
+    # the first locator is the most common one (home QTH)
+    rng = np.random.default_rng(seed)
+    references = list(codes) + list(extra_codes)
+    # chases are concentrated on a part of summits, as in real logs
+    chased = np.asarray(references, dtype = object)[rng.integers(0, len(references), max(n_qsos // 10, 1))]
+    sota = rng.random(n_qsos) < sota_share
+    summits = chased[rng.integers(0, len(chased), n_qsos)]
+    locator = np.asarray(locators)[np.minimum(rng.geometric(0.7, n_qsos) - 1, len(locators) - 1)]
+    band = rng.integers(0, len(ADIF_BANDS), n_qsos)
+    mode = np.asarray(ADIF_MODES)[rng.integers(0, len(ADIF_MODES), n_qsos)]
+    days = rng.integers(0, 3650, n_qsos)
+    start = datetime(2015, 1, 1)
+    with open(path, 'w', encoding = 'cp1250', errors = 'replace', newline = '\n') as file:
+        file.write('Synthetic log generated for benchmarks\n<ADIF_VER:5>3.1.0 <PROGRAMID:9>benchmark\n<EOH>\n\n')
+        for i in range(n_qsos):
+            frequency, band_name = ADIF_BANDS[band[i]]
+            fields = [
+                adif_field('STATION_CALLSIGN', 'SQ9ZZZ'),
+                adif_field('MY_GRIDSQUARE', locator[i]),
+                adif_field('CALL', f'SP{i % 997}ABC/P'),
+                adif_field('QTH', 'Łódź' if i % 7 == 0 else 'Krakow'),
+                adif_field('FREQ', frequency),
+                adif_field('BAND', band_name),
+                adif_field('MODE', mode[i]),
+                adif_field('QSO_DATE', (start + timedelta(days = int(days[i]))).strftime('%Y%m%d')),
+                adif_field('TIME_ON', '083500'),
+            ]
+            if sota[i]:
+                # references are sometimes written in lower case
+                fields.append(adif_field('SOTA_REF', summits[i].lower() if i % 11 == 0 else summits[i]))
+            file.write(' '.join(fields) + ' <EOR>\n')
+    return int(sota.sum())
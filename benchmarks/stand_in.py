@@ -0,0 +1,114 @@
+"""Local stand-in of SOTA API - serves summits and spots endpoints with configurable latency and error rate
+
+    with SotaStandIn(summits = {...}, spots = [...], latency = 0.05, error_rate = 0.01) as api:
+        get_spots(client = SotaClient(api.api_url))
+"""
+import gzip # to compress answers
+import json # to send API answers
+import hashlib # to calculate ETags
+import time # to simulate latency
+import random # to simulate errors
+import threading # to serve requests in background
+from datetime import datetime, timedelta # to select spots from requested timeframe
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler # for local HTTP server
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answer SOTA API requests with data kept by SotaStandIn"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        api = self.server.stand_in
+        status, answer = api.answer(self.path)
+        body = json.dumps(answer).encode() if answer is not None else b''
+        # answers have ETag, so clients may ask if they have changed, and are compressed if client accepts it
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            api.not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if status == 200:
+            self.send_header('ETag', etag)
+        if 'gzip' in self.headers.get('Accept-Encoding', '') and len(body) > 1024:
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SotaStandIn:
+    """HTTP server answering /api/summits/{code} and /api/spots/{n}/all like SOTA API"""
+
+    def __init__(self, summits = None, spots = None, latency = 0.0, error_rate = 0.0, seed = 0):
+        # summits is a dictionary summit code: summit data, spots - list of spots (as returned by SOTA API)
+        # every answer is delayed by latency seconds, error_rate of requests fail with HTTP 503 error
+        self.summits = summits if summits is not None else {}
+        self.spots = spots if spots is not None else []
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    @property
+    def api_url(self):
+        return f'{self.url}/api/'
+
+    def answer(self, path):
+        """Prepare answer for requested path, return tuple (HTTP status, data)"""
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return 503, None
+        parts = path.split('?')[0].strip('/').split('/')
+        if parts[:2] == ['api', 'summits'] and len(parts) == 4:
+            # summit not found in SOTA database is returned as an empty answer
+            return 200, self.summits.get(f'{parts[2]}/{parts[3]}'.upper(), '')
+        if parts[:2] == ['api', 'spots'] and len(parts) == 4:
+            return 200, self.select_spots(int(parts[2]))
+        return 404, None
+
+    def select_spots(self, time):
+        """Select spots like SOTA API - sent in the last -time hours if time is negative, latest time spots otherwise"""
+        if time > 0:
+            return sorted(self.spots, key = lambda spot: spot['timeStamp'], reverse = True)[:time]
+        since = (datetime.utcnow() - timedelta(hours = -time)).isoformat()
+        return [spot for spot in self.spots if spot['timeStamp'] >= since]
+
+    def start(self):
+        """Start server in background thread on a free port"""
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        threading.Thread(target = self._server.serve_forever, name = 'sota-stand-in', daemon = True).start()
+        return self
+
+    def stop(self):
+        """Stop server"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
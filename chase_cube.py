@@ -0,0 +1,133 @@
+import os # for file system operations
+import json # to save metadata of the cube
+import numpy as np # for columnar operations
+import pandas as pd # to aggregate chases
+from chaser_stats import LogAggregate, update_aggregate # to keep locators and update the cube like statistics
+from summit_resolver import base_callsign # to count chases of activator regardless of prefixes and suffixes
+from metrics import timed # to measure time of cube queries
+
+# version of saved cube format - change it whenever cube saved changes
+CUBE_VERSION = 1
+
+# dimensions of the cube - chases are counted for every combination of them found in the log
+# (points of a summit come from SOTA Database, so they're filtered by summit)
+DIMENSIONS = ('year', 'band', 'mode', 'association', 'activator', 'summit')
+
+
+def categories(values, convert = None):
+    """Return codes and labels of log column (converted with given function), missing values get empty label"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, labels = values.cat.codes.to_numpy(), list(values.cat.categories)
+    else:
+        codes, labels = pd.factorize(values)
+    labels = [convert(label) if convert else str(label) for label in labels]
+    # missing values have code -1, so they point at the last label
+    return codes, labels + ['']
+
+
+def log_dimensions(log_df):
+    """Find dimensions of every chase in DataFrame with QSOs (as returned by read_chases), return dictionary
+    dimension: (codes, labels) - labels are calculated only once for every distinct value of the log"""
+    dimensions = {}
+    n_chases = len(log_df)
+    summit_codes, summits = categories(log_df['SOTA_REF'])
+    dimensions['summit'] = summit_codes, summits
+    dimensions['association'] = summit_codes, [summit.split('/')[0] for summit in summits]
+    if 'QSO_DATE' in log_df:
+        years = log_df['QSO_DATE'].dt.year.astype('Int64')
+        dimensions['year'] = categories(years.astype('string'))
+    for dimension, field, convert in (('band', 'BAND', str.lower), ('mode', 'MODE', str.upper), ('activator', 'CALL', base_callsign)):
+        if field in log_df:
+            dimensions[dimension] = categories(log_df[field], convert)
+    # fields missing in the whole log are counted with empty label
+    for dimension in DIMENSIONS:
+        dimensions.setdefault(dimension, (np.full(n_chases, -1), ['']))
+    return dimensions
+
+
+class ChaseCube(LogAggregate):
+    """Chases of the log aggregated by year, band, mode, association, activator and summit, with QSOs per chaser's locator
+
+    Every cell of the cube is a combination of dimensions found in the log with number of chases, dimensions are kept
+    as codes of labels, so any slice is a lookup over cells only - the log is never read again."""
+
+    def __init__(self, labels = None, codes = None, counts = None, locators = None, offset = 0, checksum = None):
+        super().__init__(locators, offset, checksum)
+        self.labels = labels if labels is not None else {dimension: [] for dimension in DIMENSIONS}
+        self.codes = codes if codes is not None else {dimension: np.zeros(0, dtype = 'int32') for dimension in DIMENSIONS}
+        self.counts = counts if counts is not None else np.zeros(0, dtype = 'int64')
+
+    def __len__(self):
+        return len(self.counts)
+
+    def merge(self, log_df):
+        """Add chases and locators from DataFrame with QSOs (as returned by read_chases) to the cube"""
+        self.merge_locators(log_df)
+        if len(log_df) == 0:
+            return
+        # codes of the log are translated into codes of the cube (new labels are added at the end),
+        # then cells of the cube and chases of the log are aggregated together
+        cells = {}
+        for dimension, (codes, labels) in log_dimensions(log_df).items():
+            index = {label: code for code, label in enumerate(self.labels[dimension])}
+            translation = np.array([index.setdefault(label, len(index)) for label in labels], dtype = 'int32')
+            self.labels[dimension] = list(index)
+            cells[dimension] = np.concatenate([self.codes[dimension], translation[codes]])
+        cells['count'] = np.concatenate([self.counts, np.ones(len(log_df), dtype = 'int64')])
+        cube = pd.DataFrame(cells).groupby(list(DIMENSIONS), sort = False)['count'].sum().reset_index()
+        self.codes = {dimension: cube[dimension].to_numpy(dtype = 'int32') for dimension in DIMENSIONS}
+        self.counts = cube['count'].to_numpy(dtype = 'int64')
+
+    def select(self, **selected):
+        """Find cells of chases on selected labels of dimensions, e.g. select(band = ['20m'], year = ['2023']),
+        return boolean mask of cells - dimensions not given (or None) are not filtered"""
+        mask = np.ones(len(self), dtype = bool)
+        for dimension, labels in selected.items():
+            if labels is None:
+                continue
+            # labels are checked once, cells only look up their code
+            allowed = np.isin(np.asarray(self.labels[dimension], dtype = object), list(labels))
+            mask &= allowed[self.codes[dimension]]
+        return mask
+
+    @timed('cube_query')
+    def totals(self, by = 'summit', **selected):
+        """Count chases on selected labels of dimensions by labels of one dimension (summit by default),
+        return array of counts for every label of the dimension"""
+        mask = self.select(**selected)
+        return np.bincount(self.codes[by][mask], self.counts[mask], minlength = len(self.labels[by])).astype('int64')
+
+    def query(self, by = 'summit', **selected):
+        """Count chases like totals, return Series of counts (without labels never chased) sorted by label"""
+        counts = self.totals(by, **selected)
+        chased = np.flatnonzero(counts)
+        return pd.Series(counts[chased], index = pd.Index(np.asarray(self.labels[by], dtype = object)[chased], name = by)).sort_index()
+
+    def save(self, path):
+        """Write cube to numpy .npz file"""
+        meta = {'version': CUBE_VERSION, 'offset': self.offset, 'checksum': self.checksum,
+                'labels': self.labels, 'locators': self.locators}
+        with open(f'{path}.tmp', 'wb') as file:
+            np.savez(file, meta = np.array(json.dumps(meta)), counts = self.counts, **self.codes)
+        os.replace(f'{path}.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        """Read cube from .npz file, return empty cube if file is missing or outdated"""
+        try:
+            with np.load(path) as saved:
+                meta = json.loads(str(saved['meta']))
+                if meta.get('version') != CUBE_VERSION:
+                    return cls()
+                codes = {dimension: saved[dimension] for dimension in DIMENSIONS}
+                counts = saved['counts']
+        except (OSError, ValueError, KeyError):
+            return cls()
+        return cls(meta['labels'], codes, counts, meta['locators'], meta['offset'], meta['checksum'])
+
+
+def update_chase_cube(filename, cube_path = None):
+    """Update cube of chaser's log with QSOs appended since last run, return ChaseCube"""
+    # cube is saved next to the log (e.g. SOTAlog.adi.cube.npz) and updated the same way as statistics
+    # of chasers_visualiser.py - only records appended to unchanged log are read, edited log is read again
+    return update_aggregate(filename, ChaseCube, '.cube.npz', cube_path)
@@ -0,0 +1,114 @@
+import os # for file system operations
+import json # to save statistics
+import hashlib # to detect changes in already processed part of the log
+from adif_stream import read_chases # to read the log
+
+# version of saved statistics format - change it whenever statistics saved change
+STATS_VERSION = 1
+
+
+def prefix_hash(path, end, start = 0, checksum = None):
+    """Calculate sha256 checksum of file bytes from start to end offset, continuing given checksum if provided"""
+    checksum = hashlib.sha256() if checksum is None else checksum
+    with open(path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = file.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            checksum.update(chunk)
+            remaining -= len(chunk)
+    return checksum
+
+
+def add_counts(counts, values):
+    """Add numbers of QSOs of every value of log column (Series) to dictionary value: count"""
+    # counts are calculated with one grouped aggregation of the column
+    for value, count in values.value_counts().items():
+        if count > 0:
+            counts[value] = counts.get(value, 0) + int(count)
+
+
+class LogAggregate:
+    """Base of aggregates of chaser's log updated with QSOs appended since last run (ChaserStats, ChaseCube) -
+    keeps QSOs per chaser's locator and the part of the log already processed"""
+
+    def __init__(self, locators = None, offset = 0, checksum = None):
+        # offset is the end of the last record already processed, checksum is sha256 of the log up to offset
+        self.locators = locators if locators is not None else {}
+        self.offset = offset
+        self.checksum = checksum if checksum is not None else hashlib.sha256().hexdigest()
+
+    @property
+    def home_QTH(self):
+        """Most common chaser's locator (home QTH), None if there are no locators in the log"""
+        return max(self.locators, key = self.locators.get) if self.locators else None
+
+    def merge_locators(self, log_df):
+        """Add chaser's locators from DataFrame with QSOs (as returned by read_chases)"""
+        if 'MY_GRIDSQUARE' in log_df:
+            add_counts(self.locators, log_df['MY_GRIDSQUARE'])
+
+
+class ChaserStats(LogAggregate):
+    """Aggregated statistics of chaser's log - chases per summit and QSOs per chaser's locator"""
+
+    def __init__(self, chases = None, locators = None, offset = 0, checksum = None):
+        super().__init__(locators, offset, checksum)
+        self.chases = chases if chases is not None else {}
+
+    def merge(self, log_df):
+        """Add chases and locators from DataFrame with QSOs (as returned by read_chases) to statistics"""
+        if 'SOTA_REF' in log_df:
+            add_counts(self.chases, log_df['SOTA_REF'])
+        self.merge_locators(log_df)
+
+    def save(self, path):
+        """Write statistics to JSON file"""
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump({'version': STATS_VERSION, 'offset': self.offset, 'checksum': self.checksum,
+                       'chases': self.chases, 'locators': self.locators, 'home_QTH': self.home_QTH}, file)
+        os.replace(f'{path}.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        """Read statistics from JSON file, return empty statistics if file is missing or outdated"""
+        try:
+            with open(path) as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return cls()
+        if saved.get('version') != STATS_VERSION:
+            return cls()
+        return cls(saved['chases'], saved['locators'], saved['offset'], saved['checksum'])
+
+
+def update_aggregate(filename, aggregate_class, suffix, path = None):
+    """Update aggregate of chaser's log (LogAggregate subclass) with QSOs appended since last run, return it"""
+    # aggregate is saved next to the log (path is the log's name with suffix, e.g. SOTAlog.adi.stats.json) together
+    # with the offset of log's part already processed and its checksum - if this part is unchanged, only records
+    # appended after it are read, otherwise (log was edited or replaced) aggregate is rebuilt from the whole log
+    if path is None:
+        path = f'{filename}{suffix}'
+    aggregate = aggregate_class.load(path)
+    checksum = None
+    if aggregate.offset > 0:
+        if os.path.getsize(filename) >= aggregate.offset:
+            checksum = prefix_hash(filename, aggregate.offset)
+        if checksum is None or checksum.hexdigest() != aggregate.checksum:
+            print(f'Log has changed since last run, {os.path.basename(path)} is rebuilt.')
+            aggregate, checksum = aggregate_class(), None
+
+    log_df, offset = read_chases(filename, start = aggregate.offset)
+    aggregate.merge(log_df)
+    aggregate.checksum = prefix_hash(filename, offset, aggregate.offset, checksum).hexdigest()
+    aggregate.offset = offset
+    aggregate.save(path)
+    return aggregate
+
+
+def update_chaser_stats(filename, stats_path = None):
+    """Update statistics of chaser's log with QSOs appended since last run, return ChaserStats"""
+    # statistics are saved next to the log, e.g. SOTAlog.adi.stats.json
+    return update_aggregate(filename, ChaserStats, '.stats.json', stats_path)
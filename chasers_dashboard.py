@@ -0,0 +1,170 @@
+import numpy as np # for columnar operations
+from flask import Response # to serve metrics
+from dash import html, dcc, Dash, Input, Output # for dashboard construction
+import dash_leaflet as dl # to visualise map
+import os # to check if local summits database is available
+from chase_cube import update_chase_cube # to slice chases of the log
+from chaser_stats import ChaserStats # to resolve summits chased
+from chasers_visualiser import get_chased_summits, get_unchased_summits, unchased_popups, points_colormap # summits data and colors shared with the static map
+from locators import to_location, to_locations # to calculate coordinates from GRID square
+from summits_db import load_summits # for loading SOTA summits database
+from geojson_layer import circle_features # summits are drawn as circles, like on the static map
+from metrics import REGISTRY, CALLBACK_SECONDS, timed # to measure dashboard performance
+
+# deploy chasers_dashboard app in Dash
+chasers_dashboard = Dash(__name__)
+
+
+class ChasesData:
+    """Chases cube of the log with data of all summits chased, aligned with summit labels of the cube"""
+
+    def __init__(self, filename = 'SOTAlog.adi', summits_csv = 'summitslist.csv', cache_path = 'summits_api_cache.json'):
+        # chases are aggregated once per log into a cube saved next to it (e.g. SOTAlog.adi.cube.npz),
+        # so next runs read only QSOs appended to the log, and every filter is a lookup over cells of the cube
+        self.cube = update_chase_cube(filename)
+        chases = dict(zip(self.cube.labels['summit'], self.cube.totals().tolist()))
+        # summits are resolved once (local SOTA database first, then SOTA API), summits not found are not shown
+        _, df_summits = get_chased_summits(ChaserStats({summit: count for summit, count in chases.items() if count},
+                                                       self.cube.locators), summits_csv, cache_path)
+        df_summits = df_summits.reindex(self.cube.labels['summit'])
+        self.found = df_summits['latitude'].notna().to_numpy()
+        self.latitude = df_summits['latitude'].to_numpy(dtype = 'float')
+        self.longitude = df_summits['longitude'].to_numpy(dtype = 'float')
+        self.points = df_summits['points'].fillna(0).to_numpy(dtype = 'int')
+        self.names = (df_summits.index.astype(str) + ',\n' + df_summits['name'].astype(str)).to_numpy(dtype = object)
+        # colors are calculated once for every points value
+        summit_points = points_colormap()
+        self.colors = np.array([summit_points(points) for points in range(11)], dtype = object)[np.clip(self.points, 0, 10)]
+        self.years = [int(year) for year in self.options('year')]
+        # summits near home QTH not chased yet are found once in spatial index of SOTA database
+        unchased = get_unchased_summits(self.cube.home_QTH, [summit for summit, count in chases.items() if count],
+                                        load_summits(summits_csv) if os.path.exists(summits_csv) else None)
+        self.unchased_geojson = circle_features(unchased['Latitude'], unchased['Longitude'], [4] * len(unchased),
+                                                ['lightgray'] * len(unchased), unchased_popups(unchased),
+                                                ['gray'] * len(unchased)) if unchased is not None else None
+
+    def options(self, dimension):
+        """Labels of dimension found in the log (without empty one), sorted"""
+        return sorted(label for label in self.cube.query(by = dimension).index if label)
+
+    def summits_geojson(self, points = (1, 10), **selected):
+        """Count chases of every summit on selected labels of dimensions, return summits chased with points in
+        given range as GeoJSON (circles sized by number of chases, colored by points), with summary of them"""
+        counts = self.cube.totals(**selected)
+        shown = np.flatnonzero((counts > 0) & self.found & (self.points >= points[0]) & (self.points <= points[1]))
+        counts = counts[shown]
+        radius = 20 * counts / counts.max() if len(counts) else counts
+        popup = self.names[shown] + '\n' + counts.astype(str) + ' QSOs'
+        geojson = circle_features(self.latitude[shown], self.longitude[shown], radius, self.colors[shown], popup)
+        summary = f'{int(counts.sum())} chases of {len(shown)} summits ({int(self.points[shown].sum())} points)'
+        return geojson, summary
+
+
+# data of the dashboard - cube of the log, loaded by create_app()
+data = None
+
+
+def generate_maps(summits_geojson, locators, home_QTH, unchased_geojson = None):
+    """Generate an input for dl.Map object - summits chased, summits near home not chased yet and chaser's locations"""
+    layers = [
+        dl.TileLayer(), # background layer
+        dl.GeoJSON(
+            data = unchased_geojson or {'type': 'FeatureCollection', 'features': []}, # add layer with summits near home not chased yet
+            pointToLayer = {'variable': 'dashExtensions.chasers.pointToLayer'},
+            id = 'unchased_layer',
+        ),
+        dl.GeoJSON(
+            data = summits_geojson, # add layer with summits chased
+            pointToLayer = {'variable': 'dashExtensions.chasers.pointToLayer'}, # summits are drawn as circles
+            id = 'summits_layer',
+        ),
+    ]
+    # add home marker and other chaser's locations to map - all locators are converted at once, locators not valid are skipped
+    latitude, longitude = to_locations(list(locators))
+    for locator, lat, lon in zip(locators, latitude, longitude):
+        if np.isnan(lat):
+            continue
+        location = [float(lat), float(lon)]
+        if locator == home_QTH:
+            layers.append(dl.Marker(position = location, children = dl.Popup(f'home QTH: {locator}')))
+        else:
+            layers.append(dl.CircleMarker(center = location, radius = 5, color = 'dodgerblue', fillOpacity = 1, weight = 0,
+                                          children = dl.Popup('field QTH')))
+    return layers
+
+def serve_layout():
+    """Generate Dash app layout with filters of chases and map of summits chased"""
+    years = data.years or [0]
+    summits_geojson, summary = data.summits_geojson()
+    home = to_location(data.cube.home_QTH) if data.cube.home_QTH is not None else None
+    if home is not None:
+        map_center = list(home)
+    elif summits_geojson['features']:
+        # if there is no chaser's location - center a map on most chased summit
+        summit = max(summits_geojson['features'], key = lambda feature: feature['properties']['radius'])
+        map_center = summit['geometry']['coordinates'][::-1]
+    else:
+        map_center = [50, 20]
+    return html.Div([
+        html.Div([
+            dcc.RangeSlider(min(years), max(years), 1, value = [min(years), max(years)], id = 'years_selection',
+                            marks = {year: str(year) for year in years}), # years of chases
+            dcc.RangeSlider(1, 10, 1, value = [1, 10], id = 'points_selection'), # summit's points
+        ]),
+        # other dimensions are selected in dropdown lists - nothing selected means all
+        *[html.Div(dcc.Dropdown(data.options(dimension), [], multi = True, placeholder = placeholder, id = f'{dimension}_selection'))
+          for dimension, placeholder in (('band', 'All bands'), ('mode', 'All modes'), ('association', 'All associations'),
+                                         ('activator', 'All activators'))],
+        html.Div(summary, id = 'chases_summary'),
+        dl.Map(
+            children = generate_maps(summits_geojson, data.cube.locators, data.cube.home_QTH, data.unchased_geojson),
+            zoom = 9,
+            center = map_center,
+            style = {"height": "100vh"},
+            id = 'chasers_map',
+        ),
+    ])
+
+# summits on the map and summary are counted from the cube whenever user changes any filter
+@chasers_dashboard.callback(
+    Output('summits_layer', 'data'),
+    Output('chases_summary', 'children'),
+    Input('years_selection', 'value'),
+    Input('points_selection', 'value'),
+    Input('band_selection', 'value'),
+    Input('mode_selection', 'value'),
+    Input('association_selection', 'value'),
+    Input('activator_selection', 'value'),
+    prevent_initial_call = True
+    )
+@timed('update_chases', CALLBACK_SECONDS, 'callback')
+def update_chases(years, points, bands, modes, associations, activators):
+    """Return summits chased on selected years, points, bands, modes, associations and activators with summary of them"""
+    # QSOs without date are counted only when all years are selected
+    selected_years = None if not data.years or years == [min(data.years), max(data.years)] else \
+        [str(year) for year in range(years[0], years[1] + 1)]
+    return data.summits_geojson(points, year = selected_years, band = bands or None, mode = modes or None,
+                                association = associations or None, activator = activators or None)
+
+# performance metrics of the dashboard in Prometheus text format
+@chasers_dashboard.server.route('/metrics')
+def serve_metrics():
+    """Return metrics of the dashboard in Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype = 'text/plain; version=0.0.4')
+
+
+def create_app(filename = 'SOTAlog.adi', summits_csv = 'summitslist.csv', cache_path = 'summits_api_cache.json'):
+    """Load chases of the log and prepare the dashboard to serve, return its Flask server (e.g. for gunicorn)"""
+    global data
+    data = ChasesData(filename, summits_csv, cache_path)
+    # define Dash app layout
+    chasers_dashboard.layout = serve_layout
+    return chasers_dashboard.server
+
+
+# deploy the dashboard
+if __name__ == '__main__':
+    # save name of your log under filename variable
+    filename = 'SOTAlog.adi'
+    create_app(filename)
+    chasers_dashboard.run(port=8051, debug=True)
@@ -1,150 +1,210 @@
-import adif_io as adif # to read the log
+import os # to check if local summits database is available
 import pandas as pd # to analyse log as a DataFrame
-import requests # to get data from SOTA API
-from unidecode import unidecode # for log clearing
 import folium # for data visualisation on a map
-import maidenhead as mh # to calculate coordinates from GRID square
+from locators import to_location, to_locations # to calculate coordinates from GRID square
 import branca.colormap as cm # to add colormap to the visualisation
-
-# save name of your log under filename variable
-filename = 'SOTAlog.adi'
-working_log = 'working_log.adi'
-
-# clear the log out of local charts (accents) by changing them into the closes latin one
-# log file is opened, modified and then saved under the name specified in working_log variable
-with open(filename, 'r', encoding='ansi') as filelog:
-    content = unidecode(filelog.read())
-filelog.close()
-with open(working_log, 'w') as filelog:
-    filelog.write(content)
-filelog.close()
-
-# load log into the variable log_raw, log_header stores header of ADIF file
-log_raw,log_header = adif.read_from_file(working_log)
-
-# convert the log into DataFrame df_log_raw
-df_log_raw = pd.DataFrame(log_raw)
-
-# check if there are any SOTA chases in log
-if df_log_raw['SOTA_REF'].count() == 0:
-    print('No SOTA chases found in log.')
-    exit()
-else:
-    df_log_raw['SOTA_REF'] = df_log_raw['SOTA_REF'].str.upper()
-
-# data filtering - move to further analysis only entries with SOTA reference provided in SOTA_REF column
-df_log_SOTA = df_log_raw[df_log_raw.SOTA_REF.notnull()]
-
-# check which SOTA summits are present in the log and remove duplicates
-df_log_summits = df_log_SOTA['SOTA_REF'].copy().drop_duplicates().reset_index()
-del(df_log_summits['index'])
-
-# import relevant summits data from SOTA API and save them as DataFrame
-
-summits_dict = {}
-errors_dict = {}
-url = 'https://api2.sota.org.uk/api/summits/'
-
-for summit in df_log_summits['SOTA_REF']:
-    summit_url = f"{url}{summit}"
-    try:
-        r = requests.get(summit_url)
-        print(f'Status code: {r.status_code} for {summit}')
-        summits_dict[summit] = r.json()
-# if errors occur (summit from the log was not found in SOTA database, it's saved in a dictionary,
-    except Exception:
-        errors_dict[summit] = r.status_code
-        pass
-
-df_summits = pd.DataFrame(summits_dict)
-
-# user is being notified about summits where errors occured and entries with them are removed from summits list for visualisation
-if errors_dict:
-    print(f'\nFollowing errors were reported - QSO will be not included')
-    for summit in errors_dict.keys():
-        print(f'Error {errors_dict[summit]} for {summit}.')
-        df_log_summits = df_log_summits.loc[df_log_summits['SOTA_REF'] != summit]
-
-# save number of chases for each summit (from log) in myChases field in DataFrame
-for summit in df_log_summits['SOTA_REF']:
-    df_summits[summit]['myChases'] = df_log_SOTA[['SOTA_REF']][df_log_SOTA['SOTA_REF'] == summit].count()[0]
-
-# transpose df_summits dataframe for easier visualisation
-df_summits_transposed = df_summits.transpose(copy = True)
-
-# change data type for Series important for visualisation (summits coordinates, SOTA points and number of chases)
-# for numeric format
-df_summits_transposed['latitude'] = df_summits_transposed['latitude'].astype('float')
-df_summits_transposed['longitude'] = df_summits_transposed['longitude'].astype('float')
-df_summits_transposed['myChases'] = df_summits_transposed['myChases'].astype('int')
-df_summits_transposed['points'] = df_summits_transposed['points'].astype('int')
-
-# list chaser's positions from GRID square and re-calculate them into coordinates
-
-# prepare list of my chasing locations if any
-# if there's location saved as GRID Square reference - use it to determine coordinates and set map center
-# on the most common locator (home QTH)
-# if there is no chaser's location - center a map on most chased summit
-my_coordinates = []
-
-if ('MY_GRIDSQUARE' in df_log_SOTA) == True:
-    for locator in df_log_SOTA['MY_GRIDSQUARE'].drop_duplicates():
-            my_coordinates.append(list(mh.to_location(locator)))
-    home_QTH = list(mh.to_location(df_log_SOTA['MY_GRIDSQUARE'].value_counts().idxmax()))
-    map_center = home_QTH
-else:
-    map_center = [df_summits_transposed['latitude'][df_summits_transposed['myChases'].idxmax()],
-    df_summits_transposed['longitude'][df_summits_transposed['myChases'].idxmax()]]
-
-# add column rel_Chases to df_summits_transposed DataFrame with relative number of chasers for a summit
-df_summits_transposed['rel_Chases'] = df_summits_transposed['myChases'] / df_summits_transposed['myChases'].max()
-
-
-# set-up a colormap to visuelize summit's points (between 1 and 10)
-summit_points = cm.LinearColormap(colors=['magenta', 'orange','red'], index=[1,5,10],vmin=1,vmax=10).to_step(10)
-
-# create a map with Folium
-chasers_map = folium.Map(location=map_center,
-                         tiles="Stamen Terrain",
-                         zoom_start=9)
-
-# add summits to a map
-for summit in df_log_summits['SOTA_REF']:
-    folium.CircleMarker(
-    location = [df_summits_transposed['latitude'][summit], df_summits_transposed['longitude'][summit]],
-    radius = 20*df_summits_transposed['rel_Chases'][summit],
-    popup = f"{df_summits_transposed['summitCode'][summit]},\n{df_summits_transposed['name'][summit]}\n{df_summits_transposed['myChases'][summit]} QSOs",
-    color = summit_points(df_summits_transposed['points'][summit]),
-    fill = True,
-    weight = 0,
-    fill_opacity = 1
-).add_to(chasers_map)
-
-# add home marker to map
-if ('MY_GRIDSQUARE' in df_log_SOTA) == True:
-    folium.Marker(
-        location=home_QTH,
-        popup=f"home QTH: {df_log_SOTA['MY_GRIDSQUARE'].value_counts().idxmax()}",
-        icon=folium.Icon(color="blue", icon="glyphicon-home"),
-    ).add_to(chasers_map)
-
-# add other locations to map
-for coordinate in my_coordinates:
-    if coordinate == map_center:
-        pass
+from geojson_layer import circles_layer # to draw all summits as one layer
+from chaser_stats import update_chaser_stats # to read the log
+from summit_fetcher import resolve_summits, SummitCache # to get data from SOTA database or API
+from summits_db import load_summits # for loading SOTA summits database
+from spatial_index import SummitIndex # to find summits near home QTH
+from metrics import STAGE_SECONDS, summary # to measure time of the run
+
+# summits not chased yet are shown on the map if they're closer than this to home QTH
+NEARBY_RADIUS_KM = 50
+
+def get_chased_summits(chaser_stats, summits_csv = 'summitslist.csv', cache_path = 'summits_api_cache.json', client = None):
+    """Get data of summits chased from SOTA database or API, return list of summits chased
+    with summits data as DataFrame indexed by summit code"""
+    # list SOTA summits present in the log (without duplicates)
+    df_log_summits = pd.DataFrame({'SOTA_REF': list(chaser_stats.chases)})
+
+    # import relevant summits data and save them as DataFrame
+    # summits are found in local SOTA database first (if summitslist.csv is available), only summits missing there
+    # (or retired) are downloaded from SOTA API - concurrently and kept in summits_api_cache.json, so next runs only
+    # download summits not seen before (or these cached more than a month ago)
+    # if errors occur (summit from the log was not found in SOTA database), it's saved in errors_dict
+    SOTA_summits = load_summits(summits_csv) if os.path.exists(summits_csv) else None
+    summits_dict, errors_dict = resolve_summits(df_log_summits['SOTA_REF'], SOTA_summits,
+                                                cache = SummitCache(cache_path), client = client)
+
+    # user is being notified about summits where errors occured and entries with them are removed from summits list for visualisation
+    if errors_dict:
+        print(f'\nFollowing errors were reported - QSO will be not included')
+        for summit in errors_dict.keys():
+            print(f'Error {errors_dict[summit]} for {summit}.')
+            df_log_summits = df_log_summits.loc[df_log_summits['SOTA_REF'] != summit]
+
+    # save summits data as DataFrame indexed by summit code, for easier visualisation
+    df_summits_transposed = pd.DataFrame.from_dict(summits_dict, orient = 'index')
+    return df_log_summits, chases_frame(df_summits_transposed, chaser_stats.chases)
+
+def chases_frame(df_summits, chases):
+    """Add number of chases of each summit to summits data, return new DataFrame"""
+    # df_summits is summits data indexed by summit code, chases - dictionary summit code: number of chases
+    # (summits not chased are left out, so summits resolved once may be shared by many logs)
+    df_summits_transposed = df_summits.loc[df_summits.index.isin(list(chases))].copy()
+    # number of chases for each summit (from log) in myChases field
+    df_summits_transposed['myChases'] = pd.Series(chases)
+
+    # change data type for Series important for visualisation (summits coordinates, SOTA points and number of chases)
+    # for numeric format
+    df_summits_transposed['latitude'] = df_summits_transposed['latitude'].astype('float')
+    df_summits_transposed['longitude'] = df_summits_transposed['longitude'].astype('float')
+    df_summits_transposed['myChases'] = df_summits_transposed['myChases'].astype('int')
+    df_summits_transposed['points'] = df_summits_transposed['points'].astype('int')
+
+    # add column rel_Chases to df_summits_transposed DataFrame with relative number of chasers for a summit
+    df_summits_transposed['rel_Chases'] = df_summits_transposed['myChases'] / df_summits_transposed['myChases'].max()
+    return df_summits_transposed
+
+def get_unchased_summits(home_QTH, chased, SOTA_summits, summit_index = None, radius_km = NEARBY_RADIUS_KM):
+    """Find valid summits closer than radius_km to home QTH and not chased yet, return them as DataFrame indexed
+    by summit code with distance from home (None if there's no home QTH or SOTA database)"""
+    # SOTA_summits is SummitTable, summit_index - SummitIndex of its summits (built if not given, may be shared by many logs)
+    home = to_location(home_QTH, center = True) if home_QTH is not None else None
+    if home is None or SOTA_summits is None:
+        return None
+    # summits around home are found in grid cells of spatial index, without checking the whole database
+    if summit_index is None:
+        summit_index = SummitIndex.from_table(SOTA_summits)
+    positions, distance = summit_index.within(home[0], home[1], radius_km)
+    df_nearby = SOTA_summits.take(positions)
+    df_nearby['distance'] = distance
+    return df_nearby.loc[~df_nearby.index.isin(list(chased))]
+
+def unchased_popups(df_unchased):
+    """Pop-up texts of summits not chased yet (as returned by get_unchased_summits), return Series of them"""
+    return (df_unchased.index.astype(str) + ',\n' + df_unchased['SummitName'].astype(str) + '\n'
+            + df_unchased['Points'].astype(str) + ' points, ' + df_unchased['distance'].round().astype(int).astype(str)
+            + ' km from home, not chased yet')
+
+def points_colormap():
+    """Colormap of summit's points (between 1 and 10) used by chasers maps"""
+    return cm.LinearColormap(colors=['magenta', 'orange','red'], index=[1,5,10],vmin=1,vmax=10).to_step(10)
+
+def draw_chasers_map(df_log_summits, df_summits_transposed, chaser_stats, tiles = "Stamen Terrain", render = 'geojson',
+                     df_unchased = None):
+    """Create Folium map with summits chased and chaser's locations, return it"""
+    # render = 'geojson' draws all summits as one GeoJSON layer styled in the browser (much smaller HTML file),
+    # render = 'markers' adds separate CircleMarker for every summit
+    # df_unchased - summits near home QTH not chased yet (as returned by get_unchased_summits), shown as gray points
+    # list chaser's positions from GRID square and re-calculate them into coordinates
+
+    # prepare list of my chasing locations if any - all locators are converted at once (locators not valid are skipped)
+    # if there's location saved as GRID Square reference - use it to determine coordinates and set map center
+    # on the most common locator (home QTH)
+    # if there is no chaser's location - center a map on most chased summit
+    latitude, longitude = to_locations(list(chaser_stats.locators))
+    my_coordinates = {locator: [lat, lon] for locator, lat, lon in zip(chaser_stats.locators, latitude, longitude)
+                      if pd.notna(lat)}
+    home_QTH = my_coordinates.get(chaser_stats.home_QTH)
+
+    if home_QTH is not None:
+        map_center = home_QTH
+    else:
+        map_center = [df_summits_transposed['latitude'][df_summits_transposed['myChases'].idxmax()],
+        df_summits_transposed['longitude'][df_summits_transposed['myChases'].idxmax()]]
+
+    # set-up a colormap to visuelize summit's points (between 1 and 10)
+    summit_points = points_colormap()
+
+    # create a map with Folium
+    chasers_map = folium.Map(location=map_center,
+                             tiles=tiles,
+                             zoom_start=9)
+
+    # add summits to a map
+    if render == 'geojson':
+        summits = df_summits_transposed.loc[df_log_summits['SOTA_REF']]
+        # colors are calculated once for every points value
+        points_colors = {points: summit_points(points) for points in summits['points'].unique()}
+        circles_layer(
+            summits['latitude'], summits['longitude'],
+            20*summits['rel_Chases'],
+            summits['points'].map(points_colors),
+            summits['summitCode'] + ',\n' + summits['name'].astype(str) + '\n' + summits['myChases'].astype(str) + ' QSOs'
+        ).add_to(chasers_map)
     else:
-        folium.CircleMarker(
-            location = coordinate,
-            popup = 'field QTH',
-            color = 'dodgerblue',
+        for summit in df_log_summits['SOTA_REF']:
+            folium.CircleMarker(
+            location = [df_summits_transposed['latitude'][summit], df_summits_transposed['longitude'][summit]],
+            radius = 20*df_summits_transposed['rel_Chases'][summit],
+            popup = f"{df_summits_transposed['summitCode'][summit]},\n{df_summits_transposed['name'][summit]}\n{df_summits_transposed['myChases'][summit]} QSOs",
+            color = summit_points(df_summits_transposed['points'][summit]),
             fill = True,
-            fill_opacity = 1,
             weight = 0,
-            radius = 5
+            fill_opacity = 1
         ).add_to(chasers_map)
 
-# print map with colorscale and save it in chasers_map.html file
-chasers_map.add_child(summit_points)
-chasers_map.save('chasers_map.html')
+    # add summits near home not chased yet
+    if df_unchased is not None and len(df_unchased):
+        circles_layer(
+            df_unchased['Latitude'], df_unchased['Longitude'],
+            [4] * len(df_unchased),
+            ['lightgray'] * len(df_unchased),
+            unchased_popups(df_unchased),
+            color = ['gray'] * len(df_unchased),
+            weight = 1,
+            name = 'summits not chased yet'
+        ).add_to(chasers_map)
 
+    # add home marker to map
+    if home_QTH is not None:
+        folium.Marker(
+            location=home_QTH,
+            popup=f"home QTH: {chaser_stats.home_QTH}",
+            icon=folium.Icon(color="blue", icon="glyphicon-home"),
+        ).add_to(chasers_map)
 
+    # add other locations to map
+    for locator, coordinate in my_coordinates.items():
+        if locator == chaser_stats.home_QTH:
+            pass
+        else:
+            folium.CircleMarker(
+                location = coordinate,
+                popup = 'field QTH',
+                color = 'dodgerblue',
+                fill = True,
+                fill_opacity = 1,
+                weight = 0,
+                radius = 5
+            ).add_to(chasers_map)
+
+    # add colorscale to the map
+    chasers_map.add_child(summit_points)
+    return chasers_map
+
+def main(filename = 'SOTAlog.adi', summits_csv = 'summitslist.csv', output = 'chasers_map.html', render = 'geojson'):
+    """Visualise all summits chased from the log and save map in output file"""
+    # summits are drawn as one GeoJSON layer by default, render = 'markers' draws them as before - separate
+    # CircleMarker for every summit
+    # read the log record by record and count chases of each SOTA summit and QSOs from each chaser's locator
+    # only QSOs with SOTA reference provided in SOTA_REF field are analysed
+    # statistics are saved next to the log, so when QSOs are appended to the log, next run reads only new ones
+    chaser_stats = update_chaser_stats(filename)
+
+    # check if there are any SOTA chases in log
+    if not chaser_stats.chases:
+        print('No SOTA chases found in log.')
+        return
+
+    df_log_summits, df_summits_transposed = get_chased_summits(chaser_stats, summits_csv)
+    # summits within NEARBY_RADIUS_KM from home QTH, which are still waiting for your first chase
+    SOTA_summits = load_summits(summits_csv) if os.path.exists(summits_csv) else None
+    df_unchased = get_unchased_summits(chaser_stats.home_QTH, chaser_stats.chases, SOTA_summits)
+
+    # print map with colorscale and save it in chasers_map.html file
+    with STAGE_SECONDS.time(stage = 'render'):
+        draw_chasers_map(df_log_summits, df_summits_transposed, chaser_stats, render = render,
+                         df_unchased = df_unchased).save(output)
+
+    # print how long every stage of the run took
+    print(summary())
+
+
+if __name__ == '__main__':
+    # save name of your log under filename variable
+    filename = 'SOTAlog.adi'
+    main(filename)
@@ -0,0 +1,104 @@
+"""Club batch mode of SOTA Chasers Visualiser - maps of all members' logs and combined club map
+
+    python club_batch.py logs/ [more logs or directories] --output maps/ --processes 4
+"""
+import os # for file system operations
+import glob # to find logs in directories
+import argparse # for command line arguments
+import pandas as pd # to analyse log as a DataFrame
+from concurrent.futures import ProcessPoolExecutor # to read logs and draw maps on all cores
+from chaser_stats import ChaserStats, update_chaser_stats # to read the logs
+from chasers_visualiser import get_chased_summits, get_unchased_summits, chases_frame, draw_chasers_map # to visualise chases
+from summits_db import load_summits # for loading SOTA summits database
+from spatial_index import SummitIndex # to find summits near home QTH of every member
+from metrics import STAGE_SECONDS, summary # to measure time of the run
+
+# extensions of ADIF files looked for in directories
+LOG_EXTENSIONS = ('.adi', '.adif')
+
+
+def find_logs(paths):
+    """List ADIF files given directly or found in given directories (sorted, without duplicates)"""
+    logs = []
+    for path in paths:
+        if os.path.isdir(path):
+            logs += [log for log in glob.glob(os.path.join(path, '*')) if log.lower().endswith(LOG_EXTENSIONS)]
+        else:
+            logs.append(path)
+    return sorted(set(logs))
+
+
+def member_name(filename):
+    """Name of club member's map - log file name without extension, e.g. logs/SP9ABC.adi -> SP9ABC"""
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def club_stats(members_stats):
+    """Sum chases and locators of all members' statistics, return ChaserStats of the club"""
+    club = ChaserStats()
+    for stats in members_stats:
+        for counts, member_counts in ((club.chases, stats.chases), (club.locators, stats.locators)):
+            for key, count in member_counts.items():
+                counts[key] = counts.get(key, 0) + count
+    return club
+
+
+def save_map(output, df_log_summits, df_summits_transposed, chaser_stats, tiles = "Stamen Terrain", df_unchased = None):
+    """Draw chases on a map and save it in output file (run in worker process)"""
+    draw_chasers_map(df_log_summits, df_summits_transposed, chaser_stats, tiles, df_unchased = df_unchased).save(output)
+    return output
+
+
+def main(paths, output_dir = '.', summits_csv = 'summitslist.csv', cache_path = 'summits_api_cache.json', processes = None,
+         tiles = "Stamen Terrain"):
+    """Visualise chases of every log found in paths and of the whole club, save maps in output_dir"""
+    logs = find_logs(paths)
+    os.makedirs(output_dir, exist_ok = True)
+
+    # logs are read in parallel, every worker updates statistics saved next to its log (see chasers_visualiser.py),
+    # so logs unchanged since the last run are not read again
+    with ProcessPoolExecutor(processes) as pool:
+        with STAGE_SECONDS.time(stage = 'read_logs'):
+            members = {log: stats for log, stats in zip(logs, pool.map(update_chaser_stats, logs)) if stats.chases}
+        print(f'{len(members)} of {len(logs)} logs have SOTA chases.')
+        if not members:
+            return
+
+        # summits chased by any member are resolved once (local database first, then SOTA API with shared cache),
+        # so API is asked for every distinct summit at most once, no matter how many members chased it
+        club = club_stats(members.values())
+        df_log_summits, df_summits_transposed = get_chased_summits(club, summits_csv, cache_path)
+        print(f'{len(df_summits_transposed)} distinct summits chased by the club.')
+
+        # summits not chased yet near home QTH of every member are found in one spatial index of SOTA database
+        SOTA_summits = load_summits(summits_csv) if os.path.exists(summits_csv) else None
+        summit_index = SummitIndex.from_table(SOTA_summits) if SOTA_summits is not None else None
+
+        # every member's map uses summits resolved for the club, only numbers of chases differ
+        jobs = [(os.path.join(output_dir, 'club_chasers_map.html'), df_log_summits, df_summits_transposed, club, tiles,
+                 get_unchased_summits(club.home_QTH, club.chases, SOTA_summits, summit_index))]
+        for log, stats in members.items():
+            member_summits = chases_frame(df_summits_transposed, stats.chases)
+            if member_summits.empty:
+                print(f'No summits chased in {log} were found.')
+                continue
+            jobs.append((os.path.join(output_dir, f'{member_name(log)}_chasers_map.html'),
+                         pd.DataFrame({'SOTA_REF': list(member_summits.index)}), member_summits, stats, tiles,
+                         get_unchased_summits(stats.home_QTH, stats.chases, SOTA_summits, summit_index)))
+        with STAGE_SECONDS.time(stage = 'render'):
+            for output in pool.map(save_map, *zip(*jobs)):
+                print(f'Map saved in {output}.')
+
+    # print how long every stage of the run took
+    print(summary())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Visualise chases of all club members and the whole club')
+    parser.add_argument('logs', nargs = '+', help = 'ADIF logs or directories with them')
+    parser.add_argument('--output', default = '.', help = 'directory for maps')
+    parser.add_argument('--summits', default = 'summitslist.csv', help = 'SOTA summits database')
+    parser.add_argument('--processes', type = int, default = None, help = 'number of worker processes (all cores by default)')
+    parser.add_argument('--tiles', default = 'Stamen Terrain', help = 'map tiles supported by Folium')
+    args = parser.parse_args()
+    main(args.logs, args.output, args.summits, processes = args.processes, tiles = args.tiles)
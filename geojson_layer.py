@@ -0,0 +1,48 @@
+import html # to show popup texts as they are
+import numpy as np # for columnar operations
+import folium # for data visualisation on a map
+from folium.utilities import JsCode # for style function run in the browser
+
+# style of every circle is read from properties of its feature by one function in the browser, instead of
+# rendering separate CircleMarker (with its own script and popup) for every point
+CIRCLE_STYLE = JsCode("""function(feature) {
+    var properties = feature.properties;
+    var style = {radius: properties.radius, fillColor: properties.fill_color};
+    if (properties.color) { style.color = properties.color; }
+    return style;
+}""")
+
+# coordinates are rounded to about 1 m, it's enough for a map and makes HTML file smaller
+PRECISION = 5
+
+
+def circle_features(latitude, longitude, radius, fill_color, popup, color = None):
+    """Prepare GeoJSON FeatureCollection with a point for every circle, return it as dictionary
+    radius, colors and popup text of every circle are saved in its properties"""
+    # popups are shown as HTML (by Folium and dash-leaflet), so texts coming from the log, SOTA database
+    # or SOTA API are escaped - markup in them is shown as text, like in popups of folium.CircleMarker
+    popup = [html.escape(str(text)) for text in popup]
+    latitude = np.round(np.asarray(latitude, dtype = 'float'), PRECISION).tolist()
+    longitude = np.round(np.asarray(longitude, dtype = 'float'), PRECISION).tolist()
+    radius = np.round(np.asarray(radius, dtype = 'float'), 1).tolist()
+    color = list(color) if color is not None else [None] * len(latitude)
+    features = [{
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+        'properties': {'radius': r, 'fill_color': fill, 'color': border, 'popup': text} if border is not None
+                      else {'radius': r, 'fill_color': fill, 'popup': text}
+    } for lat, lon, r, fill, border, text in zip(latitude, longitude, radius, fill_color, color, popup)]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def circles_layer(latitude, longitude, radius, fill_color, popup, color = None, weight = 0, fill_opacity = 1, name = None):
+    """Create one Folium GeoJson layer drawing circles (like folium.CircleMarker) for all points, return it"""
+    # options shared by all circles are set once for the layer, only radius, colors and popup vary between features
+    data = circle_features(latitude, longitude, radius, fill_color, popup, color)
+    return folium.GeoJson(
+        data,
+        name = name,
+        marker = folium.CircleMarker(radius = 5, weight = weight, fill = True, fill_opacity = fill_opacity),
+        style = CIRCLE_STYLE,
+        popup = folium.GeoJsonPopup(fields = ['popup'], labels = False),
+    )
@@ -0,0 +1,63 @@
+import numpy as np # for columnar operations
+import pandas as pd # to find unique locators
+from functools import lru_cache # to convert the same locator only once
+
+# longitude size (in degrees) of every pair of Maidenhead locator - field (A-R), square (0-9), subsquare (A-X),
+# extended square (0-9) and so on, latitude size is half of it
+PAIR_SIZES = [20.0, 2.0]
+for pair in range(2, 6):
+    PAIR_SIZES.append(PAIR_SIZES[-1] / (24 if pair % 2 == 0 else 10))
+
+
+def to_locations(locators, center = False):
+    """Convert Maidenhead locators (e.g. 'JO91sx') into coordinates, return arrays latitude, longitude
+    of south-west corner of every locator's square (or its center), NaN for locators not valid"""
+    # every locator is converted once, however many times it's repeated (e.g. chaser's locators of all QSOs)
+    codes, uniques = pd.factorize(pd.Series(locators, dtype = object))
+    uniques = pd.Series(uniques, dtype = object).str.strip().str.upper()
+    # values which are not text can't be converted
+    latitude, longitude = convert_locators(np.asarray(uniques.fillna(''), dtype = str), center)
+    # locators missing in the input (None or NaN) have code -1
+    latitude, longitude = np.append(latitude, np.nan), np.append(longitude, np.nan)
+    return latitude[codes], longitude[codes]
+
+
+def convert_locators(locators, center = False):
+    """Convert array of unique upper case locators into coordinates for all of them at once, return arrays latitude,
+    longitude (NaN for locators not valid)"""
+    length = np.char.str_len(locators) if len(locators) else np.zeros(0, dtype = 'int')
+    width = min(int(length.max(initial = 0)), 2 * len(PAIR_SIZES))
+    # characters of all locators as a matrix of codes - one column for every character
+    chars = np.zeros((len(locators), width), dtype = 'int64')
+    if width:
+        chars = np.asarray(locators, dtype = f'U{width}').view('uint32').reshape(len(locators), width).astype('int64')
+    valid = (length >= 2) & (length % 2 == 0) & (length <= 2 * len(PAIR_SIZES))
+    latitude = np.full(len(locators), -90.0)
+    longitude = np.full(len(locators), -180.0)
+    for pair in range(width // 2):
+        used = length > 2 * pair
+        if pair % 2 == 1:
+            # squares are digits
+            values = chars[:, 2 * pair: 2 * pair + 2] - ord('0')
+            top = 10
+        else:
+            # fields are letters A-R, subsquares and following pairs are letters A-X
+            values = chars[:, 2 * pair: 2 * pair + 2] - ord('A')
+            top = 18 if pair == 0 else 24
+        valid &= ~used | ((values >= 0) & (values < top)).all(axis = 1)
+        longitude += np.where(used, values[:, 0] * PAIR_SIZES[pair], 0)
+        latitude += np.where(used, values[:, 1] * PAIR_SIZES[pair] / 2, 0)
+    if center:
+        # half of the smallest pair of every locator
+        size = np.asarray(PAIR_SIZES)[np.clip(length // 2 - 1, 0, len(PAIR_SIZES) - 1)]
+        longitude += size / 2
+        latitude += size / 4
+    return np.where(valid, latitude, np.nan), np.where(valid, longitude, np.nan)
+
+
+@lru_cache(maxsize = 4096)
+def to_location(locator, center = False):
+    """Convert one Maidenhead locator into coordinates, return tuple (latitude, longitude) or None if it's not valid"""
+    # the same locators (e.g. home QTH) are converted again and again by the dashboards, so results are kept
+    latitude, longitude = to_locations([locator], center)
+    return None if np.isnan(latitude[0]) else (float(latitude[0]), float(longitude[0]))
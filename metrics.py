@@ -0,0 +1,212 @@
+import time # for time measurements
+import threading # metrics are updated from callbacks and background threads
+from functools import wraps # to keep names of timed functions
+
+# default buckets of histograms (in seconds) - from a few milliseconds for callbacks to tens of seconds for API calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def format_labels(labels, extra = None):
+    """Format labels in Prometheus text format, e.g. {stage="enrich"}"""
+    labels = dict(labels, **extra) if extra else dict(labels)
+    if not labels:
+        return ''
+    values = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in labels.items())
+    return f'{{{values}}}'
+
+
+def format_value(value):
+    """Format number in Prometheus text format"""
+    return '+Inf' if value == float('inf') else repr(float(value))
+
+
+class Metric:
+    """Base for metrics - value (or values) kept separately for every combination of labels"""
+
+    kind = None
+
+    def __init__(self, name, description, lock):
+        self.name = name
+        self.description = description
+        self._lock = lock
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(sorted(labels.items()))
+
+    def render(self):
+        """Return lines of Prometheus text format"""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_value(dict(key), value))
+        return lines
+
+    def _render_value(self, labels, value):
+        return [f'{self.name}{format_labels(labels)} {format_value(value)}']
+
+
+class Counter(Metric):
+    """Value which only goes up, e.g. number of requests sent"""
+
+    kind = 'counter'
+
+    def inc(self, value = 1, **labels):
+        with self._lock:
+            key = self._key(labels)
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Value which may go up and down, e.g. number of spots on the map"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    """Distribution of observed values (e.g. durations) in buckets, with their sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, lock, buckets = DEFAULT_BUCKETS):
+        super().__init__(name, description, lock)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        with self._lock:
+            key = self._key(labels)
+            if key not in self._values:
+                self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0, 'max': 0.0}
+            entry = self._values[key]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][i] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+            entry['max'] = max(entry['max'], value)
+
+    def time(self, **labels):
+        """Measure time of with block and observe it"""
+        return Timer(self, labels)
+
+    def _render_value(self, labels, entry):
+        lines = [f'{self.name}_bucket{format_labels(labels, {"le": format_value(bound)})} {count}'
+                 for bound, count in zip(self.buckets, entry['buckets'])]
+        lines.append(f'{self.name}_sum{format_labels(labels)} {format_value(entry["sum"])}')
+        lines.append(f'{self.name}_count{format_labels(labels)} {entry["count"]}')
+        return lines
+
+
+class Timer:
+    """Context manager observing time of with block in histogram"""
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.seconds = time.perf_counter() - self.start
+        self.histogram.observe(self.seconds, **self.labels)
+
+
+class Registry:
+    """Collection of metrics exposed together, e.g. on /metrics page of the dashboard"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, cls, name, description, **options):
+        # the same metric may be declared in several modules, it's created only once
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, description, threading.Lock(), **options)
+            return self._metrics[name]
+
+    def counter(self, name, description):
+        return self._get(Counter, name, description)
+
+    def gauge(self, name, description):
+        return self._get(Gauge, name, description)
+
+    def histogram(self, name, description, buckets = DEFAULT_BUCKETS):
+        return self._get(Histogram, name, description, buckets = buckets)
+
+    def get(self, name):
+        """Return metric of given name, None if it's not declared in the registry"""
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render(self):
+        """Return all metrics in Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+
+# metrics of the pack - shared by all modules, so scripts and the dashboard report the same values
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram('sota_stage_seconds', 'Time of pipeline stages in seconds')
+API_REQUEST_SECONDS = REGISTRY.histogram('sota_api_request_seconds', 'Latency of SOTA API requests in seconds')
+API_REQUESTS = REGISTRY.counter('sota_api_requests_total', 'SOTA API requests by endpoint and HTTP status')
+SPOTS = REGISTRY.counter('sota_spots_total', 'Spots fetched, deduplicated (activator-summit pairs not seen before) and unresolved (summit not found)')
+CALLBACK_SECONDS = REGISTRY.histogram('sota_callback_seconds', 'Time of dashboard callbacks in seconds')
+MARKERS = REGISTRY.gauge('sota_map_markers', 'Markers prepared for the map in the latest spots snapshot')
+STREAM_CLIENTS = REGISTRY.gauge('sota_stream_clients', 'Browsers connected to spots stream of the dashboard')
+STREAM_MESSAGES = REGISTRY.counter('sota_stream_messages_total', 'Messages queued for browsers connected to spots stream - deltas, snapshots and resyncs of slow clients')
+STARTUP_SECONDS = REGISTRY.gauge('sota_startup_seconds', 'Time of dashboard startup phases in seconds - import, app creation and import to first response')
+
+
+def timed(stage, histogram = STAGE_SECONDS, label = 'stage'):
+    """Decorator observing time of every call of a function in histogram, labelled with stage name"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**{label: stage}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_request(endpoint, seconds, status):
+    """Record SOTA API request - its latency and HTTP status (or name of exception, if request failed)"""
+    API_REQUEST_SECONDS.observe(seconds, endpoint = endpoint)
+    API_REQUESTS.inc(endpoint = endpoint, status = status)
+
+
+def summary(registry = REGISTRY):
+    """Return timing summary of the run - time of every stage and API requests, with counts of spots"""
+    # metrics are read from the registry by names, so summary of any registry (e.g. of a test) may be prepared
+    lines = [f"{'stage':<24} {'calls':>6} {'total [s]':>10} {'max [s]':>9}"]
+    for name, label, prefix in ((STAGE_SECONDS.name, 'stage', ''), (API_REQUEST_SECONDS.name, 'endpoint', 'API '),
+                                (CALLBACK_SECONDS.name, 'callback', '')):
+        histogram = registry.get(name)
+        if histogram is None:
+            continue
+        with histogram._lock:
+            entries = sorted(histogram._values.items())
+        for key, entry in entries:
+            stage = prefix + dict(key).get(label, '')
+            lines.append(f"{stage:<24} {entry['count']:>6} {entry['sum']:>10.3f} {entry['max']:>9.3f}")
+    counter = registry.get(SPOTS.name)
+    spots = {}
+    if counter is not None:
+        with counter._lock:
+            spots = {dict(key).get('state'): value for key, value in counter._values.items()}
+    if spots:
+        lines.append('spots: ' + ', '.join(f'{value} {state}' for state, value in spots.items()))
+    return '\n'.join(lines)
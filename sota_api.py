@@ -0,0 +1,217 @@
+import os # for file system operations
+import json # to save summits list metadata
+import time # for time measurements
+import threading # client is shared by threads
+import requests # for communication with API
+from requests.adapters import HTTPAdapter # for pooled connections
+from urllib3.util.retry import Retry # to retry failed requests
+from email.utils import formatdate # to send date of local summits list
+from metrics import observe_request # to measure SOTA API requests
+
+SOTA_API_URL = 'https://api2.sota.org.uk/api/'
+SUMMITS_LIST_URL = 'https://www.sotadata.org.uk/summitslist.csv'
+
+
+class SotaApiError(Exception):
+    """SOTA API didn't answer or answered with an error"""
+
+    def __init__(self, url, status):
+        super().__init__(f'SOTA API error {status} for {url}')
+        self.url = url
+        self.status = status
+
+
+def make_session(pool_size = 8, retries = 3, backoff = 0.5):
+    """Prepare requests session with connection pool (keep-alive), retries with exponential backoff and compression"""
+    retry = Retry(total = retries, backoff_factor = backoff, status_forcelist = [429, 500, 502, 503, 504],
+                  allowed_methods = ['GET'], raise_on_status = False)
+    adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size, max_retries = retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate', 'User-Agent': 'SOTA-Visualisation-Pack'})
+    return session
+
+
+class RateLimiter:
+    """Token bucket - allows rate requests per second on average, with bursts up to burst requests"""
+
+    def __init__(self, rate = 20, burst = 20):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until next request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class CachedResponse:
+    """Data of API answer with its validators (ETag, Last-Modified), kept to send conditional requests"""
+
+    def __init__(self, data, etag, last_modified):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched = time.monotonic()
+
+
+class SotaClient:
+    """SOTA API client shared by the scripts - pooled connections, timeouts, conditional requests and
+    in-process cache of answers"""
+
+    def __init__(self, base_url = SOTA_API_URL, pool_size = 8, retries = 3, backoff = 0.5, timeout = (3.05, 10),
+                 rate = 20, burst = 20):
+        # timeout is a tuple (connect, read) in seconds, rate and burst limit requests sent per second
+        # (rate = None disables limiting)
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = make_session(pool_size, retries, backoff)
+        self.limiter = RateLimiter(rate, burst) if rate else None
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get_json(self, path, endpoint, ttl = 0):
+        """Get answer of SOTA API as JSON data, return tuple (data, None) or (None, error)
+        error is HTTP status code if API answered, otherwise name of exception raised"""
+        # answers younger than ttl seconds are returned from cache without asking the API, older ones are
+        # requested with their ETag/Last-Modified - if API says they're not modified (304), cached data is
+        # returned, so it's neither downloaded nor parsed again
+        url = f'{self.base_url}{path}'
+        with self._lock:
+            cached = self._cache.get(url)
+        if cached is not None and time.monotonic() - cached.fetched < ttl:
+            return cached.data, None
+        headers = {}
+        if cached is not None and cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached is not None and cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+
+        if self.limiter is not None:
+            self.limiter.acquire()
+        start = time.perf_counter()
+        try:
+            r = self.session.get(url, headers = headers, timeout = self.timeout)
+        except requests.RequestException as error:
+            observe_request(endpoint, time.perf_counter() - start, type(error).__name__)
+            return None, type(error).__name__
+        observe_request(endpoint, time.perf_counter() - start, r.status_code)
+
+        if r.status_code == 304 and cached is not None:
+            cached.fetched = time.monotonic()
+            return cached.data, None
+        if r.status_code != 200:
+            return None, r.status_code
+        try:
+            data = r.json()
+        except ValueError:
+            return None, r.status_code
+        with self._lock:
+            self._cache[url] = CachedResponse(data, r.headers.get('ETag'), r.headers.get('Last-Modified'))
+        return data, None
+
+    def spots(self, time = -1, ttl = 0):
+        """Download spots - sent in last -time hours if time is negative, given number of latest spots otherwise"""
+        spots, error = self.get_json(f'spots/{time}/all', 'spots', ttl)
+        if error is not None:
+            raise SotaApiError(f'{self.base_url}spots/{time}/all', error)
+        return spots
+
+    def summit(self, summit, ttl = 3600):
+        """Download summit data, return tuple (summit data, None) or (None, error)"""
+        data, error = self.get_json(f'summits/{summit}', 'summits', ttl)
+        # summit not found in SOTA database is returned as an empty answer
+        if error is None and not isinstance(data, dict):
+            return None, 200
+        return data, error
+
+
+def get_spots(time = -1, fallback = 10, client = None):
+    """Download SOTA spots sent in defined timeframe or defined number of latest spots and return them as list"""
+    # if time is negative - download spots alerted in defined number of hours
+    # if time is positive - download given number of latest spots
+    # by default looking from a spots sent in last 1 hour
+    # fallback policy: if there are no spots in the timeframe, latest fallback spots are downloaded instead
+    # (once, so there's always something to show on a map), fallback = 0 disables it
+    client = client if client is not None else default_client()
+    spots = client.spots(time)
+    if time > 0:
+        print(f'{len(spots)} found where expected number was {time}.')
+    else:
+        print(f'{len(spots)} spots found in latest {-time} h.')
+    if len(spots) == 0 and fallback > 0 and time <= 0:
+        spots = client.spots(fallback)
+        print(f'{len(spots)} latest spots downloaded instead.')
+    return spots
+
+
+def download_summits_list(path = 'summitslist.csv', url = SUMMITS_LIST_URL, max_age = 24 * 3600, client = None, timeout = 60):
+    """Download SOTA summits database if it has changed, return True if file was updated"""
+    # server is asked at most once in max_age seconds, with ETag/Last-Modified of the file saved before,
+    # so unchanged database is not downloaded again (and its binary cache is not rebuilt)
+    # errors are reported but don't stop the script - file saved before (if any) is used then
+    meta_path = f'{path}.meta.json'
+    try:
+        with open(meta_path) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        meta = {}
+    exists = os.path.exists(path)
+    if exists and time.time() - meta.get('checked', 0) < max_age:
+        return False
+
+    headers = {}
+    if exists and meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if exists:
+        headers['If-Modified-Since'] = meta.get('last_modified') or formatdate(os.path.getmtime(path), usegmt = True)
+    session = client.session if client is not None else default_client().session
+    start = time.perf_counter()
+    try:
+        with session.get(url, headers = headers, timeout = timeout, stream = True) as r:
+            observe_request('summitslist', time.perf_counter() - start, r.status_code)
+            updated = r.status_code == 200
+            if updated:
+                # file is saved under temporary name first, so other processes never read half-downloaded file
+                with open(f'{path}.tmp', 'wb') as file:
+                    for chunk in r.iter_content(1 << 20):
+                        file.write(chunk)
+                os.replace(f'{path}.tmp', path)
+                meta = {'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified')}
+            elif r.status_code != 304:
+                print(f'Summits list not downloaded, status code: {r.status_code}')
+                return False
+    except requests.RequestException as error:
+        observe_request('summitslist', time.perf_counter() - start, type(error).__name__)
+        print(f'Summits list not downloaded: {error!r}')
+        return False
+    meta['checked'] = time.time()
+    with open(f'{meta_path}.tmp', 'w') as file:
+        json.dump(meta, file)
+    os.replace(f'{meta_path}.tmp', meta_path)
+    return updated
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def default_client():
+    """Return client shared by all modules of the process, created on first use"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = SotaClient()
+        return _default_client
@@ -0,0 +1,117 @@
+import numpy as np # for columnar operations
+import pandas as pd # to encode groups of points
+
+
+def to_mercator(longitude, latitude):
+    """Convert coordinates into Web Mercator projection scaled to 0-1 (as used by map tiles), return arrays x, y"""
+    longitude = np.asarray(longitude, dtype = 'float64')
+    latitude = np.clip(np.asarray(latitude, dtype = 'float64'), -85.0511, 85.0511)
+    x = (longitude + 180) / 360
+    sin = np.sin(np.radians(latitude))
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * np.pi)
+    return np.clip(x, 0, 1 - 1e-12), np.clip(y, 0, 1 - 1e-12)
+
+
+class ClusterLevel:
+    """Clusters of points for one zoom level - cells of the grid with at least one point"""
+
+    def __init__(self, cells, members, longitude, latitude, group_codes, n_groups):
+        # cells holds grid cell of every point, members - point positions sorted by cell
+        keys, first, inverse, counts = np.unique(cells, return_index = True, return_inverse = True, return_counts = True)
+        self.cells = keys # cell of every cluster - it identifies the cluster, even when its points change
+        self.count = counts
+        self.first = members[first] # any point of the cluster, used when cluster has only one point
+        self.longitude = np.bincount(inverse, longitude, len(keys)) / counts
+        self.latitude = np.bincount(inverse, latitude, len(keys)) / counts
+        # counts of points of each group in a cluster are kept as sparse (cluster, group, count) arrays
+        # sorted by cluster, so clusters don't need a column for every group
+        if n_groups > 0:
+            pairs, pair_counts = np.unique(inverse.astype('int64') * n_groups + group_codes, return_counts = True)
+            self.pair_group = pairs % n_groups
+            self.pair_count = pair_counts
+            self.pair_offset = np.searchsorted(pairs // n_groups, np.arange(len(keys) + 1))
+        else:
+            self.pair_group = self.pair_count = np.zeros(0, dtype = 'int64')
+            self.pair_offset = np.zeros(len(keys) + 1, dtype = 'int64')
+
+    def __len__(self):
+        return len(self.count)
+
+
+class ClusterIndex:
+    """Points grouped into clusters for every zoom level, so map shows only clusters and points visible in viewport"""
+
+    def __init__(self, longitude, latitude, groups = None, radius = 60, max_zoom = 14, tile_size = 256):
+        # points closer than about radius pixels (on a map at given zoom) are presented as one cluster
+        # groups are labels of points (e.g. band and mode of a spot), counted separately in every cluster
+        self.longitude = np.asarray(longitude, dtype = 'float64')
+        self.latitude = np.asarray(latitude, dtype = 'float64')
+        self.max_zoom = max_zoom
+        if groups is None:
+            self.group_codes, self.groups = np.zeros(len(self.longitude), dtype = 'int64'), []
+        else:
+            codes, labels = pd.factorize(pd.Series(groups, dtype = object), use_na_sentinel = False)
+            self.group_codes, self.groups = codes.astype('int64'), list(labels)
+
+        # grid of the most detailed zoom level, cell is radius pixels wide
+        # each cell of zoom z is made of 2 x 2 cells of zoom z + 1, so lower levels are found by dividing cell numbers by 2
+        x, y = to_mercator(self.longitude, self.latitude)
+        cell_size = radius / (tile_size * 2 ** max_zoom)
+        column = (x / cell_size).astype('int64')
+        row = (y / cell_size).astype('int64')
+        members = np.arange(len(self.longitude))
+        self.levels = []
+        for zoom in range(max_zoom + 1):
+            shift = max_zoom - zoom
+            cells = ((column >> shift) << 32) | (row >> shift)
+            self.levels.append(ClusterLevel(cells, members, self.longitude, self.latitude, self.group_codes, len(self.groups)))
+
+    def __len__(self):
+        return len(self.longitude)
+
+    def group_counts(self, level, cluster):
+        """Return dictionary with counts of points of each group in cluster"""
+        start, end = level.pair_offset[cluster], level.pair_offset[cluster + 1]
+        return {self.groups[group]: int(count) for group, count in zip(level.pair_group[start:end], level.pair_count[start:end])}
+
+    def query(self, bounds = None, zoom = 0):
+        """Find clusters visible on a map, return tuple (clusters, points)
+        clusters is a list of dictionaries with cluster's cell, location, count and counts of points of each group,
+        points is an array of positions of individual points visible on a map"""
+        # bounds are [[south, west], [north, east]] as reported by the map, no bounds means whole world
+        zoom = max(int(zoom or 0), 0)
+        if bounds is None:
+            bounds = [[-90, -180], [90, 180]]
+        (south, west), (north, east) = bounds
+        # viewport is extended by a half of its size, so clusters don't disappear when map is moved a little
+        lat_margin, lon_margin = (north - south) / 2, (east - west) / 2
+        south, north, west, east = south - lat_margin, north + lat_margin, west - lon_margin, east + lon_margin
+
+        # beyond the most detailed zoom level all points are shown
+        if zoom > self.max_zoom:
+            visible = self._in_bounds(self.longitude, self.latitude, south, north, west, east)
+            return [], np.flatnonzero(visible)
+
+        level = self.levels[zoom]
+        visible = np.flatnonzero(self._in_bounds(level.longitude, level.latitude, south, north, west, east))
+        single = level.count[visible] == 1
+        clusters = [{
+            'cell': f'{zoom}-{level.cells[cluster]}',
+            'longitude': float(level.longitude[cluster]),
+            'latitude': float(level.latitude[cluster]),
+            'count': int(level.count[cluster]),
+            'groups': self.group_counts(level, cluster),
+            } for cluster in visible[~single]]
+        return clusters, level.first[visible[single]]
+
+    @staticmethod
+    def _in_bounds(longitude, latitude, south, north, west, east):
+        """Check which points lie inside bounds, longitude of viewport may exceed -180/180 when map is wrapped"""
+        inside = (latitude >= south) & (latitude <= north)
+        if east - west >= 360:
+            return inside
+        west = (west + 180) % 360 - 180
+        east = (east + 180) % 360 - 180
+        if west <= east:
+            return inside & (longitude >= west) & (longitude <= east)
+        return inside & ((longitude >= west) | (longitude <= east))
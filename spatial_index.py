@@ -0,0 +1,99 @@
+import numpy as np # for columnar operations
+
+# mean radius of Earth
+EARTH_RADIUS_KM = 6371
+
+# kilometres in one degree of latitude
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
+
+# half of Earth's circumference - no point is further away
+MAX_DISTANCE_KM = EARTH_RADIUS_KM * np.pi
+
+
+def distance_km(latitude, longitude, latitudes, longitudes):
+    """Great-circle distance from a point to array of points in kilometres"""
+    latitude, longitude = np.radians(latitude), np.radians(longitude)
+    latitudes, longitudes = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((latitudes - latitude) / 2) ** 2 + np.cos(latitude) * np.cos(latitudes) * np.sin((longitudes - longitude) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+
+class SummitIndex:
+    """Summits sorted by cells of latitude-longitude grid, so summits within given distance from a point (or nearest
+    to it) are found by checking only few cells around it instead of the whole SOTA database"""
+
+    def __init__(self, latitude, longitude, positions = None, cell = 0.5):
+        # positions are summit positions in SOTA database (SummitTable) returned by queries, own order by default
+        # cell is grid cell size in degrees - about 55 km of latitude
+        self.latitude = np.asarray(latitude, dtype = 'float64')
+        self.longitude = np.asarray(longitude, dtype = 'float64')
+        self.positions = np.arange(len(self.latitude)) if positions is None else np.asarray(positions)
+        self.cell = cell
+        self.rows = int(np.ceil(180 / cell))
+        self.columns = int(np.ceil(360 / cell))
+        keys = self.cell_row(self.latitude) * self.columns + self.cell_column(self.longitude)
+        # summits are kept sorted by cell, with offset of the first summit of every cell
+        self.order = np.argsort(keys, kind = 'stable')
+        self.offsets = np.searchsorted(keys[self.order], np.arange(self.rows * self.columns + 1))
+
+    @classmethod
+    def from_table(cls, summits_table, valid_only = True):
+        """Build index of summits from SummitTable (valid ones only by default)"""
+        positions = np.arange(len(summits_table))
+        if valid_only:
+            positions = np.flatnonzero(summits_table.is_valid(positions))
+        return cls(summits_table.latitude[positions], summits_table.longitude[positions], positions)
+
+    def __len__(self):
+        return len(self.latitude)
+
+    def cell_row(self, latitude):
+        return np.clip(((np.asarray(latitude) + 90) // self.cell).astype('int64'), 0, self.rows - 1)
+
+    def cell_column(self, longitude):
+        return ((np.asarray(longitude) + 180) // self.cell).astype('int64') % self.columns
+
+    def candidates(self, latitude, longitude, radius_km):
+        """Return indexes of summits in grid cells which may be closer than radius_km to the point"""
+        degrees = radius_km / KM_PER_DEGREE
+        rows = np.arange(self.cell_row(latitude - degrees), self.cell_row(latitude + degrees) + 1)
+        # longitude degrees get shorter towards poles - the widest span is needed at the latitude closest to a pole
+        cosine = np.cos(np.radians(min(abs(latitude) + degrees, 90)))
+        if cosine * 180 <= degrees:
+            columns = np.arange(self.columns)
+        else:
+            # columns wrap around 180th meridian
+            first = int((longitude - degrees / cosine + 180) // self.cell)
+            last = int((longitude + degrees / cosine + 180) // self.cell)
+            columns = (first + np.arange(min(last - first + 1, self.columns))) % self.columns
+        if len(rows) * len(columns) == self.rows * self.columns:
+            return np.arange(len(self))
+        # summits of every row are found in contiguous ranges of cells
+        keys = (rows[:, None] * self.columns + columns[None, :]).ravel()
+        starts, ends = self.offsets[keys], self.offsets[keys + 1]
+        return np.concatenate([self.order[start:end] for start, end in zip(starts.tolist(), ends.tolist()) if start < end]
+                              or [self.order[:0]])
+
+    def within(self, latitude, longitude, radius_km):
+        """Find summits closer than radius_km to the point, return arrays of their positions and distances
+        in kilometres, sorted from the nearest"""
+        found = self.candidates(latitude, longitude, radius_km)
+        km = distance_km(latitude, longitude, self.latitude[found], self.longitude[found])
+        close = km <= radius_km
+        found, km = found[close], km[close]
+        order = np.argsort(km, kind = 'stable')
+        return self.positions[found[order]], km[order]
+
+    def nearest(self, latitude, longitude, k = 10):
+        """Find k summits nearest to the point, return arrays of their positions and distances in kilometres,
+        sorted from the nearest"""
+        k = min(k, len(self))
+        if k <= 0:
+            return self.positions[:0], np.zeros(0)
+        # search radius is doubled until there are at least k summits within it (the whole Earth at most)
+        radius_km = self.cell * KM_PER_DEGREE
+        while True:
+            positions, km = self.within(latitude, longitude, radius_km)
+            if len(positions) >= k or radius_km >= MAX_DISTANCE_KM:
+                return positions[:k], km[:k]
+            radius_km = min(radius_km * 2, MAX_DISTANCE_KM)
@@ -0,0 +1,190 @@
+import os # for file system operations
+import json # to save list of segments of a partition
+import shutil # to remove compacted segments
+import time # to name segments
+import numpy as np # for columnar storage
+import pandas as pd # for data analysis
+from metrics import timed # to measure time of archive queries
+try:
+    import fcntl # to lock partitions written by many processes (not available on Windows)
+except ImportError:
+    fcntl = None
+
+# columns of spots saved in the archive with their types - summit is the code after corrections, band,
+# latitude and longitude come from enrichment (empty / NaN for summits not found)
+# texts are saved as UTF-8 bytes and numbers in single precision (enough for frequency in MHz and ~1 m on a map)
+# to keep the archive compact
+ARCHIVE_COLUMNS = {
+    'id': 'int64',
+    'timeStamp': 'datetime64[s]',
+    'activatorCallsign': 'S',
+    'associationCode': 'S',
+    'summit': 'S',
+    'frequency': 'float32',
+    'mode': 'S',
+    'band': 'S',
+    'latitude': 'float32',
+    'longitude': 'float32',
+}
+
+# partition is compacted into one segment when it has more segments than this
+MAX_SEGMENTS = 48
+
+
+def spots_columns(spots_df):
+    """Convert spots DataFrame into dictionary of numpy columns saved in the archive"""
+    columns = {}
+    for column, dtype in ARCHIVE_COLUMNS.items():
+        if column not in spots_df:
+            values = pd.Series(np.nan if dtype == 'float32' else '', index = spots_df.index)
+        else:
+            values = spots_df[column]
+        if dtype == 'S':
+            columns[column] = np.char.encode(values.astype(object).where(values.notna(), '').to_numpy(dtype = str), 'utf-8')
+        elif dtype == 'float32':
+            columns[column] = pd.to_numeric(values.astype(object), errors = 'coerce').to_numpy(dtype = 'float32')
+        elif dtype.startswith('datetime64'):
+            columns[column] = pd.to_datetime(values).to_numpy(dtype = dtype)
+        else:
+            columns[column] = values.to_numpy(dtype = dtype)
+    return columns
+
+
+class SpotArchive:
+    """Append-only archive of spots kept as numpy columns, partitioned by UTC day of spot and deduplicated by spot id
+
+    Every partition (directory named by day, e.g. 2024-05-01) holds segments - directories with one .npy file
+    per column, listed in segments.json. New spots are written as new segment, so files already saved are never
+    modified, and partitions with too many segments are compacted into one."""
+
+    def __init__(self, path = 'spots_archive'):
+        self.path = path
+
+    def partition_path(self, day):
+        return os.path.join(self.path, str(day))
+
+    def days(self):
+        """List days (as datetime64[D]) with spots saved, sorted"""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(np.datetime64(entry, 'D') for entry in os.listdir(self.path)
+                      if len(entry) == 10 and os.path.exists(os.path.join(self.path, entry, 'segments.json')))
+
+    def segments(self, day):
+        """List segments of partition"""
+        try:
+            with open(os.path.join(self.partition_path(day), 'segments.json')) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return []
+
+    def read_partition(self, day, columns):
+        """Read given columns of all segments of partition, return dictionary of numpy arrays"""
+        # files are memory-mapped, so only pages of columns read are loaded from disk
+        for attempt in range(2):
+            try:
+                parts = [[np.load(os.path.join(self.partition_path(day), segment, f'{column}.npy'), mmap_mode = 'r')
+                          for column in columns] for segment in self.segments(day)]
+                break
+            except FileNotFoundError:
+                # partition has just been compacted - list of segments is read again
+                if attempt:
+                    raise
+        if not parts:
+            return {column: np.array([], dtype = ARCHIVE_COLUMNS[column]) for column in columns}
+        return {column: np.concatenate([part[i] for part in parts]) for i, column in enumerate(columns)}
+
+    def write_segment(self, day, columns):
+        """Save columns as new segment of partition, return its name"""
+        partition = self.partition_path(day)
+        name = f'segment-{time.time_ns()}-{os.getpid()}'
+        os.makedirs(os.path.join(partition, f'{name}.tmp'))
+        for column, values in columns.items():
+            np.save(os.path.join(partition, f'{name}.tmp', f'{column}.npy'), values)
+        os.replace(os.path.join(partition, f'{name}.tmp'), os.path.join(partition, name))
+        return name
+
+    def save_segments(self, day, segments):
+        """Replace list of segments of partition"""
+        path = os.path.join(self.partition_path(day), 'segments.json')
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(segments, file)
+        os.replace(f'{path}.tmp', path)
+
+    def lock(self, day):
+        """Open lock file of partition and lock it, so only one process at a time adds spots to it"""
+        os.makedirs(self.partition_path(day), exist_ok = True)
+        file = open(os.path.join(self.partition_path(day), '.lock'), 'w')
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX)
+        return file
+
+    @timed('archive')
+    def append(self, spots_df):
+        """Add spots to the archive, skipping spots with ids already saved, return number of spots added"""
+        if len(spots_df) == 0:
+            return 0
+        columns = spots_columns(spots_df)
+        # spots repeated in the same batch are saved once
+        _, first = np.unique(columns['id'], return_index = True)
+        columns = {column: values[np.sort(first)] for column, values in columns.items()}
+        days = columns['timeStamp'].astype('datetime64[D]')
+        added = 0
+        for day in np.unique(days):
+            with self.lock(day):
+                in_day = days == day
+                segments = self.segments(day)
+                saved_ids = self.read_partition(day, ['id'])['id']
+                new = in_day & ~np.isin(columns['id'], saved_ids)
+                if not new.any():
+                    continue
+                segments.append(self.write_segment(day, {column: values[new] for column, values in columns.items()}))
+                self.save_segments(day, segments)
+                added += int(new.sum())
+                if len(segments) > MAX_SEGMENTS:
+                    self.compact(day)
+            # first spots of a new day close previous day, so its partition is compacted into one segment
+            if len(segments) == 1 and len(self.segments(day - 1)) > 1:
+                with self.lock(day - 1):
+                    self.compact(day - 1)
+        return added
+
+    def compact(self, day):
+        """Merge all segments of partition into one, sorted by time of spots (partition must be locked)"""
+        segments = self.segments(day)
+        columns = self.read_partition(day, list(ARCHIVE_COLUMNS))
+        order = np.argsort(columns['timeStamp'], kind = 'stable')
+        self.save_segments(day, [self.write_segment(day, {column: values[order] for column, values in columns.items()})])
+        # processes which have just read previous list of segments keep files they've already mapped
+        for segment in segments:
+            shutil.rmtree(os.path.join(self.partition_path(day), segment), ignore_errors = True)
+
+    @timed('archive_query')
+    def query(self, start, end, columns = None, associations = None, bands = None, modes = None):
+        """Return spots sent from start (inclusive) to end (exclusive) as DataFrame, sorted by time
+        associations, bands and modes limit spots returned, columns - columns read (all by default)"""
+        # only partitions of days between start and end are read, and only columns requested or filtered by
+        start, end = np.datetime64(pd.Timestamp(start), 's'), np.datetime64(pd.Timestamp(end), 's')
+        columns = list(columns) if columns is not None else list(ARCHIVE_COLUMNS)
+        filters = {column: np.char.encode(np.asarray(list(values), dtype = str), 'utf-8') for column, values in
+                   (('associationCode', associations), ('band', bands), ('mode', modes)) if values is not None}
+        read = list(dict.fromkeys(columns + ['timeStamp'] + list(filters)))
+        parts = []
+        for day in self.days():
+            if day < start.astype('datetime64[D]') or day > end.astype('datetime64[D]'):
+                continue
+            partition = self.read_partition(day, read)
+            mask = (partition['timeStamp'] >= start) & (partition['timeStamp'] < end)
+            for column, values in filters.items():
+                mask &= np.isin(partition[column], values)
+            parts.append({column: partition[column][mask] for column in read})
+        if not parts:
+            data = {column: np.array([], dtype = ARCHIVE_COLUMNS[column]) for column in read}
+        else:
+            data = {column: np.concatenate([part[column] for part in parts]) for column in read}
+        order = np.argsort(data['timeStamp'], kind = 'stable')
+        spots_df = pd.DataFrame({column: data[column][order] for column in columns})
+        for column in columns:
+            if ARCHIVE_COLUMNS[column] == 'S':
+                spots_df[column] = pd.array(np.char.decode(data[column][order], 'utf-8'), dtype = 'string')
+        return spots_df
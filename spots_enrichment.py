@@ -0,0 +1,152 @@
+import numpy as np # for columnar operations
+import pandas as pd # for data analysis
+from datetime import datetime, timedelta # for time calculations
+from metrics import timed # to measure time of enrichment
+
+# fields of spots returned by SOTA API used by the pack
+SPOT_COLUMNS = ['id', 'timeStamp', 'activatorCallsign', 'associationCode', 'summitCode', 'frequency', 'mode']
+
+
+def _masked_column(mask, values, fill = None):
+    """Return object column holding values where mask is set and fill value elsewhere"""
+    column = np.full(len(mask), fill, dtype = object)
+    column[mask] = values
+    return column
+
+
+def _set_column(spots_df, column, mask, values, fill = None):
+    """Save values in spots_df column for rows where mask is set, keep fill value (None by default) elsewhere"""
+    # column is kept as object to make sure pandas doesn't convert None into NaN
+    spots_df[column] = pd.Series(_masked_column(mask, values, fill), index = spots_df.index, dtype = object)
+
+
+def assign_bands(frequency, bands_df):
+    """Bucket frequencies into bands, return arrays with band names and band colors (None if out of any band)"""
+    # bands do not overlap, so after sorting them by lower frequency each spot may only fall into the band
+    # with the highest lower frequency not above spotted one - it's enough to check its upper frequency then
+    bands_sorted = bands_df.sort_values('lower_freq')
+    lower_freq = bands_sorted['lower_freq'].to_numpy(dtype = 'float')
+    upper_freq = bands_sorted['upper_freq'].to_numpy(dtype = 'float')
+    frequency = np.asarray(frequency, dtype = 'float')
+    position = np.searchsorted(lower_freq, frequency, side = 'right') - 1
+    in_band = position >= 0
+    in_band[in_band] = frequency[in_band] <= upper_freq[position[in_band]]
+    band_names = np.asarray(bands_sorted.index, dtype = object)
+    band_colors = bands_sorted['color'].to_numpy(dtype = object)
+    return (_masked_column(in_band, band_names[position[in_band]]),
+            _masked_column(in_band, band_colors[position[in_band]]))
+
+
+def assign_mode_colors(modes, modes_df):
+    """Map (uppercase) modes to their colors, return an array with None for modes not found in modes_df"""
+    mode_colors = pd.Series(modes_df['color'].to_numpy(dtype = object), index = modes_df['mode'].str.upper())
+    colors = pd.Series(modes, dtype = object).map(mode_colors).astype(object)
+    return colors.where(colors.notna(), None).to_numpy()
+
+
+def find_summits(summits, summit_codes):
+    """Look up summit codes in SOTA Database, return mask of codes found and DataFrame with their data"""
+    # summits may be either SummitTable loaded from binary cache or DataFrame indexed by SummitCode
+    summit_codes = pd.Series(summit_codes, dtype = 'string').fillna('').str.upper()
+    if isinstance(summits, pd.DataFrame):
+        found = summit_codes.isin(summits.index).to_numpy(dtype = bool)
+        return found, summits.reindex(summit_codes[found].to_numpy())
+    positions = summits.locate(summit_codes.to_numpy(dtype = str))
+    found = positions >= 0
+    return found, summits.take(positions[found])
+
+
+def prepare_spots(spots_dict):
+    """Convert spots downloaded from SOTA API into DataFrame with datatypes required for analysis"""
+    spots_df = pd.DataFrame(spots_dict, columns = SPOT_COLUMNS if len(spots_dict) == 0 else None)
+
+    # replace frequency where it's provided in incorrect format with 0
+    spots_df['frequency'] = spots_df['frequency'].astype('string')
+    spots_df.loc[~spots_df['frequency'].str.match(r'\d+(\.\d+)?').fillna(False), 'frequency'] = '0'
+
+    # convert datatypes for relevant fields
+    spots_df['activatorCallsign'] = spots_df['activatorCallsign'].astype('string')
+    spots_df['associationCode'] = spots_df['associationCode'].astype('string')
+    spots_df['summitCode'] = spots_df['summitCode'].astype('string')
+    spots_df['mode'] = spots_df['mode'].astype('string')
+    spots_df['frequency'] = spots_df['frequency'].astype('float')
+    spots_df['timeStamp'] = pd.to_datetime(spots_df['timeStamp'])
+
+    # add full summit codes column to spots_df DataFrame
+    spots_df['summit'] = spots_df['associationCode']+'/'+spots_df['summitCode']
+    return spots_df
+
+
+def spot_description(spots_df):
+    """Describe activation of every spot (summit, points, activator, frequency and mode), return Series of texts"""
+    return ('Summit ' + spots_df['summitName'].astype(str).str.title()
+            + ' - ' + spots_df['summit'].astype(str)
+            + ' (' + spots_df['points'].astype(str) + ' points)\nactivated by '
+            + spots_df['activatorCallsign'].astype(str).str.upper()
+            + '\non ' + spots_df['frequency'].astype(str)
+            + ' - ' + spots_df['mode'].astype(str).str.upper())
+
+
+def add_spot_age(spots_df, now = None):
+    """Calculate time since spot and popup with spot's description for spots with known summits, return spots"""
+    # these values change with time, so they're calculated separately from the rest of enrichment
+    if now is None:
+        now = datetime.utcnow()
+    spots_df = spots_df.copy()
+    found = spots_df['summitName'].notna().to_numpy(dtype = bool)
+
+    # time since spot in hour fraction
+    time_since_spot = (now - spots_df['timeStamp']) / timedelta(hours = 1)
+    spots_df['time_since_spot'] = time_since_spot.where(found, np.nan).astype('float')
+
+    # popup column provides a summary of activation to be displayed on map
+    spots_found = spots_df.loc[found]
+    popup = (spot_description(spots_found)
+             + '\n' + np.round(spots_found['time_since_spot'] * 60).astype('int').astype(str)
+             + ' minutes ago\n.')
+    _set_column(spots_df, 'popup', found, popup.to_numpy(dtype = object), fill = np.nan)
+    return spots_df
+
+
+@timed('enrich')
+def enrich_spots(spots_df, summits, bands_df, modes_df, now = None, resolver = None, positions = None):
+    """Add summit, band, mode and time data required for visualisation to spots, return spots and list of summits not found"""
+    # spots_df needs to have 'summit' column already and be re-indexed after removing duplicated activator-summit pairs
+    # summits is SOTA Database - SummitTable or DataFrame indexed by SummitCode
+    # resolver (SummitResolver) corrects misspelled summit codes, positions are activators' recent positions for it
+    if now is None:
+        now = datetime.utcnow()
+    spots_df = spots_df.copy()
+
+    # copy relevant data for visualisation from SOTA database extract in one join, leave None for missing summits
+    found, summits_found = find_summits(summits, spots_df['summit'])
+    if resolver is not None:
+        # typos in summit codes are corrected before the join, spotted code is kept in spottedSummit column
+        spots_df = resolver.correct_spots(spots_df, found, summits_found, positions)
+        if spots_df['spottedSummit'].notna().any():
+            found, summits_found = find_summits(summits, spots_df['summit'])
+    _set_column(spots_df, 'longitude', found, summits_found['Longitude'].to_numpy(dtype = object))
+    _set_column(spots_df, 'latitude', found, summits_found['Latitude'].to_numpy(dtype = object))
+    _set_column(spots_df, 'points', found, summits_found['Points'].to_numpy(dtype = object))
+    _set_column(spots_df, 'summitName', found, summits_found['SummitName'].to_numpy(dtype = object))
+
+    # modes are unified to upper case and mapped to colors only for spots with known summits
+    spots_df.loc[found, 'mode'] = spots_df.loc[found, 'mode'].str.upper()
+    _set_column(spots_df, 'mode_color', found, assign_mode_colors(spots_df.loc[found, 'mode'], modes_df))
+
+    # assess band based on frequency spotted
+    band, band_color = assign_bands(spots_df.loc[found, 'frequency'], bands_df)
+    _set_column(spots_df, 'band', found, band)
+    _set_column(spots_df, 'band_color', found, band_color)
+
+    # time since spot in hour fraction and description of spot
+    spots_df = add_spot_age(spots_df, now)
+
+    # if summit isn't found in database, print warning, save it on a list and leave their data with None
+    # List of summits is periodically updated, but typos in summits codes in spots are also common
+    summits_errors = []
+    for spot in spots_df.loc[~found].itertuples():
+        print(f"Summit {spot.summit} activated by {spot.activatorCallsign.upper()} on {spot.frequency} - {spot.mode.upper()}  NOT FOUND.")
+        summits_errors.append({spot.summit})
+
+    return spots_df, summits_errors
@@ -0,0 +1,170 @@
+import os # for file system operations
+import threading # to download spots in background
+import time # for time measurements
+import pandas as pd # for data analysis
+from datetime import datetime, timedelta # for time calculations
+from spots_enrichment import prepare_spots, enrich_spots, add_spot_age # for adding summits, bands and modes data to spots
+from summit_resolver import ErrorStore, activator_positions # for correcting and counting summits not found
+from metrics import timed, SPOTS # to measure spots processing
+
+
+def new_activations(spots_df, known_df):
+    """Count activator-summit pairs of spots which are not found in known spots (e.g. the buffer)"""
+    pairs = ['activatorCallsign', 'summit']
+    new = pd.MultiIndex.from_frame(spots_df[pairs].astype(object)).unique()
+    return int((~new.isin(pd.MultiIndex.from_frame(known_df[pairs].astype(object)))).sum())
+
+
+class SpotsSnapshot:
+    """Spots ready for visualisation at given moment - never modified after creation, so it's safe to share"""
+
+    def __init__(self, spots_df, version = 0, updated = None):
+        self.spots_df = spots_df
+        self.version = version
+        self.updated = updated if updated is not None else datetime.utcnow()
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived(self, name, build):
+        """Return data derived from spots (e.g. map markers), built with build(spots_df) only once per snapshot"""
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = build(self.spots_df)
+            return self._derived[name]
+
+
+class SpotPoller:
+    """Download spots in background every interval seconds, keep recent ones in bounded buffer and enrich only new arrivals"""
+
+    def __init__(self, fetch, summits, bands_df, modes_df, interval = 60, window = timedelta(hours = 1),
+                 capacity = 5000, errors_path = 'summits_errors.json', resolver = None, archive = None,
+                 snapshot_path = None):
+        # fetch is a function returning spots from SOTA API (list of dictionaries), e.g. lambda: get_spots(-1)
+        # resolver (SummitResolver) corrects typos in summit codes spotted, archive (SpotArchive) keeps all new spots
+        # buffer is saved in snapshot_path file (if given) after every poll and restored from it on start
+        self.fetch = fetch
+        self.summits = summits
+        self.bands_df = bands_df
+        self.modes_df = modes_df
+        self.interval = interval
+        self.window = window
+        self.capacity = capacity
+        self.resolver = resolver
+        self.archive = archive
+        self.errors = ErrorStore(errors_path)
+        self.snapshot = SpotsSnapshot(enrich_spots(prepare_spots([]), summits, bands_df, modes_df, resolver = resolver)[0])
+        # buffer keeps enriched spots from the window, newest first and limited to capacity spots
+        self._buffer = self.snapshot.spots_df
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.listeners = []
+        self.snapshot_path = snapshot_path
+        if snapshot_path is not None:
+            self.restore()
+
+    def publish(self, buffer, now):
+        """Keep buffer and publish snapshot of spots for visualisation made of it"""
+        self._buffer = buffer
+        # drop duplicated activator-summit pairs to avoid double visualisation for them
+        # only last spot sent by activator on a summit is considered
+        visible_df = buffer.drop_duplicates(subset = ['activatorCallsign', 'summit']).reset_index(drop = True)
+        # time since spot changes even if there are no new spots, so it's refreshed on every poll
+        self.snapshot = SpotsSnapshot(add_spot_age(visible_df, now), self.snapshot.version + 1, now)
+        # listeners (e.g. stream of spots to browsers) get every snapshot published
+        for listener in self.listeners:
+            listener(self.snapshot)
+
+    def restore(self):
+        """Load spots saved by previous run, so snapshot is ready before the first poll, return True if loaded"""
+        # saved spots are used only if they have all columns of enriched spots (saved by the same version of the dashboard)
+        try:
+            buffer = pd.read_pickle(self.snapshot_path)
+        except Exception:
+            return False
+        if not isinstance(buffer, pd.DataFrame) or not set(self._buffer.columns) <= set(buffer.columns):
+            return False
+        now = datetime.utcnow()
+        with self._lock:
+            self.publish(self.recent(buffer, now), now)
+        return True
+
+    def save(self):
+        """Save buffer in snapshot_path file"""
+        # file is written under temporary name first, so other processes never read half-written file
+        self._buffer.to_pickle(f'{self.snapshot_path}.{os.getpid()}.tmp')
+        os.replace(f'{self.snapshot_path}.{os.getpid()}.tmp', self.snapshot_path)
+
+    def recent(self, buffer, now, fetched = None):
+        """Leave spots from the window in the buffer - or, if there are none, spots of the latest download
+        (ids in fetched, all spots if not given), so the map isn't empty in quiet periods"""
+        # if there are no spots in the last hour, SOTA API returns the latest spots instead - they're shown
+        # until new spots are sent
+        in_window = buffer['timeStamp'] >= now - self.window
+        if in_window.any():
+            buffer = buffer[in_window]
+        elif fetched is not None:
+            buffer = buffer[buffer['id'].isin(fetched)]
+        return buffer.head(self.capacity).reset_index(drop = True)
+
+    @timed('poll')
+    def poll(self):
+        """Download spots once, add new ones to the buffer and publish new snapshot, return number of new spots"""
+        # only one poll at a time may modify the buffer
+        with self._lock:
+            now = datetime.utcnow()
+            spots_df = prepare_spots(self.fetch())
+            buffer = self._buffer
+            SPOTS.inc(len(spots_df), state = 'fetched')
+
+            fetched = spots_df['id']
+            # skip spots already known (by spot id) - spots older than the window are enriched and archived too
+            spots_df = spots_df[~spots_df['id'].isin(buffer['id'])]
+            spots_df = spots_df.drop_duplicates(subset = ['id']).reset_index(drop = True)
+            # activators' positions from spots in the buffer help to correct typos in codes of their next summits
+            spots_df, summits_errors = enrich_spots(spots_df, self.summits, self.bands_df, self.modes_df, now,
+                                                    self.resolver, activator_positions(buffer))
+            self.save_errors(spots_df, summits_errors)
+            if self.archive is not None:
+                self.archive.append(spots_df)
+            # deduplicated spots are counted once per activator-summit pair, like spots shown on the map
+            SPOTS.inc(new_activations(spots_df, buffer), state = 'deduplicated')
+            SPOTS.inc(len(summits_errors), state = 'unresolved')
+
+            # new spots are added on top of the buffer, spots out of the window or above capacity are dropped
+            buffer = pd.concat([spots_df, buffer], ignore_index = True) if len(buffer) > 0 else spots_df
+            buffer = self.recent(buffer.sort_values('timeStamp', ascending = False, kind = 'stable'), now, fetched)
+            self.publish(buffer, now)
+            if self.snapshot_path is not None:
+                self.save()
+            return len(spots_df)
+
+    def save_errors(self, spots_df, summits_errors):
+        """Count summit codes not found in SOTA Database and corrected ones in errors file"""
+        self.errors.add_spots(spots_df, summits_errors, self.resolver)
+        self.errors.save()
+
+    def run(self, delay = None):
+        """Poll SOTA API every interval seconds until stopped, first time after delay seconds (interval by default)"""
+        delay = self.interval if delay is None else delay
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                start = time.perf_counter()
+                new_spots = self.poll()
+                print(f'{new_spots} new spots, {len(self.snapshot.spots_df)} spots visualised ({time.perf_counter() - start:.2f} s).')
+            # problems with SOTA API can't stop the dashboard - previous snapshot is served until next poll
+            except Exception as error:
+                print(f'Spots not refreshed: {error!r}')
+
+    def start(self, delay = None):
+        """Start polling in background thread, first poll after delay seconds (interval by default)"""
+        # thread is started again in processes forked after start (e.g. gunicorn workers), as threads aren't copied
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target = self.run, args = (delay,), name = 'spot-poller', daemon = True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop polling"""
+        self._stop.set()
@@ -0,0 +1,116 @@
+import json # to serialise messages once for all clients
+import queue # every client has its own bounded queue of messages
+import threading # spots are published from poller's thread
+from metrics import STREAM_CLIENTS, STREAM_MESSAGES # to measure clients of the stream
+
+# messages waiting for a client - slower client gets the latest snapshot instead of messages it missed
+QUEUE_SIZE = 8
+
+# comment sent to idle clients every KEEPALIVE seconds, so proxies don't close the connection
+KEEPALIVE = 15
+
+
+def format_event(event, version, data):
+    """Format server-sent event with JSON data, return it as bytes"""
+    return f'event: {event}\nid: {version}\ndata: {json.dumps(data, separators = (",", ":"))}\n\n'.encode()
+
+
+class Subscriber:
+    """Connection of one client - bounded queue of messages to send"""
+
+    def __init__(self, queue_size = QUEUE_SIZE):
+        self.queue = queue.Queue(queue_size)
+
+    def put(self, message):
+        """Queue message, if queue is full replace all waiting messages with request to send the latest snapshot"""
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # client is too slow (or its connection stalled) - messages it missed are dropped, so memory used
+            # by the client is bounded, and it gets current spots at once when it reads again
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.queue.put_nowait(None)
+            STREAM_MESSAGES.inc(kind = 'resync')
+
+
+class SpotsBroadcaster:
+    """Changes of spots snapshot pushed to all connected browsers as server-sent events
+
+    Every new snapshot is compared with the previous one once and the change (features added and ids removed)
+    is serialised once, then the same bytes are queued for every client - so work done per snapshot doesn't
+    depend on number of clients. New clients (and slow ones) get whole snapshot instead."""
+
+    def __init__(self, features, queue_size = QUEUE_SIZE):
+        # features is a function returning list of GeoJSON features (with ids) of snapshot
+        self.features = features
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._snapshot = None
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def snapshot_message(self):
+        """Return message with all features of the latest snapshot"""
+        return self._snapshot
+
+    def publish(self, snapshot):
+        """Send change of spots since previous snapshot to all clients"""
+        features = {feature['id']: feature for feature in self.features(snapshot)}
+        with self._lock:
+            # features of spots never change (time since spot is calculated in the browser), so only new
+            # and removed ones are sent
+            added = [feature for feature_id, feature in features.items() if feature_id not in self._ids]
+            removed = [feature_id for feature_id in self._ids if feature_id not in features]
+            self._ids = features
+            self._snapshot = format_event('snapshot', snapshot.version, {'version': snapshot.version, 'features': list(features.values())})
+            if not added and not removed:
+                return
+            message = format_event('delta', snapshot.version, {'version': snapshot.version, 'added': added, 'removed': removed})
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(message)
+        STREAM_MESSAGES.inc(len(subscribers), kind = 'delta')
+
+    def subscribe(self):
+        """Add new client, return its Subscriber with the latest snapshot already queued"""
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            # snapshot is queued under the lock, so client gets every change published after it
+            if self._snapshot is not None:
+                subscriber.put(self._snapshot)
+                STREAM_MESSAGES.inc(kind = 'snapshot')
+            self._subscribers.add(subscriber)
+            STREAM_CLIENTS.set(len(self._subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove client"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            STREAM_CLIENTS.set(len(self._subscribers))
+
+    def stream(self, keepalive = KEEPALIVE):
+        """Generate messages for one client until it disconnects (body of text/event-stream response)"""
+        subscriber = self.subscribe()
+        try:
+            # browser reconnects after 5 seconds if connection is lost
+            yield b'retry: 5000\n\n'
+            while True:
+                try:
+                    message = subscriber.queue.get(timeout = keepalive)
+                except queue.Empty:
+                    yield b': keepalive\n\n'
+                    continue
+                if message is None:
+                    message = self.snapshot_message()
+                    STREAM_MESSAGES.inc(kind = 'snapshot')
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
@@ -1,27 +1,12 @@
-import requests # for communication with API
 import pandas as pd # for data analysis
 import folium # for data visualisation on a map
-from datetime import datetime, timedelta # for time calculations
-
-def get_spots(time = -1):
-      """Downdload spots aleted in defined timeframe or defined number of latests spots"""
-      # if time is negative - download spots alerted in defined number of alerts
-      # if time is positive - download given number of latest spots
-      # /api/.../all - if ... is positive - number of spots, if negative - number of hours
-      temp_spots_dict = {}
-      url = f'https://api2.sota.org.uk/api/spots/{time}/all'
-      r = requests.get(url)
-      print(f'Status code: {r.status_code}')
-      temp_spots_dict = r.json()
-      if time > 0:
-            print(f'{len(temp_spots_dict)} found where expected number was {time}.')
-      if time <= 0:
-            print(f'{len(temp_spots_dict)} spots found in latest {-time} h.')
-      # if there are no spots sent in time provided, return latest 10 to make sure dictionary is not empty
-      if len(temp_spots_dict) == 0:
-          temp_spots_dict = get_spots(10)
-      return temp_spots_dict
-
+from geojson_layer import circles_layer # to draw all spots as one layer
+from spots_enrichment import prepare_spots, enrich_spots # for adding summits, bands and modes data to spots
+from summits_db import load_summits # for loading SOTA summits database
+from summit_resolver import SummitResolver, ErrorStore # for correcting and counting summits not found
+from spot_archive import SpotArchive # to keep history of spots
+from sota_api import get_spots, download_summits_list # for communication with API
+from metrics import STAGE_SECONDS, SPOTS, summary # to measure time of the run
 
 # create dataframes to store bands and modes data and map to colors for visualisation
 # lower and upper freqs does not refer to bandplan to make sure frequencies are mapped correctly during visualisation
@@ -45,120 +30,112 @@ modes_df = pd.DataFrame(modes)
 modes_df['color'] = modes_df['color'].astype('string')
 modes_df['mode'] = modes_df['mode'].astype('string')
 
-# create dictionary to keep the spots a list for summits
-spots_dict = {}
-
-# import spots and convert them into DataFrame
-spots_dict = get_spots()
-spots_df = pd.DataFrame(spots_dict)
-
-# convert datatypes for relevant fields
-spots_df['activatorCallsign'] = spots_df['activatorCallsign'].astype('string')
-spots_df['associationCode'] = spots_df['associationCode'].astype('string')
-spots_df['summitCode'] = spots_df['summitCode'].astype('string')
-spots_df['mode'] = spots_df['mode'].astype('string')
-spots_df['frequency'] = spots_df['frequency'].astype('float')
-spots_df['timeStamp'] = pd.to_datetime(spots_df['timeStamp'])
-
-# create DataFrame based on csv file with all the summits saved (regularly updated
-# from https://www.sotadata.org.uk/summitslist.csv, and converting the datatypes
-# first row of CSV file is a header, so should be ignored
-# create DataFrame based on csv file with all the summits saved
-SOTA_summits_df = pd.read_csv('summitslist.csv', skiprows = 1, dtype = {
-    0: 'string',
-    1: 'string',
-    2: 'string',
-    3: 'string',
-    4: 'int',
-    5: 'int',
-    6: 'string',
-    7: 'string',
-    8: 'float',
-    9: 'float',
-    10: 'int',
-    11: 'int',
-#    12: not relevant
-#    13: not relevant
-    14: 'int',
-#    15: not relevant
-    16: 'string'
-}
-)
-
-SOTA_summits_df = SOTA_summits_df.set_index('SummitCode')
-
-# add summit codes to spots_df DataFrame
-spots_df['summit'] = spots_df['associationCode']+'/'+spots_df['summitCode']
-
-# drop duplicated activator-summit pairs from spots_df to avoid double visualisation for them
-# only last spot sent by activator on a summit is considered
-# create empty columns for data required for visualisation (will b filled with database data)
-# then re-index this dataframe
-spots_df = spots_df.drop_duplicates(subset = ['activatorCallsign', 'summit'])
-spots_df['longitude'] = None
-spots_df['latitude'] = None
-spots_df['points'] = None
-spots_df['summitName'] = None
-spots_df['mode_color'] = None
-spots_df['band_color'] = None
-spots_df = spots_df.reset_index(drop = True)
-
-
-# list to keep summit codes not found in SOTA Database file
-# List of summits is periodically updated, but typos in summits codes in spots are also common
-summits_errors = []
-
-# copying relevant data for visualisation from SOTA database extract to spots dataframe
-# also adding time since spot in hour fraction and description of spot
-# adding previously defined colorcodes for band and mode to each spot, together with a band for each one
-# popup column provides a summary of activation to be displayed on map
-for i in range(0, len(spots_df)):
-    # if summits data are correct,prepare spot's data for visualisation
-    if spots_df.loc[i, ('summit')].upper() in SOTA_summits_df.index:
-        spots_df.loc[i, ('longitude')] = SOTA_summits_df['Longitude'][spots_df.loc[i, 'summit']]
-        spots_df.loc[i, ('latitude')] = SOTA_summits_df['Latitude'][spots_df.loc[i, 'summit']]
-        spots_df.loc[i, ('points')] = SOTA_summits_df['Points'][spots_df.loc[i, 'summit']]
-        spots_df.loc[i, ('summitName')] = SOTA_summits_df['SummitName'][spots_df.loc[i, 'summit']]
-        spots_df.loc[i, ('time_since_spot')] = datetime.utcnow()-spots_df.loc[i, ('timeStamp')]
-        spots_df.loc[i, ('time_since_spot')] = spots_df.loc[i, ('time_since_spot')]/timedelta(hours=1)
-        spots_df.loc[i, ('popup')] = f"Summit {spots_df.loc[i, ('summitName')].title()} - {spots_df.loc[i, ('summit')]} ({spots_df.loc[i, ('points')]} points)\nactivated by {spots_df.loc[i, ('activatorCallsign')].upper()}\non {spots_df.loc[i, ('frequency')]} - {spots_df.loc[i, ('mode')].upper()}\n{round(spots_df.loc[i, ('time_since_spot')]*60)} minutes ago\n."
-        spots_df.loc[i, ('mode')] = spots_df.loc[i, ('mode')].upper()
-        for band in bands_df.index: # assess band based on frequency spotted
-            if (spots_df.loc[i, ('frequency')] >= bands_df['lower_freq'][band]) and (spots_df.loc[i, ('frequency')] <= bands_df['upper_freq'][band]):
-                spots_df.loc[i, ('band_color')] = bands_df['color'][band]
-                spots_df.loc[i, ('band')] = band
-        for j in modes_df.index:
-            if spots_df.loc[i, ('mode')] == modes_df.iloc[j]['mode'].upper():
-                spots_df.loc[i,('mode_color')] = modes_df.iloc[j]['color']
-    # if summit isn't found in database, print warning, save it on a list and leave their data with None
-    else:
-        print(f"Summit {spots_df.loc[i, ('summit')]} activated by {spots_df.loc[i, ('activatorCallsign')].upper()} on {spots_df.loc[i, ('frequency')]} - {spots_df.loc[i, ('mode')].upper()}  NOT FOUND.")
-        summits_errors.append({spots_df.loc[i, ('summit')]})
-
-# save errors to file
-if len(summits_errors) != 0:
-    with open('summits_errors.txt', 'a') as f:
-        for error in summits_errors:
-            f.write(f'{error}\n')
-# create a map
-activations_map = folium.Map(location=[50, 20],  # map is centered on Kraków - city where I live
-                             tiles="Stamen Terrain",
-                             zoom_start=2  # show whole world at once
-                             )
-
-# add spots to a map
-for i in range(0, len(spots_df)):  # add point for every spot (with duplicates removed)
-    if spots_df.loc[i, ('longitude')] != None:  # ignore spots where no reference data in SOTA database was found
-        folium.CircleMarker(
-            location=[spots_df.loc[i, ('latitude')], spots_df.loc[i, ('longitude')]],  # spot's location
-            radius=(1 - spots_df.loc[i, ('time_since_spot')]) * 15,  # radius is proportional to time from sending
-            # the spot. The newest spot, the larger circle
-            popup=spots_df.loc[i, ("popup")],
-            fill_color=spots_df.loc[i, ('band_color')],  # circle's fill represents activation's band
-            weight=3,
-            color=spots_df.loc[i, ('mode_color')],  # border color represents activation's mode
-            fill_opacity=1
-        ).add_to(activations_map)
 
-# save map in a file
-activations_map.save('activations_map.html')
+def analyse_spots(spots_dict, SOTA_summits, resolver = None, archive = None, errors_path = None):
+    """Convert spots into DataFrame and add summits, bands and modes data, return it with list of summits not found"""
+    # convert spots into DataFrame and datatypes for relevant fields, add summit codes
+    spots_df = prepare_spots(spots_dict)
+    SPOTS.inc(len(spots_df), state = 'fetched')
+
+    # copying relevant data for visualisation from SOTA database extract to spots dataframe
+    # also adding time since spot in hour fraction, description of spot and colorcodes for band and mode
+    # summits_errors keeps summit codes not found in SOTA Database file, typos are corrected by resolver (if given)
+    spots_df, summits_errors = enrich_spots(spots_df, SOTA_summits, bands_df, modes_df, resolver = resolver)
+    SPOTS.inc(len(summits_errors), state = 'unresolved')
+
+    # all spots downloaded are saved in spots archive (if given), before duplicates are removed
+    if archive is not None:
+        archive.append(spots_df)
+
+    # drop duplicated activator-summit pairs from spots_df to avoid double visualisation for them
+    # only last spot sent by activator on a summit is considered, then re-index this dataframe
+    kept = ~spots_df.duplicated(subset = ['activatorCallsign', 'summit']).to_numpy()
+    # summits not found are kept only for spots left, so (as before spots were archived) every code not found
+    # or corrected is counted once per activator-summit pair, not once per spot downloaded
+    not_found = spots_df['summitName'].isna().to_numpy()
+    summits_errors = [error for error, keep in zip(summits_errors, kept[not_found]) if keep]
+    spots_df = spots_df[kept].reset_index(drop = True)
+
+    # summit codes not found and corrected are counted in errors file (if given)
+    if errors_path is not None:
+        save_errors(spots_df, summits_errors, resolver, errors_path)
+
+    SPOTS.inc(len(spots_df), state = 'deduplicated')
+    return spots_df, summits_errors
+
+def save_errors(spots_df, summits_errors, resolver = None, path = 'summits_errors.json'):
+    """Count summit codes not found in SOTA Database (and corrected ones) in errors file"""
+    # every code is saved once, with number of spots, when it was seen and summits it was resolved to or suggested
+    errors = ErrorStore(path)
+    errors.add_spots(spots_df, summits_errors, resolver)
+    errors.save()
+
+def draw_spots_map(spots_df, tiles = "Stamen Terrain", render = 'geojson'):
+    """Create Folium map with spots, return it"""
+    # render = 'geojson' draws all spots as one GeoJSON layer styled in the browser (much smaller HTML file),
+    # render = 'markers' adds separate CircleMarker for every spot
+    # create a map
+    activations_map = folium.Map(location=[50, 20],  # map is centered on Kraków - city where I live
+                                 tiles=tiles,
+                                 zoom_start=2  # show whole world at once
+                                 )
+
+    if render == 'geojson':
+        # ignore spots where no reference data in SOTA database was found
+        spots_found = spots_df[spots_df['longitude'].notna()]
+        circles_layer(
+            spots_found['latitude'], spots_found['longitude'],  # spot's location
+            (1 - spots_found['time_since_spot']) * 15,  # radius is proportional to time from sending the spot
+            spots_found['band_color'],  # circle's fill represents activation's band
+            spots_found['popup'],
+            color = spots_found['mode_color'],  # border color represents activation's mode
+            weight = 3
+        ).add_to(activations_map)
+        return activations_map
+
+    # add spots to a map
+    for i in range(0, len(spots_df)):  # add point for every spot (with duplicates removed)
+        if spots_df.loc[i, ('longitude')] != None:  # ignore spots where no reference data in SOTA database was found
+            folium.CircleMarker(
+                location=[spots_df.loc[i, ('latitude')], spots_df.loc[i, ('longitude')]],  # spot's location
+                radius=(1 - spots_df.loc[i, ('time_since_spot')]) * 15,  # radius is proportional to time from sending
+                # the spot. The newest spot, the larger circle
+                popup=spots_df.loc[i, ("popup")],
+                fill_color=spots_df.loc[i, ('band_color')],  # circle's fill represents activation's band
+                weight=3,
+                color=spots_df.loc[i, ('mode_color')],  # border color represents activation's mode
+                fill_opacity=1
+            ).add_to(activations_map)
+    return activations_map
+
+def main(summits_csv = 'summitslist.csv', output = 'activations_map.html', client = None, archive_path = 'spots_archive',
+         render = 'geojson'):
+    """Download latest spots, visualise them on a map and save it in output file"""
+    # spots are drawn as one GeoJSON layer by default, render = 'markers' draws them as before - separate
+    # CircleMarker for every spot
+    # import spots (if there are no spots in the last hour, 10 latest spots are downloaded instead)
+    spots_dict = get_spots(client = client)
+
+    # load SOTA Database based on csv file with all the summits saved (regularly updated
+    # from https://www.sotadata.org.uk/summitslist.csv - checked once a day and downloaded only if it has changed)
+    # csv file is converted into binary cache on first run (and whenever it changes), later runs only map the cache
+    download_summits_list(summits_csv)
+    SOTA_summits = load_summits(summits_csv)
+    # index of summit codes for correcting typos, saved next to the binary cache of the database
+    resolver = SummitResolver.from_table(SOTA_summits)
+
+    # spots are also saved in archive directory, partitioned by day, so history of activations is kept
+    # errors are saved to file
+    spots_df, summits_errors = analyse_spots(spots_dict, SOTA_summits, resolver, SpotArchive(archive_path),
+                                             'summits_errors.json')
+
+    # save map in a file
+    with STAGE_SECONDS.time(stage = 'render'):
+        draw_spots_map(spots_df, render = render).save(output)
+
+    # print how long every stage of the run took
+    print(summary())
+
+
+if __name__ == '__main__':
+    main()
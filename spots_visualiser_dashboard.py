@@ -1,31 +1,47 @@
-import requests # for communication with API
+import time # to measure startup of the dashboard
+IMPORT_STARTED = time.perf_counter()
+import os # for file system operations
+import html as html_text # to show summits' names in popups as they are
+import threading # data of the dashboard is loaded once, on first use
+import json # to compare features of the map
+import zlib # for checksums of features of the map
+from flask import Response # to serve metrics and spots stream
 import pandas as pd # for data analysis
-from datetime import datetime, timedelta # for time calculations
-from dash import html, dcc, Dash, Input, Output # for dashboard construction
+from functools import lru_cache # to build summits clusters only once
+from dash import html, dcc, Dash, Input, Output, State, ClientsideFunction, Patch, no_update # for dashboard construction
 import dash_leaflet as dl # to visualise map
-
-def get_spots(time = -1):
-      """Downdload SOTA spots sent in defined timeframe or defined number of latests spots and returns them as dictionary"""
-      # if time is negative - download spots alerted in defined number of alerts
-      # if time is positive - download given number of latest spots
-      # by default looking from a spots sent in last 1 hour
-      temp_spots_dict = {}
-      url = f'https://api2.sota.org.uk/api/spots/{time}/all'
-      r = requests.get(url)
-      print(f'Status code: {r.status_code}')
-      temp_spots_dict = r.json()
-      if time > 0:
-            print(f'{len(temp_spots_dict)} found where expected number was {time}.')
-      if time <= 0:
-            print(f'{len(temp_spots_dict)} spots found in latest {-time} h.')
-      # if there are no spots sent in time provided, return latest 10 to make sure dictionary is not empty
-      if len(temp_spots_dict) == 0:
-          temp_spots_dict = get_spots(10)
-      return temp_spots_dict
+import numpy as np # for columnar operations
+from datetime import datetime, timedelta # for spots history
+from spots_poller import SpotPoller # for downloading spots in background
+from spots_stream import SpotsBroadcaster # to push spots to browsers
+from summits_db import load_summits # for loading SOTA summits database
+from summit_resolver import SummitResolver # for correcting typos in summit codes
+from spot_archive import SpotArchive # to keep history of spots
+from spots_enrichment import enrich_spots, spot_description # for adding summits, bands and modes data to archived spots
+from spatial_clusters import ClusterIndex # to group markers close to each other on the map
+from spatial_index import SummitIndex, distance_km # to find summits and spots near user's locator
+from locators import to_location # to calculate coordinates from user's locator
+from sota_api import get_spots, download_summits_list # for communication with API
+from metrics import REGISTRY, CALLBACK_SECONDS, MARKERS, STARTUP_SECONDS, timed # to measure dashboard performance
 
 # deploy sota_spots_dashboard app in Dash
 sota_spots_dashboard = Dash(__name__)
 
+# how often (in seconds) spots are downloaded from SOTA API and map in open browsers is refreshed
+SPOTS_REFRESH_INTERVAL = 60
+
+# how often (in seconds) SOTA summits database is checked for updates
+SUMMITS_CHECK_INTERVAL = 24 * 3600
+
+# spots from the archive can be replayed for the last REPLAY_DAYS days, heatmap shows up to HEATMAP_WEEKS weeks
+# of activations counted in grid cells of HEATMAP_CELL degrees
+REPLAY_DAYS = 7
+HEATMAP_WEEKS = 52
+HEATMAP_CELL = 0.1
+
+# distances (in km) from user's locator spots and summits can be shown within
+DISTANCES = [10, 25, 50, 100, 250, 500, 1000, 2500]
+
 # create dataframes to store bands and modes data and map to colors for visualisation
 # lower and upper freqs does not refer exactly to bandplan to make sure frequencies are mapped correctly during visualisation
 bands = {
@@ -47,188 +63,534 @@ modes = {
 modes_df = pd.DataFrame(modes)
 modes_df['color'] = modes_df['color'].astype('string')
 modes_df['mode'] = modes_df['mode'].astype('string')
+modes_colors = dict(zip(modes_df['mode'], modes_df['color']))
 
-# create dictionary to keep the spots a list for summits
-spots_dict = {}
-
-# import spots and convert them into DataFrame
-spots_dict = get_spots(-1)
-
-spots_df = pd.DataFrame(spots_dict)
-
-# replace frequency where it's provided in incorrect format with 0
-spots_df.loc[~spots_df['frequency'].str.match(r'\d+(\.\d+)?'), 'frequency'] = 0
-
-# convert datatypes for relevant fields
-spots_df['activatorCallsign'] = spots_df['activatorCallsign'].astype('string')
-spots_df['associationCode'] = spots_df['associationCode'].astype('string')
-spots_df['summitCode'] = spots_df['summitCode'].astype('string')
-spots_df['mode'] = spots_df['mode'].astype('string')
-spots_df['frequency'] =  spots_df['frequency'].astype('float')
-spots_df['timeStamp'] = pd.to_datetime(spots_df['timeStamp'])
-
-# create DataFrame based on csv file with all the summits saved (regularly updated
-# from https://www.sotadata.org.uk/summitslist.csv, and converting the datatypes
-# first row of CSV file is a header, so should be ignored
-SOTA_summits_df = pd.read_csv('summitslist.csv', skiprows = 1, dtype = {
-    0: 'string',
-    1: 'string',
-    2: 'string',
-    3: 'string',
-    4: 'int',
-    5: 'int',
-    6: 'string',
-    7: 'string',
-    8: 'float',
-    9: 'float',
-    10: 'int',
-    11: 'int',
-#    12: not relevant
-#    13: not relevant
-    14: 'int',
-#    15: not relevant
-    16: 'string'
-}
-)
-
-SOTA_summits_df = SOTA_summits_df.set_index('SummitCode')
-
-# add full summit codes column to spots_df DataFrame
-spots_df['summit'] = spots_df['associationCode']+'/'+spots_df['summitCode']
-
-# drop duplicated activator-summit pairs from spots_df to avoid double visualisation for them
-# only last spot sent by activator on a summit is considered
-# create empty columns for data required for visualisation (will b filled with database data)
-# then re-index this dataframe
-spots_df = spots_df.drop_duplicates(subset = ['activatorCallsign', 'summit'])
-print(f'{len(spots_df)} found without duplicates.')
-spots_df['longitude'] = None
-spots_df['latitude'] = None
-spots_df['points'] = None
-spots_df['summitName'] = None
-spots_df['mode_color'] = None
-spots_df['band'] = None
-spots_df['band_color'] = None
-spots_df = spots_df.reset_index(drop = True)
-
-# list to keep summit codes not found in SOTA Database file
-# List of summits is periodically updated, but typos in summits codes in spots are also common
-summits_errors = []
-
-# copying relevant data for visualisation from SOTA database extract to spots dataframe
-# also adding time since spot in hour fraction and description of spot
-# adding previously defined colorcodes for band and mode to each spot, together with a band for each one
-# popup column provides a summary of activation to be displayed on map
-for i in range(0, len(spots_df)):
-    # if summits data are correct,prepare spot's data for visualisation
-    if spots_df.loc[i, ('summit')].upper() in SOTA_summits_df.index:
-        spots_df.loc[i, ('longitude')] = SOTA_summits_df['Longitude'][spots_df.loc[i, 'summit']]
-        spots_df.loc[i, ('latitude')] = SOTA_summits_df['Latitude'][spots_df.loc[i, 'summit']]
-        spots_df.loc[i, ('points')] = SOTA_summits_df['Points'][spots_df.loc[i, 'summit']]
-        spots_df.loc[i, ('summitName')] = SOTA_summits_df['SummitName'][spots_df.loc[i, 'summit']]
-        spots_df.loc[i, ('time_since_spot')] = datetime.utcnow()-spots_df.loc[i, ('timeStamp')]
-        spots_df.loc[i, ('time_since_spot')] = spots_df.loc[i, ('time_since_spot')]/timedelta(hours=1)
-        spots_df.loc[i, ('popup')] = f"Summit {spots_df.loc[i, ('summitName')].title()} - {spots_df.loc[i, ('summit')]} ({spots_df.loc[i, ('points')]} points)\nactivated by {spots_df.loc[i, ('activatorCallsign')].upper()}\non {spots_df.loc[i, ('frequency')]} - {spots_df.loc[i, ('mode')].upper()}\n{round(spots_df.loc[i, ('time_since_spot')]*60)} minutes ago\n."
-        spots_df.loc[i, ('mode')] = spots_df.loc[i, ('mode')].upper()
-        for band in bands_df.index: # assess band based on frequency spotted
-            if (spots_df.loc[i, ('frequency')] >= bands_df['lower_freq'][band]) and (spots_df.loc[i, ('frequency')] <= bands_df['upper_freq'][band]):
-                spots_df.loc[i, ('band_color')] = bands_df['color'][band]
-                spots_df.loc[i, ('band')] = band
-        for j in modes_df.index:
-            if spots_df.loc[i, ('mode')] == modes_df.iloc[j]['mode'].upper():
-                spots_df.loc[i,('mode_color')] = modes_df.iloc[j]['color']
-    # if summit isn't found in database, print warning, save it on a list and leave their data with None
-    else:
-        print(f"Summit {spots_df.loc[i, ('summit')]} activated by {spots_df.loc[i, ('activatorCallsign')].upper()} on {spots_df.loc[i, ('frequency')]} - {spots_df.loc[i, ('mode')].upper()}  NOT FOUND.")
-        summits_errors.append({spots_df.loc[i, ('summit')]})
+class DashboardData:
+    """SOTA Database, spots archive and spots poller used by the dashboard, loaded on first use
+
+    Nothing is loaded or downloaded when the dashboard is imported - create_app() loads everything before
+    the first request (in gunicorn master process with --preload, so forked workers share it)."""
+
+    def __init__(self, summits_csv = 'summitslist.csv', archive_path = 'spots_archive', snapshot_path = 'spots_snapshot.pkl',
+                 fetch = None, interval = SPOTS_REFRESH_INTERVAL):
+        # fetch is a function returning spots from SOTA API (get_spots(-1) by default), called every interval seconds
+        self.summits_csv = summits_csv
+        self.archive_path = archive_path
+        self.snapshot_path = snapshot_path
+        self.fetch = fetch if fetch is not None else lambda: get_spots(-1)
+        self.interval = interval
+        self._summits = None
+        self._resolver = None
+        self._summit_index = None
+        self._archive = None
+        self._poller = None
+        self._stream = None
+        self._checker = None
+        self._lock = threading.RLock()
+
+    @property
+    def summits(self):
+        """SOTA Database - SummitTable memory-mapped from binary cache of summitslist.csv"""
+        # load SOTA Database based on csv file with all the summits saved (regularly updated
+        # from https://www.sotadata.org.uk/summitslist.csv - checked once a day and downloaded only if it has changed)
+        # csv file is converted into binary cache on first run (and whenever it changes), later runs only map the cache
+        # if the file is already saved, it's used right away and updates are checked in background
+        with self._lock:
+            if self._summits is None:
+                if not os.path.exists(self.summits_csv):
+                    download_summits_list(self.summits_csv)
+                self._summits = load_summits(self.summits_csv)
+            return self._summits
+
+    @property
+    def resolver(self):
+        """Index of summit codes for correcting typos in spots"""
+        with self._lock:
+            if self._resolver is None:
+                self._resolver = SummitResolver.from_table(self.summits)
+            return self._resolver
+
+    @property
+    def summit_index(self):
+        """Spatial index of valid summits, to find summits near user's locator"""
+        with self._lock:
+            if self._summit_index is None:
+                self._summit_index = SummitIndex.from_table(self.summits)
+            return self._summit_index
+
+    @property
+    def archive(self):
+        """Archive of all spots downloaded, partitioned by day, so history can be replayed on the map"""
+        with self._lock:
+            if self._archive is None:
+                self._archive = SpotArchive(self.archive_path)
+            return self._archive
+
+    @property
+    def poller(self):
+        """Spots poller - its snapshot always keeps spots from the last hour ready for visualisation"""
+        # spots are downloaded in background every SPOTS_REFRESH_INTERVAL seconds, only new spots (by spot id) are enriched
+        # with summits data, band and mode (typos in summit codes are corrected by resolver, summits not found
+        # in SOTA Database are counted in summits_errors.json)
+        # spots of the previous run are restored from snapshot_path file, so map isn't empty until the first poll
+        with self._lock:
+            if self._poller is None:
+                self._poller = SpotPoller(self.fetch, self.summits, bands_df, modes_df,
+                                          interval = self.interval, resolver = self.resolver,
+                                          archive = self.archive, snapshot_path = self.snapshot_path)
+            return self._poller
 
-# save errors to file
-if len(summits_errors) != 0:
-    with open('summits_errors.txt', 'a') as f:
-        for error in summits_errors:
-            f.write(f'{error}\n')
+    @property
+    def stream(self):
+        """Stream of spots - every snapshot of the poller is pushed to all browsers as a change of spots"""
+        with self._lock:
+            if self._stream is None:
+                self._stream = SpotsBroadcaster(lambda snapshot: snapshot.derived('markers', get_activation_data)[0])
+                self._stream.publish(self.poller.snapshot)
+                self.poller.listeners.append(self._stream.publish)
+            return self._stream
 
-# create spots_df_filtered dataframe as a copy of spots_df to be used later on in callbacks
-spots_df_filtered = spots_df.copy()
+    def check_summits(self):
+        """Download SOTA Database every SUMMITS_CHECK_INTERVAL seconds if it has changed and use it"""
+        while True:
+            if download_summits_list(self.summits_csv, max_age = SUMMITS_CHECK_INTERVAL):
+                summits = load_summits(self.summits_csv)
+                resolver = SummitResolver.from_table(summits)
+                with self._lock:
+                    self._summits, self._resolver, self._summit_index = summits, resolver, None
+                    self.poller.summits, self.poller.resolver = summits, resolver
+                # markers built from previous database are prepared again
+                get_summits_data.cache_clear()
+                get_nearby_summits.cache_clear()
+                get_replay_data.cache_clear()
+            time.sleep(SUMMITS_CHECK_INTERVAL)
 
+    def start(self):
+        """Start downloading spots and checking SOTA Database updates in background (once per process)"""
+        # threads aren't copied to forked processes, so every gunicorn worker starts its own threads
+        # on its first request - SOTA API is not asked before the dashboard starts serving
+        with self._lock:
+            self.poller.start(delay = 0)
+            if self._checker is None or not self._checker.is_alive():
+                self._checker = threading.Thread(target = self.check_summits, name = 'summits-checker', daemon = True)
+                self._checker.start()
 
+# data of the dashboard, loaded on first use
+data = DashboardData()
+
+
+@timed('markers')
 def get_activation_data(spots):
-    """Prepare CircleMarkers list for spots visualisation, return a table of CircleMarkers"""
-    markers = []
-    for i in range(0, len(spots)):
-        if spots.loc[i, ('longitude')] != None: # ignore spots where no reference data in SOTA database was found
-            markers.append(
-            dl.CircleMarker(
-                center=[spots.loc[i, ('latitude')], spots.loc[i, ('longitude')]],  # spot's location
-                radius=(1 - spots.loc[i, ('time_since_spot')]) * 30,  # radius is proportional to time from sending
-                # the spot. The newest spot, the larger circle. Spots with time above 1 hour will be presented as small points
-                children = dl.Popup(spots.loc[i, ("popup")]), # pop-up with spot description
-                fillColor=spots.loc[i, ('band_color')],  # circle's fill represents activation's band
-                weight=3,
-                color=spots.loc[i, ('mode_color')],  # border color represents activation's mode
-                opacity=1,
-                fillOpacity=1,
-            )
-            )
-        # skip incorrect summits
+    """Prepare GeoJSON features for spots visualisation, return list of features and clusters index of them"""
+    # features are prepared once per spots snapshot - filtering by band and mode is done later in the browser
+    spots = spots[spots['longitude'].notna()] # ignore spots where no reference data in SOTA database was found
+    # time since spot (circle's radius and minutes in pop-up) is calculated in the browser from time of the spot,
+    # so features of spots don't change between refreshes and only new or removed spots are sent to the browser
+    descriptions = spot_description(spots)
+    times = spots['timeStamp'].to_numpy(dtype = 'datetime64[s]').astype('int64')
+    features = []
+    for spot, description, spot_time in zip(spots.itertuples(), descriptions, times):
+        properties = {
+            'band': spot.band,
+            'mode': spot.mode,
+            'description': description, # pop-up with spot description
+            'time': int(spot_time), # time of the spot (seconds since 1970) - the newest spot, the larger circle.
+            # Spots with time above 1 hour will be presented as small points
+            'band_color': spot.band_color, # circle's fill represents activation's band
+            'mode_color': spot.mode_color, # border color represents activation's mode
+        }
+        features.append({
+            'type': 'Feature',
+            'id': f'spot-{spot.id}', # spot's id is kept by the browser to update spots layer with changes only
+            'geometry': {'type': 'Point', 'coordinates': [float(spot.longitude), float(spot.latitude)]}, # spot's location
+            'properties': properties,
+        })
+    # spots are counted in clusters by band and mode, so clusters can be filtered in the browser as well
+    spots_index = ClusterIndex(spots['longitude'], spots['latitude'], list(zip(spots['band'], spots['mode'])))
+    MARKERS.set(len(features))
+    return features, spots_index
+
+@lru_cache(maxsize = None)
+def get_summits_data():
+    """Prepare clusters index of valid SOTA summits for summits layer, return it with positions of summits in SOTA Database"""
+    # index is built on first use only, as most users don't look at all summits
+    positions = np.flatnonzero(data.summits.is_valid(np.arange(len(data.summits))))
+    summits_index = ClusterIndex(data.summits.longitude[positions], data.summits.latitude[positions])
+    return summits_index, positions
+
+@lru_cache(maxsize = 32)
+def get_nearby_summits(latitude, longitude, radius):
+    """Prepare clusters index of valid SOTA summits within radius km from a point, return it with positions of summits
+    in SOTA Database"""
+    # summits are found in few cells of spatial index around the point, instead of checking the whole database
+    positions, _ = data.summit_index.within(latitude, longitude, radius)
+    return ClusterIndex(data.summits.longitude[positions], data.summits.latitude[positions]), positions
+
+def get_nearby_spots(spots_data, area):
+    """Leave only spots within area selected by the user (dictionary with its center and radius in km), return
+    their features and clusters index of them"""
+    features, spots_index = spots_data
+    near = np.flatnonzero(distance_km(area['latitude'], area['longitude'], spots_index.latitude, spots_index.longitude)
+                          <= area['radius'])
+    groups = [spots_index.groups[code] for code in spots_index.group_codes[near]]
+    return [features[spot] for spot in near], ClusterIndex(spots_index.longitude[near], spots_index.latitude[near], groups)
+
+@lru_cache(maxsize = 32)
+def get_replay_data(moment):
+    """Prepare markers of spots sent in the hour before moment, read from spots archive, like for the latest spots"""
+    # past hours never change, so markers of every hour replayed are prepared once and shared by all users
+    spots_df = data.archive.query(moment - timedelta(hours = 1), moment)
+    spots_df = spots_df[spots_df['latitude'].notna()]
+    # only last spot sent by activator on a summit is shown, as on the live map
+    spots_df = spots_df.iloc[::-1].drop_duplicates(subset = ['activatorCallsign', 'summit']).reset_index(drop = True)
+    spots_df['frequency'] = spots_df['frequency'].astype('float').round(4)
+    spots_df = enrich_spots(spots_df.drop(columns = ['band', 'latitude', 'longitude']), data.summits, bands_df, modes_df, moment)[0]
+    return get_activation_data(spots_df)
+
+@lru_cache(maxsize = 8)
+def get_heatmap(weeks, moment):
+    """Prepare density heatmap of spots sent in given number of weeks before moment, read from spots archive"""
+    # only coordinates are read from the archive and spots are counted in grid cells, so figure sent to the browser
+    # has one point per cell instead of one per spot
+    # plotly is imported on first use only, so it doesn't slow down startup of the dashboard
+    import plotly.graph_objects as go
+    spots_df = data.archive.query(moment - timedelta(weeks = weeks), moment, columns = ['latitude', 'longitude']).dropna()
+    cells = np.round(spots_df[['latitude', 'longitude']].to_numpy(dtype = 'float') / HEATMAP_CELL)
+    cells, counts = np.unique(cells.reshape(-1, 2), axis = 0, return_counts = True)
+    figure = go.Figure(go.Densitymap(lat = cells[:, 0] * HEATMAP_CELL, lon = cells[:, 1] * HEATMAP_CELL, z = counts,
+                                     radius = 15, colorscale = 'Hot', reversescale = True))
+    figure.update_layout(map_style = 'open-street-map', map_center = {'lat': 50, 'lon': 20}, map_zoom = 2,
+                         margin = {'l': 0, 'r': 0, 't': 0, 'b': 0})
+    return figure
+
+def current_hour():
+    """Return beginning of current hour (UTC), moments of spots history are counted from it"""
+    return datetime.utcnow().replace(minute = 0, second = 0, microsecond = 0)
+
+def cluster_feature(cluster, properties):
+    """Prepare GeoJSON feature presenting cluster of markers"""
+    return {
+        'type': 'Feature',
+        'id': f"cluster-{cluster['cell']}", # grid cell of cluster at current zoom
+        'geometry': {'type': 'Point', 'coordinates': [cluster['longitude'], cluster['latitude']]},
+        'properties': dict(properties, cluster = True, count = cluster['count']),
+    }
+
+def get_visible_spots(spots_data, bounds = None, zoom = 3):
+    """Find spots and clusters of spots visible on the map, return them as a FeatureCollection"""
+    features, spots_index = spots_data
+    clusters, points = spots_index.query(bounds, zoom)
+    visible = [features[point] for point in points]
+    for cluster in clusters:
+        # every cluster keeps number of spots for each band and mode, with their colors, so it can be filtered and
+        # colored in the browser according to bands and modes selected
+        groups = [{
+            'band': band,
+            'mode': mode,
+            'count': count,
+            'band_color': bands_df['color'].get(band),
+            'mode_color': modes_colors.get(mode),
+        } for (band, mode), count in cluster['groups'].items()]
+        visible.append(cluster_feature(cluster, {'groups': groups}))
+    return {'type': 'FeatureCollection', 'features': visible}
+
+def feature_key(feature):
+    """Return key of GeoJSON feature - its id with checksum of its content, which changes whenever feature changes"""
+    return f"{feature['id']}:{zlib.crc32(json.dumps(feature, sort_keys = True).encode()):08x}"
+
+def diff_features(keys, features):
+    """Compare features shown in the browser (keys of them, in order) with features to show, return updates of
+    spots layer's data and of the keys as Dash Patch objects (or no_update for both, if nothing changed)"""
+    # only removed, changed and new features are sent - removed ones are deleted from the end, so positions
+    # of features before them don't change, changed ones are replaced in place and new ones are appended
+    new_keys = {feature['id']: (feature_key(feature), feature) for feature in features}
+    data_patch, keys_patch = Patch(), Patch()
+    changes = 0
+    kept = []
+    for position in reversed(range(len(keys))):
+        feature_id = keys[position].rsplit(':', 1)[0]
+        if feature_id in new_keys:
+            kept.append((feature_id, keys[position]))
         else:
-            pass
-    return markers
+            del data_patch['features'][position]
+            del keys_patch[position]
+            changes += 1
+    for position, (feature_id, key) in enumerate(reversed(kept)):
+        new_key, feature = new_keys.pop(feature_id)
+        if new_key != key:
+            data_patch['features'][position] = feature
+            keys_patch[position] = new_key
+            changes += 1
+    for new_key, feature in new_keys.values():
+        data_patch['features'].append(feature)
+        keys_patch.append(new_key)
+        changes += 1
+    if not changes:
+        return no_update, no_update
+    # when most of the features changed (e.g. after zooming), sending all of them is shorter
+    # (spots layer without keys shows live spots from the stream, so they're replaced as well)
+    if changes > len(features) / 2 or not keys:
+        data_patch = Patch()
+        data_patch['features'] = features
+        return data_patch, [feature_key(feature) for feature in features]
+    return data_patch, keys_patch
+
+def get_visible_summits(bounds = None, zoom = 3, area = None):
+    """Find SOTA summits (only these within area selected by the user, if any) and clusters of summits visible
+    on the map, return them as a FeatureCollection"""
+    if area:
+        summits_index, positions = get_nearby_summits(area['latitude'], area['longitude'], area['radius'])
+    else:
+        summits_index, positions = get_summits_data()
+    clusters, points = summits_index.query(bounds, zoom)
+    summits_df = data.summits.take(positions[points])
+    features = [{
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [float(summit.Longitude), float(summit.Latitude)]},
+        # popup is shown as HTML by dash-leaflet, so names from SOTA database are escaped
+        'properties': {'popup': f'{html_text.escape(str(summit.SummitName))}<br>{html_text.escape(str(summit.Index))}'
+                                f'<br>Points: {summit.Points}'},
+    } for summit in summits_df.itertuples()]
+    features.extend(cluster_feature(cluster, {}) for cluster in clusters)
+    return {'type': 'FeatureCollection', 'features': features}
 
-def generate_maps(spots):
+def generate_maps(spots_geojson):
     """Generate an input for dl.Map object"""
     return [
             dl.TileLayer(), # background layer
-            dl.LayerGroup(get_activation_data(spots)), # add layer with spots
+            dl.GeoJSON(
+                data = spots_geojson, # add layer with spots
+                pointToLayer = {'variable': 'dashExtensions.spots.pointToLayer'}, # spots are drawn as circles
+                filter = {'variable': 'dashExtensions.spots.filter'}, # only selected bands and modes are shown
+                hideout = {'bands': list(bands_df.index), 'modes': list(modes_df['mode'])}, # all shown by default
+                id = 'spots_layer',
+            ),
+            dl.GeoJSON(
+                data = {'type': 'FeatureCollection', 'features': []}, # add layer with SOTA summits, empty until user selects it
+                pointToLayer = {'variable': 'dashExtensions.summits.pointToLayer'},
+                id = 'summits_layer',
+            ),
         ]
 
-# define Dash app layout
-sota_spots_dashboard.layout = html.Div([
-    html.Div(
-            dcc.Dropdown(
-                modes_df['mode'], # values available
-                modes_df['mode'], # values selected by default - all modes
-                multi=True,
-                placeholder='Select mode to apply filter or refresh page to show all',
-                id = 'mode_selection' # dropdown list to select modes to visualise
-                )),
-    html.Div(
-            dcc.Dropdown(
-                bands_df.index, # valus available
-                bands_df.index, # values selected by default - all bands
-                multi=True,
-                placeholder='Select band to apply filter or refresh page to show all',
-                id = 'band_selection' #dropdown list to select bands to visualise
-                )),
-    dl.Map(
-            children = generate_maps(spots_df), # generate map's layers
-            zoom=3, # whole world should be presented upon dashboard start
-            center=(50, 20), # map is centered near Kraków - city where I live
-            style={
-                "height": "100vh", # map's height is 100% of the window
-            },
-            id = 'spots_map', # create a map with spots visualisation
-        )
-])
-
-# add callbacks to dashboard to allow user to filter spots by band and mode
-@sota_spots_dashboard.callback(
-    Output('spots_map','children'),
+def serve_layout():
+    """Generate Dash app layout with the latest spots, so every page load shows current snapshot"""
+    spots_geojson = get_visible_spots(data.poller.snapshot.derived('markers', get_activation_data))
+    return html.Div([
+        html.Div(
+                dcc.Dropdown(
+                    modes_df['mode'], # values available
+                    modes_df['mode'], # values selected by default - all modes
+                    multi=True,
+                    placeholder='Select mode to apply filter or refresh page to show all',
+                    id = 'mode_selection' # dropdown list to select modes to visualise
+                    )),
+        html.Div(
+                dcc.Dropdown(
+                    bands_df.index, # valus available
+                    bands_df.index, # values selected by default - all bands
+                    multi=True,
+                    placeholder='Select band to apply filter or refresh page to show all',
+                    id = 'band_selection' #dropdown list to select bands to visualise
+                    )),
+        html.Div(
+                dcc.Checklist(
+                    ['Show SOTA summits'], # all summits from SOTA Database can be shown under the spots
+                    [],
+                    id = 'summits_selection'
+                    )),
+        html.Div([
+                # only spots and summits around user's locator are shown, if it's given
+                dcc.Input(placeholder = 'Your locator (e.g. JO90xx) to show spots and summits near you', debounce = True,
+                          id = 'locator_selection'),
+                dcc.Slider(0, len(DISTANCES) - 1, 1, value = DISTANCES.index(100), id = 'distance_selection',
+                           marks = {i: f'{distance} km' for i, distance in enumerate(DISTANCES)}),
+                ]),
+        html.Div([
+                # spots history - latest spots, spots replayed from the archive or heatmap of activations
+                dcc.RadioItems(['Live', 'Replay', 'Heatmap'], 'Live', inline = True, id = 'history_mode'),
+                dcc.Slider(-REPLAY_DAYS * 24, 0, 1, value = 0, id = 'replay_time', # hours before now
+                           marks = {**{-24 * day: f'{day} d ago' for day in range(1, REPLAY_DAYS + 1)}, 0: 'now'}),
+                dcc.Slider(1, HEATMAP_WEEKS, 1, value = 4, id = 'heatmap_weeks', # weeks shown on heatmap
+                           marks = {weeks: f'{weeks} w' for weeks in (1, 4, 13, 26, 52)}),
+                ]),
+        dcc.Graph(id = 'heatmap', style = {'display': 'none'}),
+        dl.Map(
+                children = generate_maps(spots_geojson), # generate map's layers
+                zoom=3, # whole world should be presented upon dashboard start
+                center=(50, 20), # map is centered near Kraków - city where I live
+                style={
+                    "height": "100vh", # map's height is 100% of the window
+                },
+                id = 'spots_map', # create a map with spots visualisation
+            ),
+        # timer refreshing time since spots in the browser (new spots are pushed by the server with the stream)
+        dcc.Interval(interval = SPOTS_REFRESH_INTERVAL * 1000, id = 'spots_refresh'),
+        # keys of spots and clusters shown on the map, so only changes are sent to the browser on refresh
+        dcc.Store(data = [feature_key(feature) for feature in spots_geojson['features']], id = 'spots_keys'),
+        # version of live spots received from the stream (assets/spots_stream.js), spots are kept in the browser
+        dcc.Store(id = 'spots_stream'),
+        # area around user's locator (center and radius in km) spots and summits are shown within
+        dcc.Store(id = 'spots_area'),
+    ])
+
+# layout is set by create_app(), so importing the dashboard doesn't load any data
+
+# add clientside callback to dashboard to allow user to filter spots by band and mode
+# selected bands and modes are passed to the spots layer, which filters spots in the browser
+# moment of the map (now or time replayed) is passed as well, so time since spot is calculated in the browser
+# and circles shrink on every refresh interval even if no spots changed
+sota_spots_dashboard.clientside_callback(
+    ClientsideFunction(namespace = 'spots', function_name = 'update_filter'),
+    Output('spots_layer', 'hideout'),
     Input('band_selection', 'value'),
-    Input('mode_selection', 'value')
+    Input('mode_selection', 'value'),
+    Input('spots_refresh', 'n_intervals'),
+    Input('history_mode', 'value'),
+    Input('replay_time', 'value'),
+    )
+
+# live spots are pushed by the server to all browsers with server-sent events (/spots/stream) - one download
+# and enrichment per interval is shared by all of them, and every browser keeps spots and groups them into clusters
+# for current zoom itself (assets/spots_stream.js), so neither refreshes nor moving the map ask the server
+# keys of the spots layer are cleared, so replay mode sends whole layer when it's selected
+sota_spots_dashboard.clientside_callback(
+    ClientsideFunction(namespace = 'spots', function_name = 'live_spots'),
+    Output('spots_layer', 'data', allow_duplicate = True),
+    Output('spots_keys', 'data', allow_duplicate = True),
+    Input('spots_stream', 'data'),
+    Input('spots_map', 'zoom'),
+    Input('history_mode', 'value'),
+    Input('replay_time', 'value'),
+    Input('spots_area', 'data'),
+    prevent_initial_call = True
+    )
+
+# locator given by the user is converted into area around it - spots and summits are filtered by distance from it
+@sota_spots_dashboard.callback(
+    Output('spots_area', 'data'),
+    Input('locator_selection', 'value'),
+    Input('distance_selection', 'value'),
+    prevent_initial_call = True
     )
-def update_map(bands, modes):
-    """Apply filters set-up by the user, return re-created map object"""
-    global spots_df
-    # operations are done on spots_df.filtered to make sure original DataFrame is kept safe
-    # dropdowns return lists with selected bands/modes, so need to check if spot's parameters are within these lists
-    spots_df_filtered = spots_df[spots_df['band'].isin(bands)].copy()
-    spots_df_filtered = spots_df_filtered[spots_df_filtered['mode'].isin(modes)]
-    # reset index to be list starting from 0
-    spots_df_filtered = spots_df_filtered.reset_index(drop = True)
-    return generate_maps(spots_df_filtered)
+@timed('update_area', CALLBACK_SECONDS, 'callback')
+def update_area(locator, distance):
+    """Return center of user's locator with radius (in km) selected, None if locator is empty or not valid"""
+    location = to_location(locator, center = True) if locator else None
+    if location is None:
+        return None
+    return {'latitude': location[0], 'longitude': location[1], 'radius': DISTANCES[distance]}
+
+@sota_spots_dashboard.server.route('/spots/stream')
+def stream_spots():
+    """Stream changes of live spots to the browser as server-sent events"""
+    return Response(data.stream.stream(), mimetype = 'text/event-stream',
+                    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# in replay mode spots sent in the hour before time selected are shown instead, whenever user moves or zooms the map,
+# as only spots and clusters visible in the viewport are sent to the browser
+# only spots and clusters added, removed or changed since the last update are sent (as Dash Patch)
+@sota_spots_dashboard.callback(
+    Output('spots_layer', 'data'),
+    Output('spots_keys', 'data'),
+    Input('spots_map', 'bounds'),
+    Input('spots_map', 'zoom'),
+    Input('history_mode', 'value'),
+    Input('replay_time', 'value'),
+    Input('spots_area', 'data'),
+    State('spots_keys', 'data'),
+    prevent_initial_call = True
+    )
+@timed('update_map', CALLBACK_SECONDS, 'callback')
+def update_map(bounds, zoom, history_mode = 'Live', replay_time = 0, area = None, keys = None):
+    """Return changes of spots and clusters of spots visible on the map in replayed hour for spots layer
+    and for keys of features it shows"""
+    # live spots come from the stream
+    if history_mode != 'Replay' or not replay_time:
+        return no_update, no_update
+    # features and clusters index are prepared once per hour replayed and shared by all users
+    spots_data = get_replay_data(current_hour() + timedelta(hours = replay_time))
+    if area:
+        # clusters of spots near user's locator are prepared for every request - there are only few hundred spots in an hour
+        spots_data = get_nearby_spots(spots_data, area)
+    spots_geojson = get_visible_spots(spots_data, bounds, zoom)
+    return diff_features(keys or [], spots_geojson['features'])
+
+# heatmap of activations from the archive is shown instead of the map
+@sota_spots_dashboard.callback(
+    Output('heatmap', 'figure'),
+    Output('heatmap', 'style'),
+    Output('spots_map', 'style'),
+    Input('history_mode', 'value'),
+    Input('heatmap_weeks', 'value'),
+    )
+@timed('update_heatmap', CALLBACK_SECONDS, 'callback')
+def update_heatmap(history_mode, weeks):
+    """Return heatmap of activations and styles hiding the map (or the heatmap, if it's not selected)"""
+    if history_mode != 'Heatmap':
+        return no_update, {'display': 'none'}, {'height': '100vh'}
+    return get_heatmap(weeks, current_hour()), {'height': '100vh'}, {'display': 'none'}
+
+# SOTA summits are shown in clusters as well, only if user selected them
+@sota_spots_dashboard.callback(
+    Output('summits_layer', 'data'),
+    Input('summits_selection', 'value'),
+    Input('spots_map', 'bounds'),
+    Input('spots_map', 'zoom'),
+    Input('spots_area', 'data'),
+    prevent_initial_call = True
+    )
+@timed('update_summits', CALLBACK_SECONDS, 'callback')
+def update_summits(selection, bounds, zoom, area = None):
+    """Return SOTA summits and clusters of summits visible on the map as GeoJSON data for summits layer"""
+    if not selection:
+        return {'type': 'FeatureCollection', 'features': []}
+    return get_visible_summits(bounds, zoom, area)
+
+# performance metrics of the dashboard (SOTA API requests, spots processed, time of stages and callbacks)
+# in Prometheus text format
+@sota_spots_dashboard.server.route('/metrics')
+def serve_metrics():
+    """Return metrics of the dashboard in Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype = 'text/plain; version=0.0.4')
+
+# spots are downloaded in background in every process serving the dashboard - polling starts on its first request,
+# as threads started in gunicorn master process (with --preload) are not copied to forked workers
+@sota_spots_dashboard.server.before_request
+def start_polling():
+    data.start()
+
+# time from import of the dashboard to its first response is measured once per process
+first_response = threading.Event()
+
+@sota_spots_dashboard.server.after_request
+def measure_first_response(response):
+    if not first_response.is_set():
+        first_response.set()
+        seconds = time.perf_counter() - IMPORT_STARTED
+        STARTUP_SECONDS.set(seconds, phase = 'first_response')
+        print(f'First response {seconds:.2f} s after import of the dashboard.')
+    return response
+
+
+def create_app(preload = True):
+    """Prepare the dashboard to serve, return its Flask server (e.g. for gunicorn)
+
+    With preload, SOTA Database, summits resolver and the latest spots saved by previous run are loaded
+    and markers are prepared right away, so the first user doesn't wait for them."""
+    # run with gunicorn --preload, everything is loaded once in master process and shared by forked workers
+    start = time.perf_counter()
+    if preload:
+        data.poller.snapshot.derived('markers', get_activation_data)
+        get_summits_data()
+    # define Dash app layout
+    sota_spots_dashboard.layout = serve_layout
+    STARTUP_SECONDS.set(time.perf_counter() - start, phase = 'create_app')
+    return sota_spots_dashboard.server
+
 
+STARTUP_SECONDS.set(time.perf_counter() - IMPORT_STARTED, phase = 'import')
 
 # deploy the dashboard
 if __name__ == '__main__':
+    create_app()
     sota_spots_dashboard.run(port=8050, debug=True)
\ No newline at end of file
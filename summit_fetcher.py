@@ -0,0 +1,106 @@
+import os # for file system operations
+import json # to save summits cache
+import time # to check age of cached summits
+from concurrent.futures import ThreadPoolExecutor # to send requests concurrently
+from sota_api import default_client # to get data from SOTA API
+from metrics import timed # to measure time of finding summits
+
+
+class SummitCache:
+    """Summits downloaded from SOTA API, saved on disk in JSON file and valid for ttl seconds"""
+
+    def __init__(self, path = 'summits_api_cache.json', ttl = 30 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        try:
+            with open(path) as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, summit):
+        """Return cached summit data, None if summit wasn't cached or its entry has expired"""
+        entry = self.entries.get(summit)
+        if entry is None or time.time() - entry['fetched'] > self.ttl:
+            return None
+        return entry['data']
+
+    def put(self, summit, data):
+        """Save summit data in cache"""
+        self.entries[summit] = {'fetched': time.time(), 'data': data}
+
+    def save(self):
+        """Write cache to disk"""
+        with open(f'{self.path}.tmp', 'w') as file:
+            json.dump(self.entries, file)
+        os.replace(f'{self.path}.tmp', self.path)
+
+
+def fetch_summit(client, summit):
+    """Download summit data from SOTA API, return tuple (summit data, None) or (None, error)"""
+    # error is HTTP status code if API answered, otherwise name of exception raised
+    data, error = client.summit(summit)
+    print(f'{"Downloaded" if error is None else f"Error {error} for"} {summit}')
+    return data, error
+
+
+def fetch_summits(summits, cache = None, client = None, max_workers = 8):
+    """Get summits data from cache or SOTA API, return dictionaries with summits data and errors"""
+    # only summits not cached yet (or with expired entries) are downloaded, max_workers requests at once
+    summits = list(dict.fromkeys(summits))
+    if client is None:
+        client = default_client()
+    summits_dict = {}
+    errors_dict = {}
+    cached = {summit: cache.get(summit) for summit in summits} if cache is not None else {}
+    missing = [summit for summit in summits if cached.get(summit) is None]
+
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        results = dict(zip(missing, executor.map(lambda summit: fetch_summit(client, summit), missing)))
+
+    # summits are returned in the same order as they were requested
+    for summit in summits:
+        if cached.get(summit) is not None:
+            summits_dict[summit] = cached[summit]
+            continue
+        data, error = results[summit]
+        if error is None:
+            summits_dict[summit] = data
+            if cache is not None:
+                cache.put(summit, data)
+        else:
+            errors_dict[summit] = error
+    if cache is not None and missing:
+        cache.save()
+    return summits_dict, errors_dict
+
+
+def local_summits(summits, summits_table):
+    """Find summits in local SOTA database, return dictionary with data of valid summits found in API format"""
+    # retired summits are skipped, so they're checked with SOTA API
+    summits = list(summits)
+    positions = summits_table.locate(summits)
+    usable = positions >= 0
+    usable[usable] = summits_table.is_valid(positions[usable])
+    summits_df = summits_table.take(positions[usable])
+    summits_dict = {}
+    for summit, name, association, latitude, longitude, points in zip(
+            summits_df.index, summits_df['SummitName'], summits_df['AssociationName'],
+            summits_df['Latitude'].tolist(), summits_df['Longitude'].tolist(), summits_df['Points'].tolist()):
+        summits_dict[summit] = {'summitCode': summit, 'name': name, 'associationName': association,
+                                'latitude': latitude, 'longitude': longitude, 'points': points}
+    return summits_dict
+
+
+@timed('resolve_summits')
+def resolve_summits(summits, summits_table = None, cache = None, client = None, max_workers = 8):
+    """Get summits data from local SOTA database, then from cache or SOTA API, return dictionaries with summits data and errors"""
+    # only summits missing in local database (or retired ones) are looked up in SOTA API
+    summits = list(dict.fromkeys(summits))
+    found_dict = local_summits(summits, summits_table) if summits_table is not None else {}
+    missing = [summit for summit in summits if summit not in found_dict]
+    downloaded_dict, errors_dict = fetch_summits(missing, cache, client, max_workers) if missing else ({}, {})
+    # summits are returned in the same order as they were requested
+    summits_dict = {summit: found_dict.get(summit, downloaded_dict.get(summit)) for summit in summits
+                    if summit not in errors_dict}
+    return summits_dict, errors_dict
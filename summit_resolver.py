@@ -0,0 +1,290 @@
+import os # for file system operations
+import re # to normalise summit codes
+import ast # to read legacy errors file
+import json # to save errors store
+import numpy as np # for columnar operations
+import pandas as pd # for data analysis
+from datetime import datetime # to save when errors were seen
+from spatial_index import distance_km # to find candidate summits near activator's position
+
+# summit code - association, region (letters and digits) and number, e.g. SP/BZ-001 or W7O/WV-144
+# spotted codes often have lower case letters, spaces, no dash or leading zeros and O instead of 0 in the number
+SUMMIT_CODE = re.compile(r'^([A-Z0-9]+)/([A-Z0-9]{2,3})[-_]([0-9O]{1,3})$')
+
+# code without dash - region and number have to be told apart
+SUMMIT_CODE_WITHOUT_DASH = re.compile(r'^([A-Z0-9]+)/([A-Z0-9]{3,6})$')
+
+# typo is corrected automatically only if candidate summit is closer than this to summit activator spotted from
+RESOLVE_RADIUS_KM = 50
+
+
+def code_parts(code):
+    """Split summit code written by a spotter into association, region and number, return list of possible
+    tuples (association, region, number) - the most likely first, empty if it's not a code"""
+    code = re.sub(r'\s+', '', str(code)).upper()
+    match = SUMMIT_CODE.match(code)
+    if match is not None:
+        return [match.groups()]
+    match = SUMMIT_CODE_WITHOUT_DASH.match(code)
+    if match is None:
+        return []
+    association, rest = match.groups()
+    # without dash every split of region (2-3 characters) and number (1-3 digits) is possible - regions usually
+    # end with a letter and numbers have 3 digits, so such splits go first (W7O/WV144 is W7O/WV-144, not W7O/WV1-044)
+    parts = [(association, rest[:split], rest[split:]) for split in (2, 3)
+             if 1 <= len(rest) - split <= 3 and re.fullmatch(r'[0-9O]+', rest[split:])]
+    return sorted(parts, key = lambda part: (not part[1][-1].isalpha(), -len(part[2])))
+
+
+def format_code(association, region, number, pad = True):
+    """Write summit code in SOTA format, with number padded with leading zeros (or as spotted)"""
+    number = number.replace('O', '0')
+    return f'{association}/{region}-{int(number):03d}' if pad else f'{association}/{region}-{number}'
+
+
+def normalise_code(code):
+    """Unify summit code written by a spotter, e.g. 'w7o/wv 44' into 'W7O/WV-044', return None if it's not a code"""
+    parts = code_parts(code)
+    return format_code(*parts[0]) if parts else None
+
+
+def edit_distance(a, b):
+    """Number of typos (0, 1 or 2 meaning more) changing a into b - one character added, deleted, changed or
+    two neighbouring characters swapped"""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > 1:
+        return 2
+    # skip common beginning and end, then check what's left in the middle
+    start = 0
+    while start < min(len(a), len(b)) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < min(len(a), len(b)) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if len(a) + len(b) <= 2 and max(len(a), len(b)) == 1:
+        return 1
+    return 1 if len(a) == len(b) == 2 and a == b[::-1] else 2
+
+
+def base_callsign(callsign):
+    """Activator's callsign without prefixes and suffixes (like /P), e.g. HB9/SP9ABC/P -> SP9ABC"""
+    return max(str(callsign).upper().split('/'), key = len)
+
+
+def deletion_keys(codes):
+    """Return array of codes with every single character deleted (one row per deleted position)"""
+    # codes are fixed-width bytes, so character at given position is deleted for all codes at once
+    width = codes.dtype.itemsize
+    chars = codes.view('S1').reshape(len(codes), width)
+    keys = [np.ascontiguousarray(np.delete(chars, i, axis = 1)).view(f'S{width - 1}').ravel() for i in range(width)]
+    return np.stack(keys).astype(f'S{width}')
+
+
+class SummitResolver:
+    """Index of summit codes with all their single-character deletions, to find codes similar to misspelled ones"""
+
+    def __init__(self, codes, latitude, longitude, valid, keys, owners):
+        # codes is array of all summit codes (sorted), keys are codes and their deletions (sorted),
+        # owners - positions of codes each key was made of
+        self.codes = codes
+        self.latitude = latitude
+        self.longitude = longitude
+        self.valid = valid
+        self.keys = keys
+        self.owners = owners
+
+    @classmethod
+    def build(cls, codes, latitude, longitude, valid):
+        """Build index for summit codes sorted alphabetically"""
+        codes = np.asarray(codes).astype('S')
+        keys = np.concatenate([codes.astype(f'S{codes.dtype.itemsize}'), deletion_keys(codes).ravel()])
+        owners = np.concatenate([np.arange(len(codes))] * (codes.dtype.itemsize + 1)).astype('int32')
+        # deleting a character after the end of shorter code gives the same code - such keys are not needed
+        keep = np.ones(len(keys), dtype = bool)
+        keep[len(codes):] = keys[len(codes):] != np.tile(codes, codes.dtype.itemsize)
+        order = np.argsort(keys[keep], kind = 'stable')
+        return cls(codes, latitude, longitude, valid, keys[keep][order], owners[keep][order])
+
+    @classmethod
+    def from_table(cls, summits_table):
+        """Load index built for SummitTable from its cache directory, build and save it there first if needed"""
+        # index is saved next to the binary cache of summits database, so it's rebuilt only when summitslist.csv changes
+        paths = [os.path.join(summits_table.path, name) for name in ('resolver_keys.npy', 'resolver_owners.npy')]
+        valid = summits_table.is_valid(np.arange(len(summits_table)))
+        if not all(os.path.exists(path) for path in paths):
+            resolver = cls.build(summits_table.codes, summits_table.latitude, summits_table.longitude, valid)
+            for path, array in zip(paths, (resolver.keys, resolver.owners)):
+                # np.save adds .npy to file name without it, so temporary file name ends with it
+                np.save(f'{path}.{os.getpid()}.tmp.npy', array)
+                os.replace(f'{path}.{os.getpid()}.tmp.npy', path)
+            return resolver
+        # np.asarray keeps files memory-mapped, but makes slicing them cheaper than on np.memmap
+        return cls(np.asarray(summits_table.codes).astype('S'), summits_table.latitude, summits_table.longitude, valid,
+                   np.asarray(np.load(paths[0], mmap_mode = 'r')), np.asarray(np.load(paths[1], mmap_mode = 'r')))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def locate(self, code):
+        """Find position of summit code, return -1 if it's not found"""
+        code = code.encode()
+        position = np.searchsorted(self.codes, code)
+        return int(position) if position < len(self.codes) and self.codes[position] == code else -1
+
+    def candidates(self, code):
+        """Find summits with codes differing from code by at most one typo, return list of tuples (distance, position)"""
+        # code and every code with one character deleted is looked up among keys - this finds codes with one
+        # character added, deleted, changed or two neighbouring characters swapped
+        code = code.encode()
+        queries = [code] + [code[:i] + code[i + 1:] for i in range(len(code))]
+        # codes longer than the longest key can't be found (and would be truncated by numpy)
+        queries = np.array([query for query in queries if len(query) <= self.keys.dtype.itemsize], dtype = self.keys.dtype)
+        start = np.searchsorted(self.keys, queries, side = 'left')
+        end = np.searchsorted(self.keys, queries, side = 'right')
+        positions = set()
+        for first, last in zip(start.tolist(), end.tolist()):
+            if first < last:
+                positions.update(self.owners[first:last].tolist())
+        found = []
+        for position in positions:
+            distance = edit_distance(code.decode(), self.codes[position].decode())
+            if distance <= 1:
+                found.append((distance, position))
+        return sorted(found)
+
+    def resolve(self, code, near = None, association = None):
+        """Find summit meant by misspelled code, return tuple (resolved code or None, list of suggested codes)
+        near is a position (latitude, longitude) activator spotted from, if known"""
+        parts = code_parts(code)
+        # code without dash may be read in few ways - the first one found in SOTA database is used
+        for part in parts:
+            normalised = format_code(*part)
+            if self.locate(normalised) >= 0:
+                return normalised, [normalised]
+        # codes similar to all readings are looked for, with number padded and as spotted - padding W7O/WV-14
+        # gives W7O/WV-014, two typos away from W7O/WV-144 with one digit missing
+        queries = dict.fromkeys([format_code(*part, pad = pad) for part in parts for pad in (True, False)] or [str(code).upper()])
+        distances = {}
+        for query in queries:
+            for distance, position in self.candidates(query):
+                if self.valid[position]:
+                    distances[position] = min(distance, distances.get(position, distance))
+        if not distances:
+            return None, []
+        ranked = sorted((distance, position) for position, distance in distances.items())
+        positions = np.array([position for _, position in ranked])
+        # candidates are ranked by distance from activator's position (if known), otherwise candidates from
+        # association spotted go first
+        if near is not None:
+            km = distance_km(near[0], near[1], self.latitude[positions], self.longitude[positions])
+            order = np.argsort(km, kind = 'stable')
+            suggestions = [self.codes[positions[i]].decode() for i in order]
+            return (suggestions[0] if km[order[0]] <= RESOLVE_RADIUS_KM else None), suggestions
+        suggestions = [self.codes[position].decode() for position in positions]
+        if association is not None:
+            suggestions.sort(key = lambda suggestion: suggestion.split('/')[0] != str(association).upper())
+        # without position the only candidate from spotted association is accepted
+        same_association = [suggestion for suggestion in suggestions if suggestion.split('/')[0] == str(association).upper()]
+        return (same_association[0] if len(same_association) == 1 else None), suggestions
+
+    def correct_spots(self, spots_df, found, summits_found, positions = None):
+        """Replace codes of summits not found (where found is False) with summits resolved, return spots with
+        spottedSummit column holding original code of spots corrected
+        positions is dictionary activator's base callsign: (latitude, longitude) of summits activated recently"""
+        # spots have no coordinates, so activator's position is taken from summits of activator's other spots found
+        positions = dict(positions or {})
+        callsigns = spots_df['activatorCallsign'].to_numpy(dtype = object)
+        for callsign, latitude, longitude in zip(callsigns[found], summits_found['Latitude'], summits_found['Longitude']):
+            positions[base_callsign(callsign)] = (latitude, longitude)
+        spots_df = spots_df.copy()
+        spotted = np.full(len(spots_df), None, dtype = object)
+        summits = spots_df['summit'].to_numpy(dtype = object).copy()
+        associations = spots_df['associationCode'].to_numpy(dtype = object)
+        for i in np.flatnonzero(~np.asarray(found, dtype = bool)):
+            resolved, _ = self.resolve(summits[i], positions.get(base_callsign(callsigns[i])), associations[i])
+            if resolved is not None:
+                spotted[i] = summits[i]
+                summits[i] = resolved
+        spots_df['summit'] = pd.Series(summits, index = spots_df.index, dtype = 'string')
+        spots_df['spottedSummit'] = pd.Series(spotted, index = spots_df.index, dtype = object)
+        return spots_df
+
+
+def activator_positions(spots_df):
+    """Return dictionary activator's base callsign: (latitude, longitude) of summit of activator's latest spot found"""
+    # spots are sorted from the newest, so the latest position of every activator is kept
+    spots_found = spots_df[spots_df['latitude'].notna()] if 'latitude' in spots_df else spots_df.iloc[:0]
+    positions = {}
+    for callsign, latitude, longitude in zip(spots_found['activatorCallsign'], spots_found['latitude'], spots_found['longitude']):
+        positions.setdefault(base_callsign(callsign), (latitude, longitude))
+    return positions
+
+
+class ErrorStore:
+    """Summit codes not found in SOTA database, counted and saved in JSON file together with summits they were
+    resolved to or suggestions"""
+
+    def __init__(self, path = 'summits_errors.json', legacy_path = 'summits_errors.txt'):
+        self.path = path
+        try:
+            with open(path) as file:
+                self.errors = json.load(file)
+        except (OSError, ValueError):
+            self.errors = {}
+        self.changed = False
+        # errors saved by previous versions (one set with summit code per line) are moved to the store
+        if legacy_path is not None and os.path.exists(legacy_path):
+            self.migrate(legacy_path)
+
+    def migrate(self, legacy_path):
+        """Add errors from legacy text file to the store and rename the file, so it's not read again"""
+        with open(legacy_path) as file:
+            for line in file:
+                try:
+                    codes = ast.literal_eval(line.strip())
+                except (ValueError, SyntaxError):
+                    continue
+                # legacy file doesn't say when errors were seen, so they're only counted
+                for code in (codes if isinstance(codes, (set, list, tuple)) else [codes]):
+                    self.errors.setdefault(str(code), {'count': 0})['count'] += 1
+                    self.changed = True
+        self.save()
+        os.replace(legacy_path, f'{legacy_path}.migrated')
+
+    def add(self, code, resolved = None, suggestions = None, seen = None):
+        """Count summit code not found in SOTA database"""
+        seen = (seen or datetime.utcnow()).isoformat(timespec = 'seconds')
+        entry = self.errors.setdefault(code, {'count': 0})
+        entry.setdefault('first_seen', seen)
+        entry['count'] += 1
+        entry['last_seen'] = seen
+        if resolved is not None:
+            entry['resolved'] = resolved
+        if suggestions:
+            entry['suggestions'] = list(suggestions)
+        self.changed = True
+
+    def add_spots(self, spots_df, summits_errors, resolver = None):
+        """Count summits not found (as returned by enrich_spots) and spots corrected by resolver"""
+        for error in summits_errors:
+            for code in error:
+                # suggestions are looked for only once for every code
+                suggestions = None
+                if resolver is not None and 'suggestions' not in self.errors.get(code, {}):
+                    suggestions = resolver.resolve(code)[1][:5]
+                self.add(code, suggestions = suggestions)
+        if 'spottedSummit' in spots_df:
+            corrected = spots_df[spots_df['spottedSummit'].notna()]
+            for spotted, summit in zip(corrected['spottedSummit'], corrected['summit']):
+                self.add(spotted, resolved = summit)
+
+    def save(self):
+        """Write store to disk if anything has changed"""
+        if not self.changed:
+            return
+        with open(f'{self.path}.tmp', 'w') as file:
+            json.dump(self.errors, file, indent = 1, sort_keys = True)
+        os.replace(f'{self.path}.tmp', self.path)
+        self.changed = False
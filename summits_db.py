@@ -0,0 +1,152 @@
+import os # for file system operations
+import json # to save cache metadata
+import shutil # to remove outdated cache
+import hashlib # to detect changes in summits list
+import numpy as np # for columnar storage
+import pandas as pd # for data analysis
+from metrics import timed # to measure time of loading summits database
+
+# version of binary cache format - change it whenever columns saved in cache change
+CACHE_VERSION = 2
+
+# columns of summitslist.csv used by the pack, first row of CSV file is a header, so should be ignored
+SUMMITS_CSV_COLUMNS = ['SummitCode', 'AssociationName', 'SummitName', 'Longitude', 'Latitude', 'Points', 'ValidTo']
+
+
+def file_hash(path):
+    """Calculate sha256 checksum of a file, return it as hex string"""
+    checksum = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+class SummitTable:
+    """SOTA summits database kept as memory-mapped columns, sorted by summit code"""
+
+    def __init__(self, path):
+        # columns are memory-mapped in read-only mode, so processes using the same cache share
+        # the same pages of memory instead of keeping their own copy of summits database
+        self.path = path
+        self.codes = np.load(os.path.join(path, 'code.npy'), mmap_mode = 'r')
+        self.names = np.load(os.path.join(path, 'name.npy'), mmap_mode = 'r')
+        self.latitude = np.load(os.path.join(path, 'latitude.npy'), mmap_mode = 'r')
+        self.longitude = np.load(os.path.join(path, 'longitude.npy'), mmap_mode = 'r')
+        self.points = np.load(os.path.join(path, 'points.npy'), mmap_mode = 'r')
+        self.valid_to = np.load(os.path.join(path, 'valid_to.npy'), mmap_mode = 'r')
+        self.association_ids = np.load(os.path.join(path, 'association_id.npy'), mmap_mode = 'r')
+        self.associations = np.load(os.path.join(path, 'associations.npy'))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return self.locate([code])[0] >= 0
+
+    def locate(self, codes):
+        """Find positions of summit codes in the table, return array of positions (-1 for summits not found)"""
+        codes = np.asarray(codes, dtype = str)
+        if len(self.codes) == 0:
+            return np.full(len(codes), -1)
+        position = np.searchsorted(self.codes, codes)
+        position[position == len(self.codes)] = 0
+        return np.where(self.codes[position] == codes, position, -1)
+
+    def take(self, positions):
+        """Return summits from given positions as DataFrame indexed by SummitCode, like loaded from summitslist.csv"""
+        positions = np.asarray(positions, dtype = 'int')
+        summits_df = pd.DataFrame({
+            'SummitCode': pd.array(self.codes[positions], dtype = 'string'),
+            'AssociationName': pd.array(self.associations[self.association_ids[positions]], dtype = 'string'),
+            'SummitName': pd.array(np.char.decode(self.names[positions], 'utf-8'), dtype = 'string'),
+            'Longitude': self.longitude[positions],
+            'Latitude': self.latitude[positions],
+            'Points': self.points[positions].astype('int'),
+            'ValidTo': self.valid_to[positions],
+        })
+        return summits_df.set_index('SummitCode')
+
+    def is_valid(self, positions, date = None):
+        """Check if summits from given positions are valid (not retired) at given date, today by default"""
+        if date is None:
+            date = np.datetime64('today')
+        return self.valid_to[np.asarray(positions, dtype = 'int')] >= np.datetime64(date, 'D')
+
+    def to_frame(self):
+        """Return whole summits database as DataFrame indexed by SummitCode"""
+        return self.take(np.arange(len(self)))
+
+
+def compile_summits(csv_path, path):
+    """Convert summitslist.csv into binary columnar files saved in path directory"""
+    summits_df = pd.read_csv(csv_path, skiprows = 1, usecols = SUMMITS_CSV_COLUMNS, dtype = {
+        'SummitCode': 'string',
+        'AssociationName': 'string',
+        'SummitName': 'string',
+        'Longitude': 'float',
+        'Latitude': 'float',
+        'Points': 'int',
+        'ValidTo': 'string',
+    })
+    # summits are sorted by code, so they can be found with binary search
+    summits_df = summits_df.sort_values('SummitCode').reset_index(drop = True)
+    association_ids, associations = pd.factorize(summits_df['AssociationName'].fillna(''))
+    os.makedirs(path, exist_ok = True)
+    np.save(os.path.join(path, 'code.npy'), summits_df['SummitCode'].to_numpy(dtype = str))
+    # names may contain local characters, so they're saved as UTF-8 bytes to keep the file compact
+    np.save(os.path.join(path, 'name.npy'), np.char.encode(summits_df['SummitName'].fillna('').to_numpy(dtype = str), 'utf-8'))
+    np.save(os.path.join(path, 'latitude.npy'), summits_df['Latitude'].to_numpy(dtype = 'float'))
+    np.save(os.path.join(path, 'longitude.npy'), summits_df['Longitude'].to_numpy(dtype = 'float'))
+    np.save(os.path.join(path, 'points.npy'), summits_df['Points'].to_numpy(dtype = 'int8'))
+    # summits without end of validity date are treated as valid forever
+    valid_to = pd.to_datetime(summits_df['ValidTo'], format = '%d/%m/%Y', errors = 'coerce')
+    np.save(os.path.join(path, 'valid_to.npy'), valid_to.fillna(pd.Timestamp.max).to_numpy(dtype = 'datetime64[D]'))
+    np.save(os.path.join(path, 'association_id.npy'), association_ids.astype('int16'))
+    np.save(os.path.join(path, 'associations.npy'), np.asarray(associations, dtype = str))
+
+
+@timed('load_summits')
+def load_summits(csv_path = 'summitslist.csv', cache_dir = None):
+    """Load SOTA summits database from binary cache, rebuild the cache first if summitslist.csv has changed"""
+    # by default cache is kept in .summits_cache directory next to summitslist.csv
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.summits_cache')
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    csv_stat = os.stat(csv_path)
+    try:
+        with open(meta_path) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        meta = {}
+
+    # cache is valid if it was built from summitslist.csv of the same size and modification time
+    # if only modification time is different (e.g. file was downloaded again), checksum decides
+    if (meta.get('version') != CACHE_VERSION or meta.get('size') != csv_stat.st_size
+            or meta.get('mtime_ns') != csv_stat.st_mtime_ns
+            or not os.path.isdir(os.path.join(cache_dir, meta.get('directory', '')))):
+        checksum = file_hash(csv_path)
+        directory = os.path.join(cache_dir, checksum[:16])
+        if meta.get('version') != CACHE_VERSION or meta.get('sha256') != checksum or not os.path.isdir(directory):
+            # every version of the cache is built in its own directory, so processes which still use
+            # previous one keep their memory-mapped files untouched
+            # files are written to temporary directory first, so other processes never see half-built cache
+            temp_directory = f'{directory}.{os.getpid()}.tmp'
+            compile_summits(csv_path, temp_directory)
+            shutil.rmtree(directory, ignore_errors = True)
+            try:
+                os.replace(temp_directory, directory)
+            except OSError:
+                # other process has just built the same version of the cache
+                shutil.rmtree(temp_directory, ignore_errors = True)
+        meta = {'version': CACHE_VERSION, 'size': csv_stat.st_size, 'mtime_ns': csv_stat.st_mtime_ns,
+                'sha256': checksum, 'directory': checksum[:16]}
+        with open(f'{meta_path}.{os.getpid()}.tmp', 'w') as file:
+            json.dump(meta, file)
+        os.replace(f'{meta_path}.{os.getpid()}.tmp', meta_path)
+        # remove outdated versions of the cache - files already mapped stay available for processes using them
+        for entry in os.listdir(cache_dir):
+            if entry != meta['directory'] and not entry.endswith('.tmp') and os.path.isdir(os.path.join(cache_dir, entry)):
+                shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors = True)
+
+    return SummitTable(os.path.join(cache_dir, meta['directory']))
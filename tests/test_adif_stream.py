@@ -0,0 +1,111 @@
+"""Tests of reading chaser's log with streaming ADIF tokenizer
+
+Run from repository root: python -m pytest tests
+"""
+import os # for path of sample log
+import adif_io # log read the way it was done before
+import pandas as pd # to compare logs as DataFrames
+import pytest # for parametrised tests
+from unidecode import unidecode # for log clearing, as done before
+
+from adif_stream import LOG_FIELDS, iter_records, read_chases
+
+# sample log of the pack
+SAMPLE_LOG = os.path.join(os.path.dirname(__file__), '..', 'SOTAlog.adi')
+
+# small log - header, QSOs with and without SOTA_REF, lower case tags and SOTA_REF, value with '<' inside
+# and a tag with type
+LOG = (
+    'Test log\n'
+    '<ADIF_VER:5>3.1.0 <PROGRAMID:4>test <EOH>\n'
+    '<CALL:8>SQ9JTR/P <MY_GRIDSQUARE:6>KO00AA <SOTA_REF:9>SP/BI-003 <BAND:2>2M <MODE:2>FM <QSO_DATE:8>20211106 <EOR>\n'
+    '<CALL:6>SP9MOV <MY_GRIDSQUARE:6>KN09GR <MY_SOTA_REF:9>SP/BZ-049 <BAND:2>2M <MODE:2>FM <QSO_DATE:8>20211111 <EOR>\n'
+    '<call:8>SP9OZI/P <my_gridsquare:6>KO00AA <sota_ref:9>sp/bz-070 <comment:7>a<b>c<d '
+    '<band:3>20M <mode:3>SSB <qso_date:8:d>20211112 <eor>\n'
+    '<CALL:5>F4WBN <SOTA_REF:8>F/AB-001 <BAND:3>20M <MODE:2>CW <QSO_DATE:8>20220101 <EOR>\n'
+)
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / 'log.adi'
+    path.write_bytes(LOG.encode('ascii'))
+    return path
+
+
+def adif_io_chases(text):
+    """Read log as it was done before the streaming reader - return DataFrame with QSOs with SOTA_REF provided"""
+    qsos, _ = adif_io.read_from_string(unidecode(text))
+    log_df = pd.DataFrame(qsos)
+    log_df = log_df[log_df['SOTA_REF'].notnull()].reset_index(drop = True)
+    log_df['SOTA_REF'] = log_df['SOTA_REF'].str.upper()
+    return log_df
+
+
+def assert_same_chases(chases_df, expected_df):
+    assert len(chases_df) == len(expected_df)
+    for field in LOG_FIELDS:
+        if field == 'QSO_DATE':
+            expected = pd.to_datetime(expected_df[field], format = '%Y%m%d')
+            assert (chases_df[field] == expected).all()
+        elif field in expected_df:
+            # missing values are compared as empty texts
+            assert chases_df[field].astype(object).fillna('').tolist() == expected_df[field].fillna('').tolist()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 16, 64, 1 << 20])
+def test_tags_split_across_chunks(log_path, chunk_size):
+    # records and offsets are the same whatever chunks the tags and values are split into
+    expected = list(iter_records(log_path))
+    assert list(iter_records(log_path, chunk_size = chunk_size)) == expected
+
+
+def test_records(log_path):
+    records = list(iter_records(log_path))
+    assert [record for record, _ in records] == [
+        {'CALL': 'SQ9JTR/P', 'MY_GRIDSQUARE': 'KO00AA', 'SOTA_REF': 'SP/BI-003', 'BAND': '2M', 'MODE': 'FM',
+         'QSO_DATE': '20211106'},
+        {'CALL': 'SP9MOV', 'MY_GRIDSQUARE': 'KN09GR', 'BAND': '2M', 'MODE': 'FM', 'QSO_DATE': '20211111'},
+        {'CALL': 'SP9OZI/P', 'MY_GRIDSQUARE': 'KO00AA', 'SOTA_REF': 'sp/bz-070', 'BAND': '20M', 'MODE': 'SSB',
+         'QSO_DATE': '20211112'},
+        {'CALL': 'F4WBN', 'SOTA_REF': 'F/AB-001', 'BAND': '20M', 'MODE': 'CW', 'QSO_DATE': '20220101'},
+    ]
+    # every offset points right after record's <EOR>
+    data = LOG.encode('ascii')
+    assert [data[:offset].upper().endswith(b'<EOR>') for _, offset in records] == [True] * len(records)
+    assert records[-1][1] == len(data.rstrip())
+
+
+def test_reading_from_offset(log_path):
+    records = list(iter_records(log_path))
+    assert list(iter_records(log_path, start = records[1][1])) == records[2:]
+
+
+def test_records_without_sota_ref_are_skipped(log_path):
+    chases_df, offset = read_chases(log_path)
+    assert chases_df['SOTA_REF'].tolist() == ['SP/BI-003', 'SP/BZ-070', 'F/AB-001']
+    # offset is the end of the last record read, even if it's not a chase
+    assert offset == len(LOG.encode('ascii').rstrip())
+    # QSO without MY_GRIDSQUARE is kept, with the field missing
+    assert chases_df['MY_GRIDSQUARE'].isnull().tolist() == [False, False, True]
+
+
+def test_log_without_chases(tmp_path):
+    path = tmp_path / 'log.adi'
+    path.write_bytes(b'<EOH><CALL:6>SP9MOV <MY_SOTA_REF:9>SP/BZ-049 <EOR>\n')
+    chases_df, offset = read_chases(path)
+    assert len(chases_df) == 0
+    assert offset == len(b'<EOH><CALL:6>SP9MOV <MY_SOTA_REF:9>SP/BZ-049 <EOR>')
+
+
+def test_same_as_adif_io(log_path):
+    chases_df, _ = read_chases(log_path)
+    assert_same_chases(chases_df, adif_io_chases(LOG))
+
+
+def test_same_as_adif_io_on_sample_log():
+    # sample log of the pack is saved in local code page, with accents in some fields
+    with open(SAMPLE_LOG, 'rb') as file:
+        text = file.read().decode('cp1250')
+    chases_df, _ = read_chases(SAMPLE_LOG)
+    assert_same_chases(chases_df, adif_io_chases(text))
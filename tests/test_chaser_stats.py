@@ -0,0 +1,111 @@
+"""Tests of updating statistics of chaser's log with QSOs appended since last run
+
+Run from repository root: python -m pytest tests
+"""
+import hashlib # to check checksums of the log
+import pytest # for fixtures
+
+from chase_cube import update_chase_cube
+from chaser_stats import ChaserStats, prefix_hash, update_chaser_stats
+
+HEADER = '<ADIF_VER:5>3.1.0 <EOH>\n'
+
+
+def record(summit, locator = 'KO00AA'):
+    """ADIF record of a chase of the summit from chaser's locator"""
+    return (f'<CALL:6>SP9MOV <MY_GRIDSQUARE:{len(locator)}>{locator} <SOTA_REF:{len(summit)}>{summit} '
+            '<BAND:2>2M <MODE:2>FM <QSO_DATE:8>20211106 <EOR>\n')
+
+
+FIRST = [record('SP/BZ-001'), record('SP/BZ-002'), record('SP/BZ-001', 'KN09GR')]
+SECOND = [record('SP/BI-003'), record('SP/BZ-001')]
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / 'log.adi'
+    path.write_text(HEADER + ''.join(FIRST))
+    return path
+
+
+def full_read(log_path, tmp_path):
+    """Statistics of the whole log, read without any saved statistics"""
+    return update_chaser_stats(log_path, tmp_path / 'full.stats.json')
+
+
+def assert_same_stats(stats, expected):
+    assert stats.chases == expected.chases
+    assert stats.locators == expected.locators
+    assert stats.home_QTH == expected.home_QTH
+    assert stats.offset == expected.offset
+    assert stats.checksum == expected.checksum
+
+
+def test_prefix_hash_continues_checksum(log_path):
+    data = log_path.read_bytes()
+    middle = len(data) // 2
+    checksum = prefix_hash(log_path, middle)
+    assert prefix_hash(log_path, len(data), middle, checksum).hexdigest() == hashlib.sha256(data).hexdigest()
+
+
+def test_first_run(log_path):
+    stats = update_chaser_stats(log_path)
+    assert stats.chases == {'SP/BZ-001': 2, 'SP/BZ-002': 1}
+    assert stats.locators == {'KO00AA': 2, 'KN09GR': 1}
+    assert stats.home_QTH == 'KO00AA'
+    assert stats.offset == len(log_path.read_bytes().rstrip())
+    # statistics are saved next to the log
+    assert_same_stats(ChaserStats.load(f'{log_path}.stats.json'), stats)
+
+
+def test_appended_qsos(log_path, tmp_path, capsys):
+    update_chaser_stats(log_path)
+    with open(log_path, 'a') as file:
+        file.write(''.join(SECOND))
+    stats = update_chaser_stats(log_path)
+    assert 'rebuilt' not in capsys.readouterr().out
+    assert stats.chases == {'SP/BZ-001': 3, 'SP/BZ-002': 1, 'SP/BI-003': 1}
+    assert_same_stats(stats, full_read(log_path, tmp_path))
+
+
+def test_unchanged_log(log_path, tmp_path):
+    update_chaser_stats(log_path)
+    assert_same_stats(update_chaser_stats(log_path), full_read(log_path, tmp_path))
+
+
+def test_rewritten_log(log_path, tmp_path, capsys):
+    update_chaser_stats(log_path)
+    # summit of the first QSO is corrected, so the log's size is the same, then QSOs are appended
+    log_path.write_text(HEADER + record('SP/BZ-003') + ''.join(FIRST[1:] + SECOND))
+    stats = update_chaser_stats(log_path)
+    assert 'rebuilt' in capsys.readouterr().out
+    assert stats.chases == {'SP/BZ-003': 1, 'SP/BZ-002': 1, 'SP/BZ-001': 2, 'SP/BI-003': 1}
+    assert_same_stats(stats, full_read(log_path, tmp_path))
+
+
+def test_truncated_log(log_path, tmp_path, capsys):
+    update_chaser_stats(log_path)
+    # the last QSO is removed, so the log is shorter than its part already processed
+    log_path.write_text(HEADER + ''.join(FIRST[:-1]))
+    stats = update_chaser_stats(log_path)
+    assert 'rebuilt' in capsys.readouterr().out
+    assert stats.chases == {'SP/BZ-001': 1, 'SP/BZ-002': 1}
+    assert stats.locators == {'KO00AA': 2}
+    assert_same_stats(stats, full_read(log_path, tmp_path))
+
+
+def test_outdated_statistics(log_path, tmp_path):
+    stats_path = tmp_path / 'log.stats.json'
+    stats_path.write_text('{"version": 0, "offset": 10}')
+    assert_same_stats(update_chaser_stats(log_path, stats_path), full_read(log_path, tmp_path))
+
+
+def test_chase_cube_updated_like_statistics(log_path, tmp_path):
+    update_chase_cube(log_path)
+    with open(log_path, 'a') as file:
+        file.write(''.join(SECOND))
+    cube = update_chase_cube(log_path)
+    stats = full_read(log_path, tmp_path)
+    assert cube.query().to_dict() == stats.chases
+    assert (cube.locators, cube.home_QTH) == (stats.locators, stats.home_QTH)
+    assert (cube.offset, cube.checksum) == (stats.offset, stats.checksum)
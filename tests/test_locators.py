@@ -0,0 +1,61 @@
+"""Tests of converting Maidenhead locators into coordinates - batch conversion compared with maidenhead package
+
+Run from repository root: python -m pytest tests
+"""
+import maidenhead as mh # locators converted one by one, as done before
+import numpy as np # for columnar operations
+import pytest # for parametrised tests
+
+from locators import to_location, to_locations
+
+VALID = ['JO91sx', 'jo91', 'KO00AA', 'KN09gr', 'AA00aa00', 'RR99xx99', 'JO', 'JO91sx00xx', 'FN31pr', 'QF56od',
+         ' JO91 ', 'AA', 'RR']
+
+# locators with odd length, letters instead of digits (and the other way round) and fields out of A-R
+INVALID = ['', 'J', 'JO9', 'JO91sx0', 'SZ00', 'JOAA', 'JO9a', '12AB', 'JO91sx00xx00xx']
+
+
+@pytest.mark.parametrize('center', [False, True])
+def test_valid_locators(center):
+    latitude, longitude = to_locations(VALID, center)
+    expected = np.array([mh.to_location(locator.strip(), center) for locator in VALID])
+    assert np.allclose(latitude, expected[:, 0])
+    assert np.allclose(longitude, expected[:, 1])
+
+
+@pytest.mark.parametrize('locator', INVALID[:-1])
+def test_invalid_locators(locator):
+    # locators rejected by maidenhead package are not converted at all
+    with pytest.raises(ValueError):
+        mh.to_location(locator)
+    latitude, longitude = to_locations([locator])
+    assert np.isnan(latitude).all() and np.isnan(longitude).all()
+
+
+def test_subsquares_out_of_range():
+    # maidenhead package doesn't check subsquares (A-X), they're not valid locators though
+    assert mh.to_location('JO91zz') is not None
+    assert np.isnan(to_locations(['JO91zz'])[0]).all()
+
+
+def test_batch_with_missing_values():
+    # every locator of the batch is converted the same way, whatever other locators are there
+    locators = ['KO00AA', None, 'JO91sx', np.nan, 'KO00AA', 12, 'JO9', 'kn09']
+    latitude, longitude = to_locations(locators)
+    for locator, lat, lon in zip(locators, latitude, longitude):
+        location = to_location(locator) if isinstance(locator, str) else None
+        if location is None:
+            assert np.isnan(lat) and np.isnan(lon)
+        else:
+            assert (lat, lon) == pytest.approx(location)
+
+
+def test_empty_batch():
+    latitude, longitude = to_locations([])
+    assert len(latitude) == len(longitude) == 0
+
+
+def test_to_location():
+    assert to_location('KO00AA') == pytest.approx((50.0, 20.0))
+    assert to_location('KO00AA', center = True) == pytest.approx(mh.to_location('KO00AA', center = True))
+    assert to_location('JO9') is None
@@ -0,0 +1,23 @@
+"""Tests of metrics of the pack - summary of the run
+
+Run from repository root: python -m pytest tests
+"""
+from metrics import Registry, summary
+
+
+def test_summary_of_registry():
+    registry = Registry()
+    registry.histogram('sota_stage_seconds', 'Time of pipeline stages in seconds').observe(1.5, stage = 'enrich')
+    registry.histogram('sota_api_request_seconds', 'Latency of SOTA API requests in seconds').observe(0.25, endpoint = 'spots')
+    spots = registry.counter('sota_spots_total', 'Spots')
+    spots.inc(10, state = 'fetched')
+    spots.inc(7, state = 'deduplicated')
+    lines = summary(registry).splitlines()
+    assert lines[1].split() == ['enrich', '1', '1.500', '1.500']
+    assert lines[2].split() == ['API', 'spots', '1', '0.250', '0.250']
+    assert lines[3] == 'spots: 10 fetched, 7 deduplicated'
+
+
+def test_summary_of_empty_registry():
+    # only the header is shown for metrics not declared in the registry
+    assert len(summary(Registry()).splitlines()) == 1
@@ -0,0 +1,64 @@
+"""Tests of spatial index of summits - summits within distance and nearest ones compared with checking every summit
+
+Run from repository root: python -m pytest tests
+"""
+import numpy as np # for columnar operations
+import pytest # for parametrised tests
+
+from spatial_index import MAX_DISTANCE_KM, SummitIndex, distance_km
+
+
+@pytest.fixture(scope = 'module')
+def summits():
+    # summits all over the world, with many of them close to the poles and to 180th meridian
+    rng = np.random.default_rng(0)
+    latitude = np.concatenate([rng.uniform(-90, 90, 2000), rng.uniform(85, 90, 200), rng.uniform(-90, -85, 200),
+                               rng.uniform(-60, 60, 400), [90, -90, 0]])
+    longitude = np.concatenate([rng.uniform(-180, 180, 2400), rng.uniform(175, 180, 200), rng.uniform(-180, -175, 200),
+                                [0, 0, 180]])
+    return latitude, longitude
+
+
+# points summits are looked for around - near the poles, on both sides of 180th meridian and elsewhere
+POINTS = [(50.0, 20.0), (89.9, 0.0), (-89.9, 120.0), (90.0, 0.0), (-90.0, 0.0), (0.0, 179.9), (0.0, -179.9),
+          (65.0, 180.0), (-45.0, -180.0), (88.0, 179.0)]
+
+
+@pytest.mark.parametrize('cell', [0.5, 5])
+@pytest.mark.parametrize('latitude, longitude', POINTS)
+@pytest.mark.parametrize('radius_km', [10, 100, 500, 3000])
+def test_within(summits, cell, latitude, longitude, radius_km):
+    index = SummitIndex(*summits, cell = cell)
+    km = distance_km(latitude, longitude, *summits)
+    expected = np.flatnonzero(km <= radius_km)
+    positions, distances = index.within(latitude, longitude, radius_km)
+    assert sorted(positions.tolist()) == expected.tolist()
+    assert np.allclose(distances, km[positions])
+    assert (np.diff(distances) >= 0).all()
+
+
+@pytest.mark.parametrize('latitude, longitude', POINTS)
+@pytest.mark.parametrize('k', [1, 10, 100])
+def test_nearest(summits, latitude, longitude, k):
+    index = SummitIndex(*summits)
+    km = distance_km(latitude, longitude, *summits)
+    positions, distances = index.nearest(latitude, longitude, k)
+    assert len(positions) == k
+    assert np.allclose(distances, np.sort(km)[:k])
+    assert np.allclose(km[positions], distances)
+
+
+def test_positions_of_table():
+    # positions returned are positions given to the index, e.g. of summits in SOTA database
+    index = SummitIndex([50.0, 50.1, -30.0], [20.0, 20.1, 150.0], positions = [7, 3, 5])
+    positions, _ = index.within(50.0, 20.0, 50)
+    assert positions.tolist() == [7, 3]
+    assert index.nearest(-30.0, 150.0, 1)[0].tolist() == [5]
+
+
+def test_nearest_in_small_index():
+    index = SummitIndex([50.0, -50.0], [20.0, -160.0])
+    positions, distances = index.nearest(50.0, 20.0, 10)
+    assert positions.tolist() == [0, 1]
+    assert distances[-1] <= MAX_DISTANCE_KM
+    assert len(SummitIndex([], []).nearest(0.0, 0.0, 5)[0]) == 0
@@ -0,0 +1,105 @@
+"""Tests of archive of spots - appending batches of spots, compacting partitions and querying spots
+
+Run from repository root: python -m pytest tests
+"""
+import numpy as np # for days of partitions
+import pandas as pd # for spots DataFrames
+import pytest # for fixtures
+
+import spot_archive # to lower number of segments compacted
+from spot_archive import SpotArchive
+
+# spots - id, time, activator, association, summit, frequency, mode, band
+SPOTS = [
+    (1, '2024-05-01 23:40', 'SP9MOV', 'SP', 'SP/BZ-001', 145.5, 'FM', '144 MHz'),
+    (2, '2024-05-01 23:45', 'F4WBN', 'F', 'F/AB-001', 14.062, 'CW', '14 MHz'),
+    (3, '2024-05-01 23:50', 'SQ9JTR', 'SP', 'SP/BI-003', 7.032, 'CW', '7 MHz'),
+    (4, '2024-05-01 23:58', 'SP9MOV', 'SP', 'SP/BZ-001', 14.285, 'SSB', '14 MHz'),
+    (5, '2024-05-02 00:05', 'F4WBN', 'F', 'F/AB-002', 145.5, 'FM', '144 MHz'),
+    (6, '2024-05-02 00:30', 'ON3UA', 'ON', 'ON/ON-001', 7.032, 'CW', '7 MHz'),
+]
+
+DAY = np.datetime64('2024-05-01')
+NEXT_DAY = np.datetime64('2024-05-02')
+
+
+def spots_frame(ids):
+    """DataFrame of spots with given ids, as saved by spots_visualiser.py"""
+    spots_df = pd.DataFrame([spot for spot in SPOTS if spot[0] in ids],
+                            columns = ['id', 'timeStamp', 'activatorCallsign', 'associationCode', 'summit',
+                                       'frequency', 'mode', 'band'])
+    spots_df['timeStamp'] = pd.to_datetime(spots_df['timeStamp'])
+    spots_df['latitude'] = 50.0
+    spots_df['longitude'] = 20.0
+    return spots_df
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return SpotArchive(str(tmp_path / 'spots_archive'))
+
+
+def saved_ids(archive, day):
+    return archive.read_partition(day, ['id'])['id'].tolist()
+
+
+def test_overlapping_batches(archive):
+    assert archive.append(spots_frame([1, 2, 3])) == 3
+    # spots already saved (and repeated in the batch) are skipped
+    assert archive.append(pd.concat([spots_frame([2, 3, 4]), spots_frame([4])])) == 1
+    assert archive.append(spots_frame([1, 2, 3, 4])) == 0
+    assert sorted(saved_ids(archive, DAY)) == [1, 2, 3, 4]
+    assert len(archive.segments(DAY)) == 2
+
+
+def test_batch_crossing_midnight(archive):
+    archive.append(spots_frame([1, 2, 3]))
+    # batch with spots of both days closes the first day, so its partition is compacted into one segment
+    assert archive.append(spots_frame([2, 3, 4, 5])) == 2
+    assert archive.days() == [DAY, NEXT_DAY]
+    assert len(archive.segments(DAY)) == 1
+    assert saved_ids(archive, DAY) == [1, 2, 3, 4]
+    assert saved_ids(archive, NEXT_DAY) == [5]
+    # spots of the next day sent again are still skipped
+    assert archive.append(spots_frame([4, 5, 6])) == 1
+    assert saved_ids(archive, NEXT_DAY) == [5, 6]
+
+
+def test_compact_many_segments(archive, monkeypatch):
+    monkeypatch.setattr(spot_archive, 'MAX_SEGMENTS', 2)
+    for spot_id in [3, 1, 2]:
+        archive.append(spots_frame([spot_id]))
+    # compacted partition has one segment sorted by time of spots, without duplicates
+    assert len(archive.segments(DAY)) == 1
+    assert saved_ids(archive, DAY) == [1, 2, 3]
+    archive.append(spots_frame([1, 2, 3, 4]))
+    assert saved_ids(archive, DAY) == [1, 2, 3, 4]
+
+
+def test_query(archive):
+    archive.append(spots_frame([1, 2, 3]))
+    archive.append(spots_frame([4, 5, 6]))
+    spots_df = archive.query('2024-05-01 00:00', '2024-05-03 00:00')
+    assert spots_df['id'].tolist() == [1, 2, 3, 4, 5, 6]
+    assert spots_df['summit'].tolist() == [spot[4] for spot in SPOTS]
+    assert spots_df['frequency'].tolist() == pytest.approx([spot[5] for spot in SPOTS])
+
+
+@pytest.mark.parametrize('filters, expected', [
+    # start is inclusive, end is exclusive - spots of both partitions are read
+    ({'start': '2024-05-01 23:45', 'end': '2024-05-02 00:30'}, [2, 3, 4, 5]),
+    ({'start': '2024-05-02 00:00', 'end': '2024-05-03 00:00'}, [5, 6]),
+    ({'start': '2024-05-03 00:00', 'end': '2024-05-04 00:00'}, []),
+    ({'associations': ['SP']}, [1, 3, 4]),
+    ({'associations': ['F', 'ON']}, [2, 5, 6]),
+    ({'bands': ['14 MHz']}, [2, 4]),
+    ({'modes': ['CW']}, [2, 3, 6]),
+    ({'associations': ['SP'], 'bands': ['7 MHz', '14 MHz'], 'modes': ['CW']}, [3]),
+    ({'modes': []}, []),
+])
+def test_query_filters(archive, filters, expected):
+    archive.append(spots_frame([1, 2, 3, 4, 5, 6]))
+    filters = {'start': '2024-05-01 00:00', 'end': '2024-05-03 00:00', **filters}
+    spots_df = archive.query(columns = ['id', 'summit'], **filters)
+    assert list(spots_df.columns) == ['id', 'summit']
+    assert spots_df['id'].tolist() == expected
@@ -0,0 +1,42 @@
+"""Tests of downloading spots in background - counting spots of every poll
+
+Run from repository root: python -m pytest tests
+"""
+from datetime import datetime, timedelta # for times of spots
+import pandas as pd # for SOTA database extract
+
+from metrics import SPOTS
+from spots_poller import SpotPoller
+from spots_visualiser import bands_df, modes_df
+
+# SOTA database extract indexed by summit code, as loaded from CSV file
+SUMMITS = pd.DataFrame({
+    'SummitCode': ['SP/BZ-001', 'SP/BZ-002'],
+    'SummitName': ['Babia Gora', 'Pilsko'],
+    'Latitude': [49.57, 49.53],
+    'Longitude': [19.53, 19.32],
+    'Points': [10, 10],
+}).set_index('SummitCode')
+
+
+def spot(spot_id, activator, summit, minutes_ago):
+    """Spot as returned by SOTA API"""
+    time_stamp = datetime.utcnow() - timedelta(minutes = minutes_ago)
+    return {'id': spot_id, 'timeStamp': time_stamp.isoformat(timespec = 'seconds'), 'activatorCallsign': activator,
+            'associationCode': 'SP', 'summitCode': summit, 'frequency': '145.500', 'mode': 'fm'}
+
+
+def test_deduplicated_spots_counted_once_per_activator_and_summit(tmp_path):
+    downloads = [
+        [spot(1, 'SP9MOV', 'BZ-001', 10), spot(2, 'SP9MOV', 'BZ-001', 5), spot(3, 'SQ9JTR', 'BZ-002', 5)],
+        # spot already known, another spot of an activation already known and a new activation
+        [spot(2, 'SP9MOV', 'BZ-001', 5), spot(4, 'SQ9JTR', 'BZ-002', 1), spot(5, 'SQ9JTR', 'BZ-001', 1)],
+    ]
+    poller = SpotPoller(lambda: downloads.pop(0), SUMMITS, bands_df, modes_df, errors_path = str(tmp_path / 'errors.json'))
+    deduplicated = SPOTS.value(state = 'deduplicated')
+    # new spots are counted by id, deduplicated ones by activator-summit pair - as in spots_visualiser.py
+    assert poller.poll() == 3
+    assert SPOTS.value(state = 'deduplicated') - deduplicated == 2
+    assert poller.poll() == 2
+    assert SPOTS.value(state = 'deduplicated') - deduplicated == 3
+    assert len(poller.snapshot.spots_df) == 3
@@ -0,0 +1,73 @@
+"""Tests of analysing spots downloaded from SOTA API - archiving spots and counting summits not found
+
+Run from repository root: python -m pytest tests
+"""
+import json # to read errors file
+import numpy as np # for summits coordinates
+import pandas as pd # for SOTA database extract
+import pytest # for fixtures
+
+from metrics import SPOTS
+from spot_archive import SpotArchive
+from spots_visualiser import analyse_spots
+from summit_resolver import SummitResolver
+
+# SOTA database extract indexed by summit code, as loaded from CSV file
+SUMMITS = pd.DataFrame({
+    'SummitCode': ['SP/BZ-001', 'SP/BZ-002'],
+    'SummitName': ['Babia Gora', 'Pilsko'],
+    'Latitude': [49.57, 49.53],
+    'Longitude': [19.53, 19.32],
+    'Points': [10, 10],
+}).set_index('SummitCode')
+
+
+def spot(spot_id, activator, association, summit):
+    """Spot as returned by SOTA API"""
+    return {'id': spot_id, 'timeStamp': f'2024-05-01T12:{spot_id:02d}:00', 'activatorCallsign': activator,
+            'associationCode': association, 'summitCode': summit, 'frequency': '145.500', 'mode': 'fm'}
+
+
+# activators repeat their spots - summit not found and misspelled summit are spotted twice by the same activator
+SPOTS_DOWNLOADED = [
+    spot(1, 'SP9MOV', 'SP', 'BZ-001'),
+    spot(2, 'SP9MOV', 'SP', 'BZ-001'),
+    spot(3, 'SQ9JTR', 'SP', 'XX-999'),
+    spot(4, 'SQ9JTR', 'SP', 'XX-999'),
+    spot(5, 'SO9L', 'SP', 'XX-999'),
+    spot(6, 'F4WBN', 'SP', 'BZ002'),
+    spot(7, 'F4WBN', 'SP', 'BZ002'),
+]
+
+
+@pytest.fixture
+def resolver():
+    return SummitResolver.build(SUMMITS.index.to_numpy(), SUMMITS['Latitude'].to_numpy(), SUMMITS['Longitude'].to_numpy(),
+                                np.ones(len(SUMMITS), dtype = bool))
+
+
+def test_errors_counted_once_per_activator_and_summit(tmp_path, monkeypatch, resolver):
+    monkeypatch.chdir(tmp_path)
+    archive = SpotArchive(str(tmp_path / 'spots_archive'))
+    deduplicated = SPOTS.value(state = 'deduplicated')
+    spots_df, summits_errors = analyse_spots(SPOTS_DOWNLOADED, SUMMITS, resolver, archive, 'summits_errors.json')
+
+    # every spot downloaded is archived, but only one spot of every activator-summit pair is shown
+    assert archive.query('2024-05-01', '2024-05-02')['id'].tolist() == [1, 2, 3, 4, 5, 6, 7]
+    assert spots_df['id'].tolist() == [1, 3, 5, 6]
+    assert spots_df['summit'].tolist() == ['SP/BZ-001', 'SP/XX-999', 'SP/XX-999', 'SP/BZ-002']
+    assert SPOTS.value(state = 'deduplicated') - deduplicated == 4
+
+    # summit not found and summit corrected are counted once for every activator, as before spots were archived
+    assert summits_errors == [{'SP/XX-999'}, {'SP/XX-999'}]
+    with open('summits_errors.json') as file:
+        errors = json.load(file)
+    assert errors['SP/XX-999']['count'] == 2
+    assert errors['SP/BZ002'] == {**errors['SP/BZ002'], 'count': 1, 'resolved': 'SP/BZ-002'}
+
+
+def test_no_spots(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    spots_df, summits_errors = analyse_spots([], SUMMITS, errors_path = 'summits_errors.json')
+    assert len(spots_df) == 0
+    assert summits_errors == []
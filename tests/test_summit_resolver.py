@@ -0,0 +1,69 @@
+"""Tests of correcting summit codes written by spotters
+
+Run from repository root: python -m pytest tests
+"""
+import numpy as np # for summits coordinates
+import pytest # for parametrised tests
+
+from summit_resolver import SummitResolver, normalise_code
+
+# summits of the index - code, latitude, longitude
+SUMMITS = [
+    ('HB/BE-140', 46.60, 7.70),
+    ('SP/BZ-001', 49.57, 19.53),
+    ('SP/BZ-002', 49.60, 19.40),
+    ('W7O/WV-044', 45.10, -122.00),
+    ('W7O/WV-144', 45.30, -122.20),
+]
+
+
+@pytest.fixture
+def resolver():
+    codes, latitude, longitude = zip(*sorted(SUMMITS))
+    return SummitResolver.build(codes, np.array(latitude), np.array(longitude), np.ones(len(codes), dtype = bool))
+
+
+@pytest.mark.parametrize('spotted, expected', [
+    ('W7O/WV-144', 'W7O/WV-144'),
+    ('W7O/WV144', 'W7O/WV-144'),
+    ('SP/BZ001', 'SP/BZ-001'),
+    ('HB/BE140', 'HB/BE-140'),
+    ('w7o/wv 44', 'W7O/WV-044'),
+    ('sp/bz-1', 'SP/BZ-001'),
+    ('SP/BZ1', 'SP/BZ-001'),
+    ('G/LD-O01', 'G/LD-001'),
+    ('F/AB1001', 'F/AB1-001'),
+    ('not a code', None),
+])
+def test_normalise_code(spotted, expected):
+    assert normalise_code(spotted) == expected
+
+
+@pytest.mark.parametrize('spotted', ['W7O/WV144', 'SP/BZ001', 'HB/BE140'])
+def test_resolve_code_without_dash(resolver, spotted):
+    resolved, suggestions = resolver.resolve(spotted)
+    assert resolved == normalise_code(spotted)
+    assert suggestions == [resolved]
+
+
+def test_resolve_digit_missing_near_activator(resolver):
+    # W7O/WV-14 is W7O/WV-144 with one digit missing, padded W7O/WV-014 is two typos away from it
+    resolved, suggestions = resolver.resolve('W7O/WV-14', near = (45.31, -122.21))
+    assert resolved == 'W7O/WV-144'
+    assert 'W7O/WV-144' in suggestions
+
+
+def test_resolve_far_from_activator(resolver):
+    # candidate is too far from summit activator was spotted on, so it's only suggested
+    resolved, suggestions = resolver.resolve('W7O/WV-14', near = (50.0, 20.0))
+    assert resolved is None
+    assert 'W7O/WV-144' in suggestions
+
+
+def test_resolve_only_candidate_in_association(resolver):
+    resolved, suggestions = resolver.resolve('HB/BE-14', association = 'HB')
+    assert resolved == 'HB/BE-140'
+
+
+def test_resolve_unknown_code(resolver):
+    assert resolver.resolve('ZZ/XX-999') == (None, [])